@@ -1,6 +1,22 @@
+import os
+import sys
+
 from django.apps import AppConfig
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        import config
+
+        # 启用重排序时总在启动时加载交叉编码器，避免首个检索请求承担加载耗时
+        if not (config.VECTOR_DB_WARMUP_ON_STARTUP or config.RERANK_ENABLED):
+            return
+        # runserver 的自动重载父进程不处理请求，无需加载模型
+        if "runserver" in sys.argv and os.environ.get("RUN_MAIN") != "true":
+            return
+
+        from .dbManager.registry import warm_up_in_background
+        warm_up_in_background(load_vector_db=config.VECTOR_DB_WARMUP_ON_STARTUP)
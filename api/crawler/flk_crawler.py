@@ -22,7 +22,7 @@ import json
 import time
 import argparse
 from datetime import datetime
-from typing import Any, List, Tuple, Dict
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
 
 import requests
 from docx import Document  # pip install python-docx
@@ -441,7 +441,7 @@ def download_body_for_item(
 
 # ----------------- 对外主接口（供别人 import 调用） -----------------
 
-def crawl_laws(
+def iter_crawl_laws(
     keyword: str,
     max_pages: int = 3,
     save_dir: str = "",
@@ -450,29 +450,15 @@ def crawl_laws(
     cookie: str = "",
     auto_txt: bool = True,
     latest_only: bool = True,
-) -> List[Dict[str, str]]:
+    skip_ids: Iterable[str] = None,
+) -> Iterator[Dict[str, str]]:
     """
-    对外主入口函数：抓取指定关键词的法规正文，并返回下载结果列表。
+    流式版本的 crawl_laws：每下载完一条就立即 yield，便于下游边抓取边处理。
 
-    参数：
-      keyword      : 搜索关键词，如 "公司法" / "民法典" / "证券法"
-      max_pages    : 搜索结果翻页数上限，默认 3
-      save_dir     : 保存目录，默认 "<keyword>_本体_flk"
-      exclude_words: 本体过滤时的排除词列表，默认使用 DEFAULT_EXCLUDE_WORDS
-      no_filter    : 如果 True，则不做“本体”过滤，搜索结果全部下载
-      cookie       : 可选 Cookie 字符串（否则使用 COOKIE_STR 或环境变量 FLK_COOKIE）
-      auto_txt     : 是否对 docx 自动导出 txt，默认 True
-      latest_only  : 是否只保留“同名法规”的最新版本（按标题归一化+公布日期比较），默认 True
+    参数与 crawl_laws 相同，另外：
+      skip_ids     : 已处理过的 bbbs 集合，这些记录不再下载（用于断点续传）
 
-    返回：
-      列表，每个元素为：
-        {
-          "id":    <bbbs>,
-          "title": <标题>,
-          "gbrq":  <公布日期>,
-          "doc_path": <下载到的 docx/pdf 路径或空字符串>,
-          "txt_path": <生成的 txt 路径或空字符串>,
-        }
+    每次 yield 的元素格式与 crawl_laws 返回列表中的元素相同。
     """
     if not save_dir:
         save_dir = safe_filename(f"{keyword}_本体_flk")
@@ -480,6 +466,7 @@ def crawl_laws(
 
     if exclude_words is None:
         exclude_words = list(DEFAULT_EXCLUDE_WORDS)
+    skip_ids = set(skip_ids or [])
 
     print(f"关键词：{keyword}")
     print(f"最大翻页数：{max_pages}")
@@ -523,10 +510,14 @@ def crawl_laws(
 
     if not items:
         print("⚠ 没有任何候选，结束。")
-        return []
+        return
+
+    if skip_ids:
+        pending = [item for item in items if item["id"] not in skip_ids]
+        print(f"跳过已处理记录 {len(items) - len(pending)} 条。")
+        items = pending
 
     # 2. 逐条下载正文
-    results: List[Dict[str, str]] = []
     success = 0
     for item in items:
         paths = download_body_for_item(
@@ -544,13 +535,56 @@ def crawl_laws(
         }
         if merged["doc_path"]:
             success += 1
-        results.append(merged)
+        yield merged
         time.sleep(1.0)
 
     print(f"\n共 {len(items)} 条待下载记录，成功下载 {success} 条。")
     print("保存目录：", os.path.abspath(save_dir))
 
-    return results
+
+def crawl_laws(
+    keyword: str,
+    max_pages: int = 3,
+    save_dir: str = "",
+    exclude_words: List[str] = None,
+    no_filter: bool = False,
+    cookie: str = "",
+    auto_txt: bool = True,
+    latest_only: bool = True,
+) -> List[Dict[str, str]]:
+    """
+    对外主入口函数：抓取指定关键词的法规正文，并返回下载结果列表。
+
+    参数：
+      keyword      : 搜索关键词，如 "公司法" / "民法典" / "证券法"
+      max_pages    : 搜索结果翻页数上限，默认 3
+      save_dir     : 保存目录，默认 "<keyword>_本体_flk"
+      exclude_words: 本体过滤时的排除词列表，默认使用 DEFAULT_EXCLUDE_WORDS
+      no_filter    : 如果 True，则不做“本体”过滤，搜索结果全部下载
+      cookie       : 可选 Cookie 字符串（否则使用 COOKIE_STR 或环境变量 FLK_COOKIE）
+      auto_txt     : 是否对 docx 自动导出 txt，默认 True
+      latest_only  : 是否只保留“同名法规”的最新版本（按标题归一化+公布日期比较），默认 True
+
+    返回：
+      列表，每个元素为：
+        {
+          "id":    <bbbs>,
+          "title": <标题>,
+          "gbrq":  <公布日期>,
+          "doc_path": <下载到的 docx/pdf 路径或空字符串>,
+          "txt_path": <生成的 txt 路径或空字符串>,
+        }
+    """
+    return list(iter_crawl_laws(
+        keyword=keyword,
+        max_pages=max_pages,
+        save_dir=save_dir,
+        exclude_words=exclude_words,
+        no_filter=no_filter,
+        cookie=cookie,
+        auto_txt=auto_txt,
+        latest_only=latest_only,
+    ))
 
 
 # ----------------- 命令行入口 -----------------
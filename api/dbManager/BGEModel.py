@@ -2,53 +2,132 @@
 向量化模块 - 使用BGE模型
 """
 import config
-import torch
+import os
 import numpy as np
-from typing import List, Union
-from transformers import AutoTokenizer, AutoModel
-from sentence_transformers import SentenceTransformer
+from typing import Callable, List, Union
+# torch / transformers / sentence-transformers 只在torch后端加载模型时导入，
+# 使用remote（共享向量化服务）或onnx后端的进程不加载PyTorch
+from api.dbManager.EmbeddingCache import EmbeddingCache
+from api.dbManager.EmbeddingScheduler import EmbeddingScheduler
+
+
+def length_sorted_order(texts: List[str]) -> List[int]:
+    """按文本长度升序排列的下标，相邻文本长度接近，分批时减少padding"""
+    return sorted(range(len(texts)), key=lambda idx: len(texts[idx]))
+
+
+def length_sorted_batches(texts: List[str], batch_size: int) -> List[List[int]]:
+    """
+    按文本长度排序后分批，使同一批内长度接近、减少padding
+    
+    Args:
+        texts: 文本列表
+        batch_size: 批大小
+        
+    Returns:
+        每批文本在原列表中的下标
+    """
+    order = length_sorted_order(texts)
+    return [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+
 
 class BGEModel:
     """BGE模型封装类"""
     
-    def __init__(self, model_name: str = None, device: str = None):
+    def __init__(self, model_name: str = None, device: str = None, backend: str = None,
+                 cache_size: int = None, onnx_model_dir: str = None, onnx_quantized: bool = None):
         """
         初始化BGE模型
         
         Args:
             model_name: 模型名称
             device: 设备 (cuda/cpu)
+            backend: 推理后端 (torch/onnx/remote)，默认在配置了 EMBEDDING_SERVICE_URL 时
+                     使用remote（转发到本机共享的向量化服务），否则使用 config.BGE_BACKEND
+            cache_size: 查询向量缓存条目数，0表示不缓存，默认使用 config.EMBEDDING_CACHE_SIZE
+            onnx_model_dir: ONNX模型目录（仅onnx后端），默认使用 config.ONNX_MODEL_DIR
+            onnx_quantized: 是否加载int8量化模型（仅onnx后端），默认使用 config.ONNX_QUANTIZED
         """
         self.model_name = model_name or config.BGE_MODEL_NAME
+        self.backend = backend or ("remote" if config.EMBEDDING_SERVICE_URL else config.BGE_BACKEND)
+        self.use_sentence_transformer = False
         
-        # 自动选择设备
-        if device is None:
-            self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        else:
-            self.device = device
-            
-        print(f"正在加载BGE模型: {self.model_name} 到设备: {self.device}")
-        
-        # 加载模型和tokenizer
-        try:
-            self.model = SentenceTransformer(self.model_name, device=self.device)
-            self.use_sentence_transformer = True
-        except:
-            # 使用transformers方式加载
-            self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
-            self.model = AutoModel.from_pretrained(self.model_name).to(self.device)
-            self.use_sentence_transformer = False
+        if self.backend == "remote":
+            # 不在本进程加载模型，编码请求转发到 EmbeddingService
+            from api.dbManager.EmbeddingService import EmbeddingClient
+            self.device = "remote"
+            self.model = EmbeddingClient()
+            print(f"BGE模型使用共享向量化服务: {self.model.url}")
+        elif self.backend == "onnx":
+            # ONNX Runtime 后端（CPU），模型需先通过 export_onnx_model 命令导出
+            from api.dbManager.OnnxBackend import OnnxEmbeddingBackend
+            self.device = "cpu"
+            self.model = OnnxEmbeddingBackend(model_dir=onnx_model_dir, quantized=onnx_quantized)
+        elif self.backend == "torch":
+            import torch
+            from sentence_transformers import SentenceTransformer
+
+            # 自动选择设备
+            if device is None:
+                self.device = "cuda" if torch.cuda.is_available() else "cpu"
+            else:
+                self.device = device
+                
+            print(f"正在加载BGE模型: {self.model_name} 到设备: {self.device}")
             
-        self.model.eval()
+            # 加载模型和tokenizer
+            try:
+                self.model = SentenceTransformer(self.model_name, device=self.device)
+                self.use_sentence_transformer = True
+            except:
+                # 使用transformers方式加载
+                from transformers import AutoModel, AutoTokenizer
+                self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+                self.model = AutoModel.from_pretrained(self.model_name).to(self.device)
+                self.use_sentence_transformer = False
+                
+            self.model.eval()
+        else:
+            raise ValueError(f"未知的推理后端: {self.backend}")
+        
+        # 并发单条查询的微批调度
+        self.scheduler = None
+        if config.EMBEDDING_MICROBATCH_ENABLED:
+            self.scheduler = EmbeddingScheduler(
+                self._encode_uncached,
+                max_batch_size=config.EMBEDDING_MICROBATCH_MAX_SIZE,
+                max_wait_ms=config.EMBEDDING_MICROBATCH_MAX_WAIT_MS
+            )
+        
+        # 不同后端/量化方式的向量略有差异，缓存按后端区分
+        self.cache_key_prefix = f"{self.model_name}:{self.backend}"
+        if self.backend == "onnx":
+            self.cache_key_prefix += f":{os.path.basename(self.model.model_path)}"
+        # float16缓存与float32缓存的向量格式不同，同样按前缀区分
+        if config.EMBEDDING_CACHE_FLOAT16:
+            self.cache_key_prefix += ":f16"
+        
+        # 查询向量缓存
+        cache_size = config.EMBEDDING_CACHE_SIZE if cache_size is None else cache_size
+        self.cache = None
+        if cache_size > 0:
+            self.cache = EmbeddingCache(
+                max_size=cache_size,
+                ttl=config.EMBEDDING_CACHE_TTL,
+                disk_path=config.EMBEDDING_CACHE_DISK_PATH,
+                disk_max_size=config.EMBEDDING_CACHE_DISK_MAX_SIZE,
+                float16=config.EMBEDDING_CACHE_FLOAT16
+            )
         
     def encode(self, texts: Union[str, List[str]], 
-               normalize: bool = None) -> np.ndarray:
+               normalize: bool = None, use_cache: bool = True) -> np.ndarray:
         """
         编码文本为向量
         
         Args:
             texts: 文本或文本列表
             normalize: 是否归一化
+            use_cache: 是否使用查询向量缓存
             
         Returns:
             向量数组
@@ -59,7 +138,49 @@ class BGEModel:
         if is_single_text:
             texts = [texts]
             
-        if self.use_sentence_transformer:
+        if use_cache and self.cache is not None:
+            embeddings = self._encode_with_cache(texts, normalize)
+        else:
+            embeddings = self._compute(texts, normalize)
+        
+        if is_single_text:
+            return embeddings[0]
+        
+        return embeddings
+    
+    def _encode_with_cache(self, texts: List[str], normalize: bool) -> np.ndarray:
+        """先查缓存，只对未命中的文本执行前向计算"""
+        cached = [self.cache.get(text, self.cache_key_prefix, normalize) for text in texts]
+        missing = [i for i, vector in enumerate(cached) if vector is None]
+        
+        if missing:
+            computed = self._compute([texts[i] for i in missing], normalize)
+            for i, vector in zip(missing, computed):
+                self.cache.set(texts[i], self.cache_key_prefix, normalize, vector)
+                cached[i] = vector
+                
+        return np.vstack(cached)
+    
+    def _compute(self, texts: List[str], normalize: bool) -> np.ndarray:
+        """单条请求交给微批调度器与并发请求合并计算，批量请求直接计算"""
+        if self.scheduler is not None and len(texts) == 1:
+            return self.scheduler.encode(texts, normalize)
+        return self._encode_uncached(texts, normalize)
+    
+    def _encode_uncached(self, texts: List[str], normalize: bool) -> np.ndarray:
+        """
+        执行模型前向计算
+        
+        Args:
+            texts: 文本列表
+            normalize: 是否归一化
+            
+        Returns:
+            向量数组 (文本数, 向量维度)
+        """
+        if self.backend in ("onnx", "remote"):
+            embeddings = self.model.encode(texts, normalize=normalize)
+        elif self.use_sentence_transformer:
             # 使用sentence-transformers接口
             embeddings = self.model.encode(
                 texts, 
@@ -68,6 +189,8 @@ class BGEModel:
             )
         else:
             # 使用transformers接口
+            import torch
+
             encoded_input = self.tokenizer(
                 texts, 
                 padding=True, 
@@ -86,34 +209,55 @@ class BGEModel:
                 
             embeddings = embeddings.cpu().numpy()
         
-        if is_single_text:
-            if isinstance(embeddings, np.ndarray):
-                return np.squeeze(embeddings, axis=0)
-            if isinstance(embeddings, list) and embeddings and isinstance(embeddings[0], (list, np.ndarray)):
-                return embeddings[0]
-            return embeddings
-        
-        return embeddings
+        return np.asarray(embeddings, dtype=np.float32)
     
-    def encode_batch(self, texts: List[str], batch_size: int = 32, **kwargs):
+    def encode_batch(self, texts: List[str], batch_size: int = None,
+                     before_batch: Callable[[], None] = None, **kwargs):
         """
         批量编码文本
         
+        先按文本长度排序再分批，使同一批内长度接近、减少padding，
+        编码完成后按原顺序返回。
+        
         Args:
             texts: 文本列表
-            batch_size: 批大小
+            batch_size: 批大小，默认使用 config.EMBEDDING_BATCH_SIZE
+            before_batch: 每批编码前调用的回调（如检查向量库是否已迁移）
             
         Returns:
-            向量列表
+            向量数组，与texts顺序一致
         """
-        all_embeddings = []
+        batch_size = batch_size or config.EMBEDDING_BATCH_SIZE
+        # 入库文本一般不会重复查询，默认不写入查询缓存
+        kwargs.setdefault("use_cache", False)
+        if not texts:
+            return np.empty((0, self.get_embedding_dim()), dtype=np.float32)
+        
+        all_embeddings = None
         
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i:i + batch_size]
-            embeddings = self.encode(batch, **kwargs)
-            all_embeddings.append(embeddings)
+        for batch_indices in length_sorted_batches(texts, batch_size):
+            if before_batch is not None:
+                before_batch()
+            batch = [texts[idx] for idx in batch_indices]
+            embeddings = np.asarray(self.encode(batch, **kwargs), dtype=np.float32)
+            if all_embeddings is None:
+                all_embeddings = np.empty((len(texts), embeddings.shape[1]), dtype=np.float32)
+            all_embeddings[batch_indices] = embeddings
             
-        return np.vstack(all_embeddings)
+        return all_embeddings
+    
+    def cache_stats(self) -> dict:
+        """查询向量缓存命中统计"""
+        return self.cache.stats() if self.cache is not None else {}
+    
+    def scheduler_stats(self) -> dict:
+        """微批调度器队列深度与批大小统计"""
+        return self.scheduler.stats() if self.scheduler is not None else {}
+
+    def close(self):
+        """停止微批调度线程（已提交的请求处理完后退出），使模型可以被释放"""
+        if self.scheduler is not None:
+            self.scheduler.close()
     
     def get_embedding_dim(self) -> int:
         """获取向量维度"""
@@ -0,0 +1,125 @@
+"""
+重排序模块 - 使用bge-reranker交叉编码器对首轮检索的候选重新打分
+"""
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+import config
+from api.dbManager.BGEModel import length_sorted_order
+
+
+class BGEReranker:
+    """bge-reranker 交叉编码器封装类"""
+
+    def __init__(self, model_name: str = None, device: str = None):
+        """
+        加载重排序模型
+
+        Args:
+            model_name: 模型名称或路径，默认使用 config.RERANK_MODEL_NAME
+            device: 设备 (cuda/cpu)
+        """
+        import torch
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+        self.model_name = model_name or config.RERANK_MODEL_NAME
+        self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+        print(f"正在加载重排序模型: {self.model_name} 到设备: {self.device}")
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        self.model = AutoModelForSequenceClassification.from_pretrained(self.model_name).to(self.device)
+        self.model.eval()
+        self._torch = torch
+        # 已观测到的单位计算量耗时（秒/字符，按padding后的长度计），用于按剩余预算确定批大小
+        self._seconds_per_char = None
+
+    @staticmethod
+    def _batch_cost(query: str, passages: List[str]) -> int:
+        """批次计算量估计：条数 × 批内最长的（查询 + 段落）长度"""
+        longest = max(len(query) + len(passage) for passage in passages)
+        return len(passages) * min(longest, config.RERANK_MAX_LENGTH)
+
+    def _score_batch(self, query: str, passages: List[str]) -> np.ndarray:
+        encoded_input = self.tokenizer(
+            [query] * len(passages),
+            passages,
+            padding=True,
+            truncation="only_second",
+            max_length=config.RERANK_MAX_LENGTH,
+            return_tensors="pt"
+        ).to(self.device)
+        with self._torch.no_grad():
+            logits = self.model(**encoded_input).logits.view(-1).float()
+        # sigmoid 映射到 0~1，便于设置阈值
+        return self._torch.sigmoid(logits).cpu().numpy()
+
+    def score(self, query: str, passages: List[str], batch_size: int = None,
+              deadline: float = None) -> Optional[np.ndarray]:
+        """
+        计算查询与各段落的相关性得分
+
+        与 BGEModel.encode_batch 一样按长度排序分批。有截止时间时，每批开始前按已观测的
+        耗时估计剩余候选能否在预算内完成，不能则直接放弃；并缩小批大小使该批在剩余时间内完成。
+
+        Args:
+            query: 查询文本
+            passages: 候选段落
+            batch_size: 批大小，默认使用 config.RERANK_BATCH_SIZE
+            deadline: time.monotonic() 截止时间，为空表示不限时
+
+        Returns:
+            得分数组（与passages顺序一致），预计或实际超出时间预算时返回None
+        """
+        batch_size = batch_size or config.RERANK_BATCH_SIZE
+        order = length_sorted_order(passages)
+        scores = np.zeros(len(passages), dtype=np.float32)
+        start = 0
+        while start < len(order):
+            batch_indices = order[start:start + batch_size]
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                seconds_per_char = self._seconds_per_char
+                if seconds_per_char:
+                    rest = [passages[idx] for idx in order[start:]]
+                    if sum(self._batch_cost(query, [passage]) for passage in rest) * seconds_per_char > remaining:
+                        return None
+                    while (len(batch_indices) > 1 and seconds_per_char * self._batch_cost(
+                            query, [passages[idx] for idx in batch_indices]) > remaining):
+                        batch_indices = batch_indices[:len(batch_indices) // 2]
+
+            batch = [passages[idx] for idx in batch_indices]
+            batch_start = time.monotonic()
+            scores[batch_indices] = self._score_batch(query, batch)
+            observed = (time.monotonic() - batch_start) / self._batch_cost(query, batch)
+            self._seconds_per_char = (
+                observed if self._seconds_per_char is None
+                else 0.5 * self._seconds_per_char + 0.5 * observed
+            )
+            start += len(batch_indices)
+
+        return scores
+
+    def rerank(self, query: str, passages: List[str], budget_ms: float = None) -> Optional[List[Tuple[int, float]]]:
+        """
+        对候选段落重排序
+
+        Args:
+            query: 查询文本
+            passages: 首轮检索得到的候选段落
+            budget_ms: 时间预算（毫秒），默认使用 config.RERANK_TIME_BUDGET_MS，0表示不限时
+
+        Returns:
+            按得分降序的 (候选下标, 得分) 列表，超出时间预算时返回None
+        """
+        if not passages:
+            return []
+        budget_ms = config.RERANK_TIME_BUDGET_MS if budget_ms is None else budget_ms
+        deadline = time.monotonic() + budget_ms / 1000 if budget_ms else None
+        scores = self.score(query, passages, deadline=deadline)
+        if scores is None:
+            return None
+        order = np.argsort(-scores, kind="stable")
+        return [(int(idx), float(scores[idx])) for idx in order]
@@ -0,0 +1,185 @@
+"""
+稀疏检索索引 - 基于jieba分词的BM25倒排索引，持久化在本地SQLite中
+"""
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Set, Tuple
+
+import config
+from api.dbManager.SQLiteReaders import SQLiteReaders
+
+# 只保留包含文字或数字的词，丢弃标点与空白
+_TOKEN_PATTERN = re.compile(r"\w", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    jieba搜索引擎模式分词（长词再切分出短词，提升召回）
+
+    Args:
+        text: 文本
+
+    Returns:
+        词列表
+    """
+    import jieba
+
+    return [token.lower() for token in jieba.lcut_for_search(text or "")
+            if _TOKEN_PATTERN.search(token)]
+
+
+class BM25Index:
+    """本地BM25倒排索引：集合名 + 词 → {条目ID: 词频}"""
+
+    def __init__(self, path: str, k1: float = None, b: float = None):
+        """
+        初始化BM25索引
+
+        Args:
+            path: SQLite文件路径
+            k1: 词频饱和参数，默认使用 config.BM25_K1
+            b: 文档长度归一化参数，默认使用 config.BM25_B
+        """
+        self.path = path
+        self.k1 = config.BM25_K1 if k1 is None else k1
+        self.b = config.BM25_B if b is None else b
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # 写入串行：单一写连接 + 锁
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS docs ("
+            "collection TEXT NOT NULL, item_id TEXT NOT NULL, length INTEGER NOT NULL, "
+            "PRIMARY KEY (collection, item_id))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS postings ("
+            "collection TEXT NOT NULL, term TEXT NOT NULL, item_id TEXT NOT NULL, "
+            "tf INTEGER NOT NULL, PRIMARY KEY (collection, term, item_id))"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_bm25_postings_item ON postings (collection, item_id)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS built (collection TEXT PRIMARY KEY)")
+        self._conn.commit()
+        # 检索走按线程分配的读连接，并发检索之间以及与写入之间互不阻塞
+        self._readers = SQLiteReaders(path)
+
+    def _delete(self, collection: str, ids: List[str]):
+        rows = [(collection, item_id) for item_id in ids]
+        self._conn.executemany("DELETE FROM postings WHERE collection = ? AND item_id = ?", rows)
+        self._conn.executemany("DELETE FROM docs WHERE collection = ? AND item_id = ?", rows)
+
+    def _insert(self, collection: str, ids: List[str], documents: List[str]):
+        doc_rows, posting_rows = [], []
+        for item_id, document in zip(ids, documents):
+            counts = Counter(tokenize(document))
+            doc_rows.append((collection, item_id, sum(counts.values())))
+            posting_rows.extend((collection, term, item_id, tf) for term, tf in counts.items())
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO docs (collection, item_id, length) VALUES (?, ?, ?)", doc_rows
+        )
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO postings (collection, term, item_id, tf) VALUES (?, ?, ?, ?)",
+            posting_rows
+        )
+
+    def update(self, collection: str, ids: List[str], documents: List[str]):
+        """
+        写入（覆盖）条目的索引
+
+        Args:
+            collection: 集合名称
+            ids: 条目ID列表
+            documents: 文档内容列表
+        """
+        with self._lock:
+            with self._conn:
+                self._delete(collection, ids)
+                self._insert(collection, ids, documents)
+
+    def remove(self, collection: str, ids: List[str]):
+        """删除条目的索引"""
+        with self._lock:
+            with self._conn:
+                self._delete(collection, ids)
+
+    def is_built(self, collection: str) -> bool:
+        """集合是否已完成全量构建"""
+        return self._readers.get().execute(
+            "SELECT 1 FROM built WHERE collection = ?", (collection,)
+        ).fetchone() is not None
+
+    def rebuild(self, collection: str, pages: Iterable[Dict[str, list]]):
+        """
+        全量重建集合的索引
+
+        Args:
+            collection: 集合名称
+            pages: 分页读取的集合数据，每页包含 ids 与 documents
+        """
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM postings WHERE collection = ?", (collection,))
+                self._conn.execute("DELETE FROM docs WHERE collection = ?", (collection,))
+                for page in pages:
+                    self._insert(collection, page["ids"], page["documents"])
+                self._conn.execute("INSERT OR REPLACE INTO built (collection) VALUES (?)", (collection,))
+
+    def search(self, collection: str, query: str, n_results: int = 10,
+               candidate_ids: Set[str] = None) -> List[Tuple[str, float]]:
+        """
+        BM25检索
+
+        Args:
+            collection: 集合名称
+            query: 查询文本
+            n_results: 返回结果数量
+            candidate_ids: 只在这些条目中检索（如元数据过滤后的候选集），为空表示不限制
+
+        Returns:
+            [(条目ID, BM25得分)]，按得分降序
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or candidate_ids is not None and not candidate_ids:
+            return []
+
+        conn = self._readers.get()
+        # 统计与倒排表在同一读事务内读取，避免与并发写入交错
+        with conn:
+            conn.execute("BEGIN")
+            doc_count, avg_length = conn.execute(
+                "SELECT COUNT(*), AVG(length) FROM docs WHERE collection = ?", (collection,)
+            ).fetchone()
+            if not doc_count:
+                return []
+            scores = Counter()
+            for term in terms:
+                rows = conn.execute(
+                    "SELECT p.item_id, p.tf, d.length FROM postings p "
+                    "JOIN docs d ON d.collection = p.collection AND d.item_id = p.item_id "
+                    "WHERE p.collection = ? AND p.term = ?",
+                    (collection, term)
+                ).fetchall()
+                if not rows:
+                    continue
+                idf = math.log(1 + (doc_count - len(rows) + 0.5) / (len(rows) + 0.5))
+                for item_id, tf, length in rows:
+                    if candidate_ids is not None and item_id not in candidate_ids:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * length / (avg_length or 1))
+                    scores[item_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores.most_common(n_results)
+
+    def close(self):
+        """关闭写连接与所有读连接"""
+        self._readers.close()
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,158 @@
+"""
+向量降维模块 - 在语料向量上拟合线性投影，把1024维BGE向量压缩到更低维度
+"""
+import os
+from typing import Optional
+
+import numpy as np
+
+import config
+
+
+class DimReducer:
+    """
+    基于截断SVD的线性降维
+
+    投影矩阵取语料向量（不去均值）的前 dim 个右奇异向量，使降维后向量的内积
+    在最小二乘意义上最接近原向量内积；降维后重新归一化，余弦相似度与
+    SIMILARITY_THRESHOLD 的含义保持不变。
+    """
+
+    def __init__(self, components: np.ndarray, explained_variance: float = None):
+        """
+        Args:
+            components: 投影矩阵 (目标维度, 原始维度)
+            explained_variance: 保留的能量占比（0~1）
+        """
+        self.components = np.asarray(components, dtype=np.float32)
+        self.explained_variance = explained_variance
+
+    @property
+    def input_dim(self) -> int:
+        return self.components.shape[1]
+
+    @property
+    def output_dim(self) -> int:
+        return self.components.shape[0]
+
+    @classmethod
+    def fit(cls, embeddings: np.ndarray, dim: int) -> "DimReducer":
+        """
+        在语料向量上拟合投影矩阵
+
+        Args:
+            embeddings: 语料向量 (条数, 原始维度)
+            dim: 目标维度
+
+        Returns:
+            DimReducer实例
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float64)
+        if dim >= embeddings.shape[1]:
+            raise ValueError(f"目标维度 {dim} 必须小于原始维度 {embeddings.shape[1]}")
+        if dim > embeddings.shape[0]:
+            raise ValueError(f"拟合样本数 {embeddings.shape[0]} 少于目标维度 {dim}")
+        _, singular_values, vt = np.linalg.svd(embeddings, full_matrices=False)
+        energy = singular_values ** 2
+        return cls(vt[:dim], float(energy[:dim].sum() / energy.sum()))
+
+    def transform(self, embeddings: np.ndarray) -> np.ndarray:
+        """
+        降维（单条或批量）
+
+        Args:
+            embeddings: 向量 (原始维度,) 或 (条数, 原始维度)
+
+        Returns:
+            降维后的向量，形状与输入对应
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if embeddings.shape[-1] != self.input_dim:
+            raise ValueError(
+                f"向量维度 {embeddings.shape[-1]} 与降维矩阵的输入维度 {self.input_dim} 不一致"
+            )
+        reduced = embeddings @ self.components.T
+        if config.NORMALIZE_EMBEDDINGS:
+            norms = np.linalg.norm(reduced, axis=-1, keepdims=True)
+            reduced = reduced / np.clip(norms, 1e-12, None)
+        return reduced.astype(np.float32)
+
+    def save(self, path: str):
+        """保存投影矩阵"""
+        np.savez(path, components=self.components,
+                 explained_variance=np.float64(self.explained_variance or 0.0))
+
+    @classmethod
+    def load(cls, path: str) -> Optional["DimReducer"]:
+        """
+        加载投影矩阵
+
+        Args:
+            path: 文件路径
+
+        Returns:
+            DimReducer实例，文件不存在时返回None
+        """
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            return cls(data["components"], float(data["explained_variance"]))
+
+
+def _top_k(corpus: np.ndarray, queries: np.ndarray, top_k: int, exclude: np.ndarray) -> np.ndarray:
+    """按内积取每个查询的top-k下标，排除查询自身"""
+    scores = queries.astype(np.float32) @ corpus.astype(np.float32).T
+    scores[np.arange(len(queries)), exclude] = -np.inf
+    top = np.argpartition(-scores, top_k, axis=1)[:, :top_k]
+    return top
+
+
+def benchmark_recall(reducer: DimReducer, corpus: np.ndarray, num_queries: int = None,
+                     top_k: int = None, float16: bool = True, seed: int = 0) -> dict:
+    """
+    比较降维前后的检索结果，用于迁移前的校验
+
+    从库中随机抽取向量作为查询，分别用全维向量与降维向量做精确检索，
+    统计降维结果top-k与全维结果top-k的平均重合率。
+
+    Args:
+        reducer: 降维器
+        corpus: 全维语料向量 (条数, 原始维度)
+        num_queries: 查询数，默认使用 config.DIM_REDUCTION_BENCHMARK_QUERIES
+        top_k: 对比的结果数，默认使用 config.DIM_REDUCTION_BENCHMARK_TOP_K
+        float16: 降维向量是否按float16保存后再计算（评估半精度存储的影响）
+        seed: 随机种子
+
+    Returns:
+        召回对比统计
+    """
+    num_queries = num_queries or config.DIM_REDUCTION_BENCHMARK_QUERIES
+    top_k = top_k or config.DIM_REDUCTION_BENCHMARK_TOP_K
+    corpus = np.asarray(corpus, dtype=np.float32)
+    top_k = min(top_k, len(corpus) - 1)
+    if top_k < 1:
+        raise ValueError("语料太少，无法比较召回")
+
+    rng = np.random.default_rng(seed)
+    query_ids = rng.choice(len(corpus), size=min(num_queries, len(corpus)), replace=False)
+    reduced = reducer.transform(corpus)
+    if float16:
+        reduced = reduced.astype(np.float16)
+
+    full_top = _top_k(corpus, corpus[query_ids], top_k, query_ids)
+    reduced_top = _top_k(reduced, reduced[query_ids], top_k, query_ids)
+    overlaps = [len(set(a) & set(b)) / top_k for a, b in zip(full_top, reduced_top)]
+
+    bytes_per_value = 2 if float16 else 4
+    return {
+        "queries": len(query_ids),
+        "top_k": top_k,
+        "input_dim": reducer.input_dim,
+        "output_dim": reducer.output_dim,
+        "explained_variance": reducer.explained_variance,
+        "mean_recall": float(np.mean(overlaps)),
+        "min_recall": float(np.min(overlaps)),
+        "bytes_per_vector_full": reducer.input_dim * 4,
+        "bytes_per_vector_reduced": reducer.output_dim * bytes_per_value,
+        "passed": bool(np.mean(overlaps) >= config.DIM_REDUCTION_MIN_RECALL),
+    }
@@ -0,0 +1,233 @@
+"""
+查询向量缓存 - 内存LRU（支持TTL）+ 可选SQLite磁盘层
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Optional
+
+import numpy as np
+
+
+class LRUTTLCache:
+    """线程安全的LRU缓存，支持按条数与过期时间淘汰"""
+
+    def __init__(self, max_size: int = 1024, ttl: float = None):
+        """
+        初始化缓存
+
+        Args:
+            max_size: 最大条目数
+            ttl: 过期时间（秒），为空或0表示不过期
+        """
+        self.max_size = max_size
+        self.ttl = ttl or None
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key) -> Optional[Any]:
+        """读取缓存，未命中或已过期返回None"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            expires_at, value = item
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """写入缓存，超出容量时淘汰最久未使用的条目"""
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        """清空缓存与计数"""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        """命中统计"""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+class EmbeddingCache:
+    """查询向量缓存，键为 归一化文本 + 模型名 + 是否归一化"""
+
+    # 磁盘层每写入多少条执行一次过期/超量清理
+    PRUNE_INTERVAL = 256
+
+    def __init__(self, max_size: int = 2048, ttl: float = None, disk_path: str = None,
+                 disk_max_size: int = 100000, float16: bool = False):
+        """
+        初始化向量缓存
+
+        Args:
+            max_size: 内存层最大条目数
+            ttl: 过期时间（秒），同时作用于内存层与磁盘层
+            disk_path: SQLite磁盘层文件路径，为空时只使用内存层
+            disk_max_size: 磁盘层最大条目数
+            float16: 是否以float16保存向量（内存与磁盘占用减半，读取时转回float32）
+        """
+        self.memory = LRUTTLCache(max_size=max_size, ttl=ttl)
+        self.dtype = np.float16 if float16 else np.float32
+        self.ttl = ttl or None
+        self.disk_path = disk_path
+        self.disk_max_size = disk_max_size
+        self.disk_hits = 0
+        self._disk_writes = 0
+        self._disk_lock = threading.Lock()
+        self._conn = None
+        if disk_path:
+            self._open_disk(disk_path)
+
+    def _open_disk(self, disk_path: str):
+        """打开（或创建）磁盘层数据库"""
+        directory = os.path.dirname(disk_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(disk_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_created_at ON embeddings (created_at)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        """文本归一化：全半角统一、去首尾空白、合并连续空白"""
+        text = unicodedata.normalize("NFKC", text)
+        return re.sub(r"\s+", " ", text).strip()
+
+    @classmethod
+    def make_key(cls, text: str, model_name: str, normalize: bool) -> str:
+        """生成缓存键"""
+        raw = f"{model_name}\x00{int(bool(normalize))}\x00{cls.normalize_text(text)}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def get(self, text: str, model_name: str, normalize: bool) -> Optional[np.ndarray]:
+        """
+        读取缓存向量
+
+        Args:
+            text: 原始文本
+            model_name: 模型名称
+            normalize: 是否归一化
+
+        Returns:
+            向量（只读），未命中返回None
+        """
+        key = self.make_key(text, model_name, normalize)
+        vector = self.memory.get(key)
+        if vector is not None or self._conn is None:
+            return self._to_float32(vector)
+
+        with self._disk_lock:
+            row = self._conn.execute(
+                "SELECT vector, created_at FROM embeddings WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        blob, created_at = row
+        if self.ttl and created_at + self.ttl < time.time():
+            return None
+
+        vector = np.frombuffer(blob, dtype=self.dtype)
+        self.disk_hits += 1
+        self.memory.set(key, vector)
+        return self._to_float32(vector)
+
+    def _to_float32(self, vector: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        """float16保存的向量转回float32（只读）"""
+        if vector is None or vector.dtype == np.float32:
+            return vector
+        vector = vector.astype(np.float32)
+        vector.setflags(write=False)
+        return vector
+
+    def set(self, text: str, model_name: str, normalize: bool, vector: np.ndarray):
+        """
+        写入缓存向量
+
+        Args:
+            text: 原始文本
+            model_name: 模型名称
+            normalize: 是否归一化
+            vector: 向量
+        """
+        key = self.make_key(text, model_name, normalize)
+        vector = np.array(vector, dtype=self.dtype)
+        vector.setflags(write=False)
+        self.memory.set(key, vector)
+
+        if self._conn is not None:
+            with self._disk_lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO embeddings (key, vector, created_at) VALUES (?, ?, ?)",
+                    (key, vector.tobytes(), time.time())
+                )
+                self._disk_writes += 1
+                if self._disk_writes % self.PRUNE_INTERVAL == 0:
+                    self._prune_disk()
+                self._conn.commit()
+
+    def _prune_disk(self):
+        """删除磁盘层中过期及超出容量的最旧条目（调用方需持有 _disk_lock）"""
+        if self.ttl:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE created_at < ?", (time.time() - self.ttl,)
+            )
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN ("
+            "SELECT key FROM embeddings ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.disk_max_size,)
+        )
+
+    def clear(self):
+        """清空内存层与磁盘层"""
+        self.memory.clear()
+        self.disk_hits = 0
+        if self._conn is not None:
+            with self._disk_lock:
+                self._conn.execute("DELETE FROM embeddings")
+                self._conn.commit()
+
+    def stats(self) -> dict:
+        """命中统计"""
+        stats = self.memory.stats()
+        stats["disk_hits"] = self.disk_hits
+        stats["disk_enabled"] = self._conn is not None
+        return stats
@@ -0,0 +1,148 @@
+"""
+向量化微批调度器 - 将并发的单条编码请求合并为一次批量前向计算
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List
+
+import numpy as np
+
+# 放入队列表示停止：之前提交的请求处理完后工作线程退出
+_STOP = object()
+
+
+class EmbeddingScheduler:
+    """
+    进程内向量化调度器
+
+    调用方提交文本后得到Future；后台线程在 max_wait_ms 内尽量收集更多请求
+    （最多 max_batch_size 条），合并成一个padding后的批次执行，再把结果分发给各调用方。
+    """
+
+    def __init__(self, encode_fn: Callable[[List[str], bool], np.ndarray],
+                 max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        """
+        初始化调度器
+
+        Args:
+            encode_fn: 实际执行批量编码的函数 (texts, normalize) -> 向量数组
+            max_batch_size: 单批最大文本数
+            max_wait_ms: 收集请求的最长等待时间（毫秒）
+        """
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._requests = 0
+        self._batches = 0
+        self._max_batch_seen = 0
+        self._closed = False
+        self._submit_lock = threading.Lock()
+        self._worker = threading.Thread(target=self._run, name="embedding-scheduler", daemon=True)
+        self._worker.start()
+
+    def submit(self, text: str, normalize: bool) -> Future:
+        """
+        提交单条编码请求
+
+        Args:
+            text: 文本
+            normalize: 是否归一化
+
+        Returns:
+            结果为向量的Future
+        """
+        future = Future()
+        with self._submit_lock:
+            if self._closed:
+                raise RuntimeError("向量化调度器已关闭")
+            self._queue.put((text, normalize, future))
+        return future
+
+    def encode(self, texts: List[str], normalize: bool) -> np.ndarray:
+        """提交多条文本并等待全部结果"""
+        futures = [self.submit(text, normalize) for text in texts]
+        return np.vstack([future.result() for future in futures])
+
+    def _collect_batch(self):
+        """
+        阻塞等待第一条请求，然后在等待窗口内继续收集
+
+        Returns:
+            (请求列表, 是否收到停止信号)
+        """
+        item = self._queue.get()
+        if item is _STOP:
+            return [], True
+        batch = [item]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        while True:
+            batch, stop = self._collect_batch()
+            if batch:
+                self._run_batch(batch)
+            if stop:
+                return
+
+    def _run_batch(self, batch: list):
+        """执行一个批次并把结果分发给各调用方"""
+        with self._stats_lock:
+            self._requests += len(batch)
+            self._batches += 1
+            self._max_batch_seen = max(self._max_batch_seen, len(batch))
+
+        # 归一化参数不同的请求分开计算
+        groups = {}
+        for text, normalize, future in batch:
+            groups.setdefault(normalize, []).append((text, future))
+
+        for normalize, items in groups.items():
+            try:
+                embeddings = self.encode_fn([text for text, _ in items], normalize)
+                for (_, future), vector in zip(items, embeddings):
+                    future.set_result(vector)
+            except Exception as e:
+                for _, future in items:
+                    future.set_exception(e)
+
+    def close(self, timeout: float = None):
+        """
+        停止调度器：不再接受新请求，已提交的请求处理完后工作线程退出
+
+        Args:
+            timeout: 等待工作线程退出的最长时间（秒），为空表示一直等待
+        """
+        with self._submit_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        if threading.current_thread() is not self._worker:
+            self._worker.join(timeout)
+
+    def stats(self) -> dict:
+        """队列深度与批大小统计"""
+        with self._stats_lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "requests": self._requests,
+                "batches": self._batches,
+                "avg_batch_size": self._requests / self._batches if self._batches else 0.0,
+                "max_batch_size": self._max_batch_seen,
+            }
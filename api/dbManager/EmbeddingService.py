@@ -0,0 +1,200 @@
+"""
+独立向量化服务 - 每台机器只加载一份BGE模型，供Django与FastAPI的所有worker共享
+
+启动（Unix socket 或 本地TCP）：
+  python -m api.dbManager.EmbeddingService --bind unix:///tmp/bge-embedding.sock
+  python -m api.dbManager.EmbeddingService --bind http://127.0.0.1:8765
+
+web进程设置 EMBEDDING_SERVICE_URL 为同一地址后，BGEModel 会把编码请求转发到该服务。
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+from urllib.parse import urlparse
+
+import numpy as np
+
+import config
+
+UNIX_SCHEME = "unix://"
+
+
+# ----------------- 客户端 -----------------
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """通过Unix socket通信的HTTP连接"""
+
+    def __init__(self, socket_path: str, timeout: float = None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class EmbeddingClient:
+    """向量化服务客户端，每个线程复用一条keep-alive连接"""
+
+    def __init__(self, url: str = None, timeout: float = None):
+        """
+        初始化客户端
+
+        Args:
+            url: 服务地址，unix:///path/to.sock 或 http://host:port
+            timeout: 请求超时（秒）
+        """
+        self.url = url or config.EMBEDDING_SERVICE_URL
+        self.timeout = timeout or config.EMBEDDING_SERVICE_TIMEOUT
+        self._local = threading.local()
+
+    def _new_connection(self) -> http.client.HTTPConnection:
+        if self.url.startswith(UNIX_SCHEME):
+            return UnixHTTPConnection(self.url[len(UNIX_SCHEME):], timeout=self.timeout)
+        parsed = urlparse(self.url)
+        return http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=self.timeout)
+
+    def _request(self, method: str, path: str, body: bytes = None):
+        """发送请求，连接被服务端关闭时重连一次"""
+        for attempt in range(2):
+            conn = getattr(self._local, "conn", None)
+            if conn is None:
+                conn = self._local.conn = self._new_connection()
+            try:
+                conn.request(method, path, body=body, headers={"Content-Type": "application/json"})
+                response = conn.getresponse()
+                return response, response.read()
+            except (ConnectionError, http.client.HTTPException, OSError):
+                conn.close()
+                self._local.conn = None
+                if attempt:
+                    raise
+
+    def encode(self, texts: List[str], normalize: bool = True) -> np.ndarray:
+        """
+        编码文本为向量
+
+        Args:
+            texts: 文本列表
+            normalize: 是否归一化
+
+        Returns:
+            向量数组 (文本数, 向量维度)
+        """
+        body = json.dumps({"texts": texts, "normalize": normalize}, ensure_ascii=False).encode("utf-8")
+        response, data = self._request("POST", "/encode", body)
+        if response.status != 200:
+            raise RuntimeError(f"向量化服务返回错误 {response.status}: {data.decode('utf-8', 'replace')}")
+        rows, dim = (int(x) for x in response.getheader("X-Embedding-Shape").split(","))
+        return np.frombuffer(data, dtype=np.float32).reshape(rows, dim)
+
+    def stats(self) -> dict:
+        """服务端模型缓存与微批统计"""
+        response, data = self._request("GET", "/stats")
+        return json.loads(data)
+
+
+# ----------------- 服务端 -----------------
+
+class EmbeddingRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    model = None
+
+    def address_string(self):
+        # Unix socket 连接没有客户端地址
+        return self.client_address[0] if self.client_address else "unix"
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: dict = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, payload: dict):
+        self._send(status, json.dumps(payload, ensure_ascii=False).encode("utf-8"),
+                   "application/json; charset=utf-8")
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok", "model": self.model.model_name})
+        elif self.path == "/stats":
+            self._send_json(200, {"cache": self.model.cache_stats(),
+                                  "scheduler": self.model.scheduler_stats()})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/encode":
+            self._send_json(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length))
+            texts = payload["texts"]
+            embeddings = np.asarray(
+                self.model.encode(texts, normalize=payload.get("normalize"), use_cache=False),
+                dtype=np.float32
+            ).reshape(len(texts), -1)
+        except Exception as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        self._send(200, embeddings.tobytes(), "application/octet-stream",
+                   {"X-Embedding-Shape": f"{embeddings.shape[0]},{embeddings.shape[1]}"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(bind: str = None):
+    """
+    启动向量化服务（阻塞）
+
+    Args:
+        bind: 监听地址，unix:///path/to.sock 或 http://host:port
+    """
+    from api.dbManager.BGEModel import BGEModel
+
+    bind = bind or config.EMBEDDING_SERVICE_URL or config.EMBEDDING_SERVICE_DEFAULT_BIND
+    # 服务端始终在本进程内加载模型
+    EmbeddingRequestHandler.model = BGEModel(backend=config.BGE_BACKEND)
+
+    if bind.startswith(UNIX_SCHEME):
+        socket_path = bind[len(UNIX_SCHEME):]
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = ThreadingUnixHTTPServer(socket_path, EmbeddingRequestHandler)
+    else:
+        parsed = urlparse(bind)
+        server = ThreadingHTTPServer((parsed.hostname, parsed.port), EmbeddingRequestHandler)
+
+    print(f"✅ 向量化服务已启动: {bind}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="启动本机共享的BGE向量化服务")
+    parser.add_argument(
+        "--bind",
+        default="",
+        help="监听地址，例如 unix:///tmp/bge-embedding.sock 或 http://127.0.0.1:8765"
+    )
+    args = parser.parse_args()
+    serve(args.bind or None)
@@ -0,0 +1,150 @@
+"""
+入库清单 - 记录每个已入库分段的内容指纹，用于增量入库
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, Optional
+
+from api.dbManager.EmbeddingCache import EmbeddingCache
+
+
+def content_hash(text: str) -> str:
+    """
+    计算文本内容指纹（归一化后取sha1）
+
+    Args:
+        text: 文本
+
+    Returns:
+        十六进制指纹
+    """
+    normalized = EmbeddingCache.normalize_text(text)
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+def metadata_hash(metadata: dict) -> str:
+    """
+    计算元数据指纹（键排序后序列化取sha1）
+
+    Args:
+        metadata: 元数据
+
+    Returns:
+        十六进制指纹
+    """
+    serialized = json.dumps(metadata or {}, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(serialized.encode("utf-8")).hexdigest()
+
+
+class IngestManifest:
+    """本地入库清单：集合名 + 文档ID → {分段ID: 内容指纹}，以及文档的元数据指纹"""
+
+    def __init__(self, path: str):
+        """
+        初始化入库清单
+
+        Args:
+            path: SQLite文件路径
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS segments ("
+            "collection TEXT NOT NULL, doc_id TEXT NOT NULL, segment_id TEXT NOT NULL, "
+            "content_hash TEXT NOT NULL, PRIMARY KEY (collection, segment_id))"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_segments_doc ON segments (collection, doc_id)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "collection TEXT NOT NULL, doc_id TEXT NOT NULL, metadata_hash TEXT NOT NULL, "
+            "PRIMARY KEY (collection, doc_id))"
+        )
+        self._conn.commit()
+
+    def get(self, collection: str, doc_id: str) -> Dict[str, str]:
+        """
+        读取文档的分段指纹
+
+        Args:
+            collection: 集合名称
+            doc_id: 文档ID
+
+        Returns:
+            {分段ID: 内容指纹}，未入库时为空字典
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT segment_id, content_hash FROM segments WHERE collection = ? AND doc_id = ?",
+                (collection, doc_id)
+            ).fetchall()
+        return dict(rows)
+
+    def get_metadata_hash(self, collection: str, doc_id: str) -> Optional[str]:
+        """
+        读取文档的元数据指纹
+
+        Args:
+            collection: 集合名称
+            doc_id: 文档ID
+
+        Returns:
+            元数据指纹，未记录时返回None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT metadata_hash FROM documents WHERE collection = ? AND doc_id = ?",
+                (collection, doc_id)
+            ).fetchone()
+        return row[0] if row else None
+
+    def replace(self, collection: str, doc_id: str, segment_hashes: Dict[str, str],
+                metadata_digest: str = None):
+        """
+        用新的分段指纹整体替换文档记录
+
+        Args:
+            collection: 集合名称
+            doc_id: 文档ID
+            segment_hashes: {分段ID: 内容指纹}
+            metadata_digest: 元数据指纹，为空时删除文档的元数据记录
+        """
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "DELETE FROM segments WHERE collection = ? AND doc_id = ?",
+                    (collection, doc_id)
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO segments (collection, doc_id, segment_id, content_hash) "
+                    "VALUES (?, ?, ?, ?)",
+                    [(collection, doc_id, segment_id, digest)
+                     for segment_id, digest in segment_hashes.items()]
+                )
+                self._conn.execute(
+                    "DELETE FROM documents WHERE collection = ? AND doc_id = ?",
+                    (collection, doc_id)
+                )
+                if metadata_digest:
+                    self._conn.execute(
+                        "INSERT INTO documents (collection, doc_id, metadata_hash) VALUES (?, ?, ?)",
+                        (collection, doc_id, metadata_digest)
+                    )
+
+    def remove(self, collection: str, doc_id: str):
+        """删除文档记录"""
+        self.replace(collection, doc_id, {})
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,164 @@
+"""
+元数据倒排索引 - 元数据字段取值 → 条目ID，用于在向量检索前把过滤条件解析为候选ID集合
+"""
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional, Set
+
+import config
+from api.dbManager.SQLiteReaders import SQLiteReaders
+
+
+class MetadataIndex:
+    """本地元数据倒排索引：集合名 + 字段 + 取值 → {条目ID}"""
+
+    def __init__(self, path: str, fields: Iterable[str] = None):
+        """
+        初始化倒排索引
+
+        Args:
+            path: SQLite文件路径
+            fields: 建立索引的元数据字段，默认使用 config.METADATA_INDEX_FIELDS
+        """
+        self.path = path
+        self.fields = set(config.METADATA_INDEX_FIELDS if fields is None else fields)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # 写入串行：单一写连接 + 锁
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS postings ("
+            "collection TEXT NOT NULL, field TEXT NOT NULL, value TEXT NOT NULL, "
+            "item_id TEXT NOT NULL, PRIMARY KEY (collection, field, value, item_id))"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_postings_item ON postings (collection, item_id)"
+        )
+        # 记录已完成全量构建的集合及当时的索引字段
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS built (collection TEXT PRIMARY KEY, fields TEXT NOT NULL)"
+        )
+        self._conn.commit()
+        # 检索走按线程分配的读连接，并发检索之间以及与写入之间互不阻塞
+        self._readers = SQLiteReaders(path)
+
+    @staticmethod
+    def _encode_value(value) -> str:
+        # 区分 1 与 "1"，与Chroma的where按类型比较一致
+        return json.dumps(value, ensure_ascii=False)
+
+    def _postings(self, collection: str, ids: List[str], metadatas: List[dict]) -> list:
+        rows = []
+        for item_id, metadata in zip(ids, metadatas):
+            for field, value in (metadata or {}).items():
+                if field in self.fields and value is not None:
+                    rows.append((collection, field, self._encode_value(value), item_id))
+        return rows
+
+    def update(self, collection: str, ids: List[str], metadatas: List[dict]):
+        """
+        写入（覆盖）条目的索引
+
+        Args:
+            collection: 集合名称
+            ids: 条目ID列表
+            metadatas: 元数据列表
+        """
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "DELETE FROM postings WHERE collection = ? AND item_id = ?",
+                    [(collection, item_id) for item_id in ids]
+                )
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO postings (collection, field, value, item_id) "
+                    "VALUES (?, ?, ?, ?)",
+                    self._postings(collection, ids, metadatas)
+                )
+
+    def remove(self, collection: str, ids: List[str]):
+        """删除条目的索引"""
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "DELETE FROM postings WHERE collection = ? AND item_id = ?",
+                    [(collection, item_id) for item_id in ids]
+                )
+
+    def is_built(self, collection: str) -> bool:
+        """集合是否已按当前索引字段完成全量构建"""
+        row = self._readers.get().execute(
+            "SELECT fields FROM built WHERE collection = ?", (collection,)
+        ).fetchone()
+        return row is not None and set(json.loads(row[0])) == self.fields
+
+    def rebuild(self, collection: str, pages: Iterable[Dict[str, list]]):
+        """
+        全量重建集合的索引
+
+        Args:
+            collection: 集合名称
+            pages: 分页读取的集合数据，每页包含 ids 与 metadatas
+        """
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM postings WHERE collection = ?", (collection,))
+                self._conn.execute("DELETE FROM built WHERE collection = ?", (collection,))
+                for page in pages:
+                    self._conn.executemany(
+                        "INSERT OR IGNORE INTO postings (collection, field, value, item_id) "
+                        "VALUES (?, ?, ?, ?)",
+                        self._postings(collection, page["ids"], page["metadatas"])
+                    )
+                self._conn.execute(
+                    "INSERT INTO built (collection, fields) VALUES (?, ?)",
+                    (collection, json.dumps(sorted(self.fields)))
+                )
+
+    def candidates(self, collection: str, filter_conditions: dict) -> Optional[Set[str]]:
+        """
+        把过滤条件解析为候选ID集合（字段之间取交集，列表取值之间取并集）
+
+        Args:
+            collection: 集合名称
+            filter_conditions: 过滤条件 {字段: 取值或取值列表}
+
+        Returns:
+            候选ID集合；条件中含未建索引的字段时返回None，由调用方交给Chroma过滤
+        """
+        conditions = {key: value for key, value in (filter_conditions or {}).items()
+                      if value is not None}
+        if not conditions or not set(conditions) <= self.fields:
+            return None
+
+        result = None
+        conn = self._readers.get()
+        # 各字段在同一读事务内读取，避免与并发写入交错
+        with conn:
+            conn.execute("BEGIN")
+            for field, value in conditions.items():
+                values = value if isinstance(value, list) else [value]
+                if not values:
+                    return set()
+                placeholders = ",".join("?" * len(values))
+                rows = conn.execute(
+                    f"SELECT item_id FROM postings WHERE collection = ? AND field = ? "
+                    f"AND value IN ({placeholders})",
+                    [collection, field] + [self._encode_value(v) for v in values]
+                ).fetchall()
+                ids = {row[0] for row in rows}
+                result = ids if result is None else result & ids
+                if not result:
+                    return set()
+        return result
+
+    def close(self):
+        """关闭写连接与所有读连接"""
+        self._readers.close()
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,161 @@
+"""
+ONNX Runtime 推理后端 - 在无GPU的机器上替代PyTorch运行BGE模型
+"""
+import os
+from typing import List
+
+import numpy as np
+
+import config
+
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_QUANTIZED_MODEL_FILE = "model.int8.onnx"
+
+
+def export_onnx(model_name: str = None, output_dir: str = None,
+                quantize: bool = True, opset: int = 14) -> str:
+    """
+    将BGE模型导出为ONNX，可选int8动态量化
+
+    Args:
+        model_name: 模型名称或路径，默认使用 config.BGE_MODEL_NAME
+        output_dir: 输出目录，默认使用 config.ONNX_MODEL_DIR
+        quantize: 是否额外导出int8动态量化模型
+        opset: ONNX opset版本
+
+    Returns:
+        输出目录
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    model_name = model_name or config.BGE_MODEL_NAME
+    output_dir = output_dir or config.ONNX_MODEL_DIR
+    os.makedirs(output_dir, exist_ok=True)
+
+    print(f"正在导出ONNX模型: {model_name} -> {output_dir}")
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name)
+    model.eval()
+
+    sample = tokenizer(["合同模板导出示例"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    model_path = os.path.join(output_dir, ONNX_MODEL_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            model_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+        )
+    tokenizer.save_pretrained(output_dir)
+    print(f"✅ 已导出: {model_path}")
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantized_path = os.path.join(output_dir, ONNX_QUANTIZED_MODEL_FILE)
+        quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+        print(f"✅ 已导出int8量化模型: {quantized_path}")
+
+    return output_dir
+
+
+class OnnxEmbeddingBackend:
+    """基于onnxruntime的BGE向量化后端，使用[CLS]向量作为句子表示"""
+
+    def __init__(self, model_dir: str = None, quantized: bool = None,
+                 intra_op_threads: int = None):
+        """
+        加载ONNX模型
+
+        Args:
+            model_dir: export_onnx 的输出目录，默认使用 config.ONNX_MODEL_DIR
+            quantized: 是否加载int8量化模型，默认使用 config.ONNX_QUANTIZED
+            intra_op_threads: 算子内并行线程数，0表示由onnxruntime决定
+        """
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.model_dir = model_dir or config.ONNX_MODEL_DIR
+        quantized = config.ONNX_QUANTIZED if quantized is None else quantized
+        intra_op_threads = (
+            config.ONNX_INTRA_OP_THREADS if intra_op_threads is None else intra_op_threads
+        )
+        model_file = ONNX_QUANTIZED_MODEL_FILE if quantized else ONNX_MODEL_FILE
+        self.model_path = os.path.join(self.model_dir, model_file)
+        if not os.path.exists(self.model_path):
+            raise FileNotFoundError(
+                f"ONNX模型不存在: {self.model_path}，请先执行 python manage.py export_onnx_model"
+            )
+
+        print(f"正在加载ONNX模型: {self.model_path}")
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(
+            self.model_path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {node.name for node in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_dir)
+
+    def encode(self, texts: List[str], normalize: bool = True) -> np.ndarray:
+        """
+        编码文本为向量
+
+        Args:
+            texts: 文本列表
+            normalize: 是否归一化
+
+        Returns:
+            向量数组 (文本数, 向量维度)
+        """
+        encoded_input = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=512,
+            return_tensors="np"
+        )
+        feeds = {
+            name: value.astype(np.int64)
+            for name, value in encoded_input.items()
+            if name in self.input_names
+        }
+        last_hidden_state = self.session.run(["last_hidden_state"], feeds)[0]
+        embeddings = last_hidden_state[:, 0].astype(np.float32)
+
+        if normalize:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings = embeddings / np.clip(norms, 1e-12, None)
+        return embeddings
+
+
+def check_parity(reference_model, candidate_model, texts: List[str]) -> dict:
+    """
+    比较两个BGEModel对同一批文本的向量余弦一致性，用于切换后端前的校验
+
+    Args:
+        reference_model: 参考模型（通常为PyTorch后端）
+        candidate_model: 待验证模型（通常为ONNX后端）
+        texts: 校验文本
+
+    Returns:
+        余弦相似度统计
+    """
+    reference = reference_model.encode(texts, normalize=True, use_cache=False)
+    candidate = candidate_model.encode(texts, normalize=True, use_cache=False)
+    cosines = np.sum(reference * candidate, axis=1)
+    return {
+        "count": len(texts),
+        "min_cosine": float(cosines.min()),
+        "mean_cosine": float(cosines.mean()),
+        "passed": bool(cosines.min() >= config.ONNX_PARITY_MIN_COSINE),
+    }
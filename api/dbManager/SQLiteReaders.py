@@ -0,0 +1,42 @@
+"""
+SQLite只读连接池 - 每个线程一条读连接，WAL模式下并发读取互不阻塞，也不等待写入
+"""
+import sqlite3
+import threading
+from typing import List
+
+
+class SQLiteReaders:
+    """按线程分配的SQLite读连接（写入仍由调用方的单一连接加锁完成）"""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: SQLite文件路径（需已开启WAL）
+        """
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: List[sqlite3.Connection] = []
+        self._closed = False
+
+    def get(self) -> sqlite3.Connection:
+        """获取当前线程的读连接（首次调用时打开）"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            with self._lock:
+                if self._closed:
+                    raise sqlite3.ProgrammingError(f"索引已关闭: {self.path}")
+                # 允许 close() 在其他线程关闭该连接；连接本身只在所属线程使用
+                conn = sqlite3.connect(self.path, check_same_thread=False)
+                self._connections.append(conn)
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        """关闭所有线程的读连接"""
+        with self._lock:
+            self._closed = True
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
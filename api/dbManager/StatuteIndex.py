@@ -0,0 +1,272 @@
+"""
+法条编号索引 - (规范化法规名称, 条号) → 条文及其所在的法律分段，用于按“《民法典》第604条”直接取条文
+"""
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_CHINESE_DIGITS = {"零": 0, "〇": 0, "一": 1, "二": 2, "两": 2, "三": 3, "四": 4,
+                   "五": 5, "六": 6, "七": 7, "八": 8, "九": 9}
+_CHINESE_UNITS = {"十": 10, "百": 100, "千": 1000}
+# 全量构建标记；条文切分方式变化时更换名称，使已有索引按新方式重建
+_BUILT_MARKER = "laws:articles"
+_NUMBER = r"[零〇一二两三四五六七八九十百千\d]+"
+
+# 条文开头的条号，如“第六百零四条”“第604条”；须位于分段开头、空白或句末标点之后，
+# 以排除正文中的援引（如“依照本法第十条规定”）
+_ARTICLE_HEAD = re.compile(rf"(?:^|(?<=[\s。；：！？”）)]))第\s*({_NUMBER})\s*条")
+# 查询中的引用：《法规名》第N条，或 法规名第N条
+_BRACKET_CITATION = re.compile(rf"《([^》]+)》\s*第\s*({_NUMBER})\s*条")
+_BARE_CITATION = re.compile(rf"([一-龥]{{2,40}}?)第\s*({_NUMBER})\s*条")
+# 法规名中的版本说明，如“（2020年修正）”
+_TITLE_NOTE = re.compile(r"[（(][^）)]*[）)]")
+_TITLE_PREFIX = "中华人民共和国"
+
+
+def parse_chinese_number(text: str) -> Optional[int]:
+    """
+    解析阿拉伯数字或中文数字（如 604、六百零四、十二）
+
+    Args:
+        text: 数字文本
+
+    Returns:
+        整数，无法解析时返回None
+    """
+    text = unicodedata.normalize("NFKC", text or "").strip()
+    if not text:
+        return None
+    if text.isdigit():
+        return int(text)
+
+    total, digit = 0, None
+    for char in text:
+        if char in _CHINESE_DIGITS:
+            digit = _CHINESE_DIGITS[char]
+        elif char in _CHINESE_UNITS:
+            # “十二”省略了前面的“一”
+            total += (1 if digit is None else digit) * _CHINESE_UNITS[char]
+            digit = None
+        else:
+            return None
+    return total + (digit or 0)
+
+
+def normalize_title(title: str) -> str:
+    """
+    规范化法规名称：去掉书名号、空白、版本说明与“中华人民共和国”前缀
+
+    Args:
+        title: 法规名称
+
+    Returns:
+        规范化名称，如“中华人民共和国民法典（2020）” → “民法典”
+    """
+    title = unicodedata.normalize("NFKC", title or "")
+    title = _TITLE_NOTE.sub("", title)
+    title = re.sub(r"[《》\s]", "", title)
+    if title.startswith(_TITLE_PREFIX) and len(title) > len(_TITLE_PREFIX):
+        title = title[len(_TITLE_PREFIX):]
+    return title
+
+
+def split_articles(segment_ids: List[str], segments: List[str]) -> List[Tuple[int, str, str]]:
+    """
+    把法规的分段切分为条文
+
+    法律按“第”切分并合并到约500字一段，一个分段通常包含多条，一条也可能跨段；
+    这里按每个“第N条”边界切分，分段开头不是条号的文字归入上一条。
+
+    Args:
+        segment_ids: 分段ID列表（按分段顺序）
+        segments: 分段文本列表
+
+    Returns:
+        [(条号, 条文起始所在的分段ID, 条文)]，同一条号只保留第一次出现
+    """
+    articles = []
+    for segment_id, segment in zip(segment_ids, segments):
+        segment = segment or ""
+        heads = list(_ARTICLE_HEAD.finditer(segment))
+        leading = segment[:heads[0].start()] if heads else segment
+        if articles and leading.strip():
+            article, start_segment_id, text = articles[-1]
+            articles[-1] = (article, start_segment_id, text + leading)
+        for index, match in enumerate(heads):
+            end = heads[index + 1].start() if index + 1 < len(heads) else len(segment)
+            article = parse_chinese_number(match.group(1))
+            if article is not None:
+                articles.append((article, segment_id, segment[match.start():end]))
+
+    seen = set()
+    unique = []
+    for article, segment_id, text in articles:
+        if article not in seen:
+            seen.add(article)
+            unique.append((article, segment_id, text.strip()))
+    return unique
+
+
+class StatuteIndex:
+    """本地法条编号索引"""
+
+    def __init__(self, path: str):
+        """
+        初始化法条索引
+
+        Args:
+            path: SQLite文件路径
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS statutes ("
+            "regulation_id TEXT NOT NULL, article INTEGER NOT NULL, title_norm TEXT NOT NULL, "
+            "title TEXT, segment_id TEXT NOT NULL, content TEXT NOT NULL, "
+            "PRIMARY KEY (regulation_id, article))"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_statutes_title ON statutes (title_norm, article)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS built (name TEXT PRIMARY KEY)")
+        self._conn.commit()
+        # 已收录的规范化名称，用于在查询中识别不带书名号的法规名
+        self._titles = {row[0] for row in self._conn.execute("SELECT DISTINCT title_norm FROM statutes")}
+
+    @staticmethod
+    def _entries(regulation_id: str, title: str, segment_ids: List[str],
+                 segments: List[str]) -> list:
+        title_norm = normalize_title(title)
+        if not title_norm or not regulation_id:
+            return []
+        return [
+            (regulation_id, article, title_norm, title, segment_id, content)
+            for article, segment_id, content in split_articles(segment_ids, segments)
+        ]
+
+    def replace(self, regulation_id: str, title: str, segment_ids: List[str], segments: List[str]):
+        """
+        用法规的全部分段重建其条号索引
+
+        Args:
+            regulation_id: 法规ID
+            title: 法规名称
+            segment_ids: 分段ID列表
+            segments: 分段文本列表
+        """
+        rows = self._entries(regulation_id, title, segment_ids, segments)
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM statutes WHERE regulation_id = ?", (regulation_id,))
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO statutes "
+                    "(regulation_id, article, title_norm, title, segment_id, content) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+            self._titles.update(row[2] for row in rows)
+
+    def is_built(self) -> bool:
+        """是否已从法律集合完成全量构建"""
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM built WHERE name = ?", (_BUILT_MARKER,)).fetchone() is not None
+
+    def rebuild(self, documents: Iterable[Tuple[str, str, List[str], List[str]]]):
+        """
+        全量重建
+
+        Args:
+            documents: (法规ID, 法规名称, 分段ID列表, 分段文本列表) 的迭代器
+        """
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM statutes")
+                for regulation_id, title, segment_ids, segments in documents:
+                    rows = self._entries(regulation_id, title, segment_ids, segments)
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO statutes "
+                        "(regulation_id, article, title_norm, title, segment_id, content) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        rows
+                    )
+                self._conn.execute("INSERT OR REPLACE INTO built (name) VALUES (?)", (_BUILT_MARKER,))
+            self._titles = {
+                row[0] for row in self._conn.execute("SELECT DISTINCT title_norm FROM statutes")
+            }
+
+    def lookup(self, title: str, article) -> List[Dict]:
+        """
+        按法规名称与条号查找条文
+
+        Args:
+            title: 法规名称（可带书名号、“中华人民共和国”前缀）
+            article: 条号，整数或“604”“六百零四”“第604条”
+
+        Returns:
+            条文列表（同名法规有多个版本时各返回一条）
+        """
+        if not isinstance(article, int):
+            article = parse_chinese_number(re.sub(r"[第条\s]", "", str(article)))
+        if article is None:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT regulation_id, article, title, segment_id, content FROM statutes "
+                "WHERE title_norm = ? AND article = ?",
+                (normalize_title(title), article)
+            ).fetchall()
+        return [
+            {"regulation_id": regulation_id, "article": article, "title": title,
+             "segment_id": segment_id, "content": content}
+            for regulation_id, article, title, segment_id, content in rows
+        ]
+
+    def _resolve_title(self, text: str) -> Optional[str]:
+        """在一段文字末尾识别已收录的法规名（取最长匹配）"""
+        text = normalize_title(text)
+        matches = [title for title in self._titles if text.endswith(title)]
+        return max(matches, key=len) if matches else None
+
+    def find_citations(self, query: str) -> List[Tuple[str, int]]:
+        """
+        识别查询中引用的法条
+
+        Args:
+            query: 查询文本
+
+        Returns:
+            [(规范化法规名称, 条号)]，按出现顺序去重
+        """
+        query = query or ""
+        citations = [
+            (normalize_title(match.group(1)), parse_chinese_number(match.group(2)))
+            for match in _BRACKET_CITATION.finditer(query)
+        ]
+        # 去掉已识别的书名号引用后，再识别不带书名号的引用
+        for match in _BARE_CITATION.finditer(_BRACKET_CITATION.sub("，", query)):
+            title = self._resolve_title(match.group(1))
+            if title:
+                citations.append((title, parse_chinese_number(match.group(2))))
+        return list(dict.fromkeys(
+            (title, article) for title, article in citations if article is not None
+        ))
+
+    def lookup_citations(self, query: str) -> List[Dict]:
+        """查找查询中引用的全部法条"""
+        results = []
+        for title, article in self.find_citations(query):
+            results.extend(self.lookup(title, article))
+        return results
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
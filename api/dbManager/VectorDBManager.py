@@ -6,19 +6,51 @@ import numpy as np
 import os
 import shutil
 import datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from api.dbManager.BGEModel import BGEModel
+from api.dbManager.IngestManifest import IngestManifest, content_hash, metadata_hash
+from api.dbManager.BM25Index import BM25Index
+from api.dbManager.DimReducer import DimReducer
+from api.dbManager.MetadataIndex import MetadataIndex
+from api.dbManager.StatuteIndex import StatuteIndex
 from api.Segment.contract_split import *
 from typing import List, Union
 
 class VectorDBManager:
     """向量数据库管理器"""
+
+    # 集合简称 → (Chroma集合名称, 实例属性名)
+    _COLLECTIONS = {
+        "contracts": (config.COLLECTION_CONTRACTS, "contract_collection"),
+        "laws": (config.COLLECTION_LAWS, "law_collection"),
+        "case": (config.COLLECTION_CASE, "case_collection"),
+        # 合同条款（分段）集合，通过 template_id 关联到整体模板
+        "contract_segments": (config.COLLECTION_CONTRACT_SEGMENTS, "contract_segment_collection"),
+    }
+    _COLLECTION_DESCRIPTIONS = {
+        config.COLLECTION_CONTRACTS: "合同模板集合",
+        config.COLLECTION_LAWS: "法律法规集合",
+        config.COLLECTION_CASE: "法律案例集合",
+        config.COLLECTION_CONTRACT_SEGMENTS: "合同条款集合",
+    }
+
+    # 分段集合中记录所属文档ID的元数据字段
+    _PARENT_FIELDS = {
+        "laws": "regulation_id",
+        "contract_segments": "template_id",
+    }
     
-    def __init__(self, persist_directory: str = None):
+    def __init__(self, persist_directory: str = None, bge_model: BGEModel = None,
+                 reranker=None):
         """
         初始化向量数据库管理器
         
         Args:
             persist_directory: 数据库存储目录
+            bge_model: 已加载的BGE模型，为空时新建（进程内共享请使用 registry）
+            reranker: 已加载的重排序模型，为空时在首次重排序时从 registry 获取
         """
         import chromadb
         from chromadb.config import Settings
@@ -36,28 +68,597 @@ class VectorDBManager:
         )
         
         # 初始化BGE模型
-        self.bge_model = BGEModel()        
+        self.bge_model = bge_model or BGEModel()
+        self.reranker = reranker
         
-        # 获取或创建集合
-        self.contract_collection = self.client.get_or_create_collection(
-            name=config.COLLECTION_CONTRACTS,
-            metadata={"description": "合同模板集合"}
+        # 获取或创建集合（HNSW索引参数见 config.HNSW_COLLECTION_CONFIG）
+        self._open_collections()
+
+        # 入库清单、元数据索引、BM25索引与法条编号索引（本地SQLite）
+        self._open_local_indexes()
+        self._index_build_lock = threading.Lock()
+        # BM25索引全量构建需要对整个集合分词，耗时较长，单独加锁，不阻塞元数据索引与其他构建
+        self._bm25_build_lock = threading.Lock()
+
+        # 降维投影矩阵（存在时入库与查询向量都先降维）
+        self._load_dim_reducer()
+
+        # dual_matching 并发查询三个集合使用的线程池（进程内所有请求共享）
+        self._search_executor = ThreadPoolExecutor(
+            max_workers=config.VECTOR_SEARCH_MAX_WORKERS, thread_name_prefix="vector-search"
+        )
+        
+    def _open_local_indexes(self):
+        """打开数据库目录下的本地SQLite索引"""
+        # 入库清单（分段内容指纹），用于增量入库
+        self.manifest = IngestManifest(
+            os.path.join(self.persist_directory, config.INGEST_MANIFEST_FILE)
+        )
+
+        # 元数据倒排索引（过滤检索时先解析候选ID）与BM25稀疏索引
+        self.metadata_index = MetadataIndex(
+            os.path.join(self.persist_directory, config.METADATA_INDEX_FILE)
+        )
+        self.bm25_index = BM25Index(
+            os.path.join(self.persist_directory, config.BM25_INDEX_FILE)
+        )
+        # 法条编号索引：(法规名称, 条号) → 法律分段
+        self.statute_index = StatuteIndex(
+            os.path.join(self.persist_directory, config.STATUTE_INDEX_FILE)
+        )
+
+    def _close_local_indexes(self):
+        """关闭本地SQLite索引的所有连接"""
+        for index in (self.manifest, self.metadata_index, self.bm25_index, self.statute_index):
+            index.close()
+
+    def close(self, close_model: bool = False):
+        """
+        释放实例持有的资源：等待进行中的并发检索完成后关闭线程池，再关闭本地索引连接
+
+        关闭后实例不可再用于检索或入库（registry 重新加载时对旧实例调用）。
+
+        Args:
+            close_model: 是否同时停止BGE模型的微批调度线程（模型不再被其他实例共享时）
+        """
+        self._search_executor.shutdown(wait=True)
+        self._close_local_indexes()
+        if close_model:
+            self.bge_model.close()
+        print("==向量数据库管理器已关闭==")
+
+    @staticmethod
+    def collection_metadata(collection_name: str) -> dict:
+        """
+        生成集合元数据：描述 + HNSW索引参数
+
+        Args:
+            collection_name: Chroma集合名称
+
+        Returns:
+            集合元数据
+        """
+        hnsw_config = dict(config.HNSW_DEFAULT_CONFIG)
+        hnsw_config.update(config.HNSW_COLLECTION_CONFIG.get(collection_name, {}))
+        metadata = {"description": VectorDBManager._COLLECTION_DESCRIPTIONS[collection_name]}
+        metadata.update({f"hnsw:{key}": value for key, value in hnsw_config.items()})
+        return metadata
+
+    def _open_collections(self):
+        """获取或创建全部集合；已有集合的索引参数与配置不一致时给出提示"""
+        existing = {
+            getattr(collection, "name", collection) for collection in self.client.list_collections()
+        }
+        for name, (collection_name, attribute) in self._COLLECTIONS.items():
+            expected = self.collection_metadata(collection_name)
+            if collection_name not in existing:
+                collection = self.client.create_collection(name=collection_name, metadata=expected)
+            else:
+                # 已有集合的索引参数在创建时已固定，不能通过修改元数据改变
+                collection = self.client.get_collection(name=collection_name)
+                current = collection.metadata or {}
+                stale = [key for key, value in expected.items()
+                         if key.startswith("hnsw:") and current.get(key) != value]
+                if stale:
+                    print(f"⚠️ 集合 {collection_name} 的索引参数与配置不一致（{', '.join(stale)}），"
+                          f"请执行 python manage.py rebuild_vector_index --collection {name}")
+            setattr(self, attribute, collection)
+
+    def rebuild_collection(self, name: str, page_size: int = 1000, transform=None) -> int:
+        """
+        按当前HNSW配置重建集合：复制到临时集合 → 删除原集合 → 临时集合改名
+
+        Args:
+            name: 集合简称（contracts/laws/case/contract_segments）
+            page_size: 每次读取的条数
+            transform: 复制时对向量的变换（如降维），为空时原样复制
+
+        Returns:
+            迁移的条目数
+        """
+        target, total = self._copy_collection(name, page_size, transform)
+        self._swap_collection(name, target)
+        return total
+
+    def _copy_collection(self, name: str, page_size: int = 1000, transform=None):
+        """
+        把集合复制到按当前HNSW配置新建的临时集合，原集合不改动
+
+        Returns:
+            (临时集合, 条目数)
+        """
+        collection_name, _ = self._COLLECTIONS[name]
+        source = self._get_collection(name)
+        temp_name = f"{collection_name}_rebuild"
+        try:
+            self.client.delete_collection(name=temp_name)
+        except Exception:
+            pass
+        target = self.client.create_collection(
+            name=temp_name, metadata=self.collection_metadata(collection_name)
         )
+
+        total = source.count()
+        print(f"==复制集合 {collection_name}，共 {total} 条==")
+        try:
+            for offset in range(0, total, page_size):
+                page = source.get(
+                    limit=page_size, offset=offset,
+                    include=["documents", "metadatas", "embeddings"]
+                )
+                embeddings = page["embeddings"]
+                if transform is not None and len(page["ids"]):
+                    embeddings = transform(np.asarray(embeddings, dtype=np.float32))
+                self._bulk_upsert(target, page["ids"], page["documents"],
+                                  embeddings, page["metadatas"])
+                print(f"已复制 {min(offset + page_size, total)}/{total}")
+            if target.count() != total:
+                raise RuntimeError(f"复制集合 {collection_name} 时条数不一致，已放弃，原集合未改动")
+        except Exception:
+            self.client.delete_collection(name=temp_name)
+            raise
+        return target, total
+
+    def _swap_collection(self, name: str, target):
+        """删除原集合，把 _copy_collection 生成的临时集合改名为原集合"""
+        collection_name, attribute = self._COLLECTIONS[name]
+        self.client.delete_collection(name=collection_name)
+        target.modify(name=collection_name)
+        setattr(self, attribute, self.client.get_collection(name=collection_name))
+        print(f"✅ 集合 {collection_name} 已重建")
+
+    def apply_dim_reducer(self, reducer: DimReducer) -> dict:
+        """
+        启用降维：把所有集合的全维向量降维后复制到临时集合，全部成功后再替换原集合并保存投影矩阵
+
+        复制阶段失败时删除临时集合，原集合与降维状态都不改动。
+
+        Args:
+            reducer: 已拟合的降维器
+
+        Returns:
+            各集合迁移的条目数
+        """
+        if self.dim_reducer is not None:
+            raise RuntimeError("向量库已降维，如需更换维度请清空后重新入库")
+        copies = {}
+        try:
+            for name in self._COLLECTIONS:
+                copies[name] = self._copy_collection(name, transform=reducer.transform)
+        except Exception:
+            for target, _ in copies.values():
+                self.client.delete_collection(name=target.name)
+            raise
+
+        for name, (target, _) in copies.items():
+            self._swap_collection(name, target)
+        path = os.path.join(self.persist_directory, config.DIM_REDUCER_FILE)
+        reducer.save(path)
+        self.dim_reducer = reducer
+        self._dim_reducer_mtime = os.path.getmtime(path)
+        print(f"✅ 向量已降维至 {reducer.output_dim} 维")
+        return {name: total for name, (_, total) in copies.items()}
+
+    def _load_dim_reducer(self):
+        """加载向量库目录下的降维矩阵（不存在时不降维）"""
+        path = os.path.join(self.persist_directory, config.DIM_REDUCER_FILE)
+        self.dim_reducer = DimReducer.load(path)
+        self._dim_reducer_mtime = os.path.getmtime(path) if os.path.exists(path) else None
+
+    def _reload_if_migrated(self):
+        """
+        降维矩阵文件被其他进程（reduce_embedding_dim 命令）创建或替换时，
+        重新加载降维矩阵并重新打开已被替换的集合，避免用全维查询向量检索降维后的集合
+        """
+        path = os.path.join(self.persist_directory, config.DIM_REDUCER_FILE)
+        mtime = os.path.getmtime(path) if os.path.exists(path) else None
+        if mtime == self._dim_reducer_mtime:
+            return
+        with self._index_build_lock:
+            if mtime == self._dim_reducer_mtime:
+                return
+            print("==检测到向量降维迁移，重新加载降维矩阵与集合==")
+            self.dim_reducer = DimReducer.load(path)
+            self._open_collections()
+            self._dim_reducer_mtime = mtime
+
+    def _reduce(self, embeddings: np.ndarray) -> np.ndarray:
+        """存在降维矩阵时对模型输出的向量降维"""
+        if self.dim_reducer is None:
+            return embeddings
+        return self.dim_reducer.transform(embeddings)
+
+    def encode_text(self, text: str) -> np.ndarray:
+        """
+        向量化单条文本（查询或整篇文档），与入库向量处于同一空间
+
+        Args:
+            text: 文本
+
+        Returns:
+            向量
+        """
+        self._reload_if_migrated()
+        return self._reduce(self.bge_model.encode(text))
+
+    def encode_segments(self, segments: List[str], batch_size: int = None) -> np.ndarray:
+        """
+        批量向量化分段文本
         
-        self.law_collection = self.client.get_or_create_collection(
-            name=config.COLLECTION_LAWS,
-            metadata={"description": "法律法规集合"}
+        长时间入库期间其他进程可能完成降维迁移：每批编码前检查一次，模型输出的全维向量
+        在全部编码完成后统一用当前的降维矩阵降维，写入的向量与集合维度保持一致。
+        
+        Args:
+            segments: 分段文本列表
+            batch_size: 批大小，默认使用 config.EMBEDDING_BATCH_SIZE
+            
+        Returns:
+            向量数组 (分段数, 向量维度)
+        """
+        embeddings = self.bge_model.encode_batch(
+            segments, batch_size=batch_size, before_batch=self._reload_if_migrated
         )
+        self._reload_if_migrated()
+        return self._reduce(embeddings)
+
+    def _bulk_upsert(self, collection, ids: List[str], documents: List[str],
+                     embeddings: np.ndarray, metadatas: List[dict]):
+        """
+        分批写入集合，每批对应一次SQLite事务
+        
+        Args:
+            collection: 目标集合
+            ids: 文档ID列表
+            documents: 文档内容列表
+            embeddings: 向量数组
+            metadatas: 元数据列表
+        """
+        batch_size = config.CHROMA_WRITE_BATCH_SIZE
+        # 不能超过Chroma客户端允许的单次写入上限
+        get_max_batch_size = getattr(self.client, "get_max_batch_size", None)
+        if get_max_batch_size is not None:
+            batch_size = min(batch_size, get_max_batch_size())
+
+        for start in range(0, len(ids), batch_size):
+            end = start + batch_size
+            collection.upsert(
+                ids=ids[start:end],
+                documents=documents[start:end],
+                embeddings=np.asarray(embeddings[start:end]).tolist(),
+                metadatas=metadatas[start:end]
+            )
+
+    def _bulk_update_metadatas(self, collection, ids: List[str], metadatas: List[dict]):
+        """分批只更新元数据（不改动文档与向量）"""
+        batch_size = config.CHROMA_WRITE_BATCH_SIZE
+        get_max_batch_size = getattr(self.client, "get_max_batch_size", None)
+        if get_max_batch_size is not None:
+            batch_size = min(batch_size, get_max_batch_size())
+
+        for start in range(0, len(ids), batch_size):
+            end = start + batch_size
+            collection.update(ids=ids[start:end], metadatas=metadatas[start:end])
+
+    @staticmethod
+    def _segment_metadatas(metadata: dict, parent_field: str, parent_id: str,
+                           count: int) -> List[dict]:
+        """
+        为每个分段生成元数据：继承整体元数据，并记录所属文档ID与段序号
+        
+        Args:
+            metadata: 整体元数据
+            parent_field: 所属文档ID字段名（如 regulation_id / template_id）
+            parent_id: 所属文档ID
+            count: 分段数量
+            
+        Returns:
+            分段元数据列表
+        """
+        segment_metadatas = []
+        for idx in range(count):
+            segment_metadata = dict(metadata)
+            segment_metadata[parent_field] = parent_id
+            segment_metadata["block_index"] = idx + 1
+            segment_metadatas.append(segment_metadata)
+        return segment_metadatas
+
+    def plan_segment_sync(self, collection_name: str, doc_id: str,
+                          segments: List[str]) -> dict:
+        """
+        对比入库清单，规划分段的增量写入
+        
+        内容指纹与同ID旧分段一致的分段直接跳过；内容与某个旧分段一致但位置变化的，
+        复用旧分段的向量；其余分段需要重新向量化；不再出现的旧分段将被删除。
+        
+        Args:
+            collection_name: 分段集合名称（laws/contract_segments）
+            doc_id: 所属文档ID
+            segments: 新的分段文本列表
+            
+        Returns:
+            写入计划，交给 apply_segment_sync 执行；其中 embed 为需要向量化的分段下标
+        """
+        collection = self._get_collection(collection_name)
+        parent_field = self._PARENT_FIELDS[collection_name]
+        blocks = send_to_vector_db(doc_id, collection_name, segments)
+        ids = [block["block_id"] for block in blocks]
+        hashes = [content_hash(segment) for segment in segments]
+
+        old_hashes = self.manifest.get(collection_name, doc_id)
+        if not old_hashes:
+            # 清单中没有记录（如清单建立前入库的数据），回退到集合中的元数据
+            existing = collection.get(where={parent_field: doc_id}, include=["metadatas"])
+            old_hashes = {
+                segment_id: (segment_metadata or {}).get("content_hash", "")
+                for segment_id, segment_metadata in zip(existing["ids"], existing["metadatas"])
+            }
+            # 按分段ID入库之前，整篇文档以文档ID本身为条目ID写入且没有 parent_field，
+            # 按元数据查不到；一并列入旧分段，使其在本次同步中被删除
+            if doc_id not in ids and collection.get(ids=[doc_id], include=[])["ids"]:
+                old_hashes[doc_id] = ""
+        old_ids_by_hash = {digest: segment_id for segment_id, digest in old_hashes.items() if digest}
+        new_ids = set(ids)
+
+        unchanged, reuse, embed = [], {}, []
+        for idx, (segment_id, digest) in enumerate(zip(ids, hashes)):
+            if old_hashes.get(segment_id) == digest:
+                unchanged.append(idx)
+            elif digest in old_ids_by_hash:
+                reuse[idx] = old_ids_by_hash[digest]
+            else:
+                embed.append(idx)
+
+        return {
+            "collection_name": collection_name,
+            "doc_id": doc_id,
+            "ids": ids,
+            "hashes": hashes,
+            "unchanged": unchanged,
+            "reuse": reuse,
+            "embed": embed,
+            "delete": [segment_id for segment_id in old_hashes if segment_id not in new_ids],
+        }
+
+    def apply_segment_sync(self, plan: dict, segments: List[str],
+                           new_embeddings: np.ndarray, metadata: dict) -> dict:
+        """
+        执行 plan_segment_sync 生成的写入计划
+        
+        Args:
+            plan: 写入计划
+            segments: 分段文本列表（与规划时一致）
+            new_embeddings: plan["embed"] 中各分段的向量，顺序一致
+            metadata: 整体元数据
+            
+        Returns:
+            各类分段数量统计
+        """
+        collection = self._get_collection(plan["collection_name"])
+        parent_field = self._PARENT_FIELDS[plan["collection_name"]]
+        doc_id = plan["doc_id"]
+
+        # 元数据变化时，内容未变的分段也要更新元数据（不重新向量化）
+        metadata_digest = metadata_hash(metadata)
+        refresh_indices = []
+        if self.manifest.get_metadata_hash(plan["collection_name"], doc_id) != metadata_digest:
+            refresh_indices = list(plan["unchanged"])
 
-        self.case_collection = self.client.get_or_create_collection(
-            name=config.COLLECTION_CASE,
-            metadata={"description": "法律案例集合"}
+        write_indices = list(plan["embed"])
+        write_embeddings = list(np.asarray(new_embeddings))
+        if plan["reuse"]:
+            old_ids = list(dict.fromkeys(plan["reuse"].values()))
+            existing = collection.get(ids=old_ids, include=["embeddings"])
+            old_embeddings = dict(zip(existing["ids"], existing["embeddings"]))
+            for idx, old_id in plan["reuse"].items():
+                write_indices.append(idx)
+                write_embeddings.append(old_embeddings[old_id])
+
+        segment_metadatas = self._segment_metadatas(
+            metadata, parent_field, doc_id, len(segments)
         )
+        for idx, segment_metadata in enumerate(segment_metadatas):
+            segment_metadata["content_hash"] = plan["hashes"][idx]
+        if write_indices:
+            write_ids = [plan["ids"][idx] for idx in write_indices]
+            write_metadatas = [segment_metadatas[idx] for idx in write_indices]
+            self._bulk_upsert(
+                collection,
+                ids=write_ids,
+                documents=[segments[idx] for idx in write_indices],
+                embeddings=np.asarray(write_embeddings),
+                metadatas=write_metadatas
+            )
+            self._index_written(plan["collection_name"], write_ids,
+                                [segments[idx] for idx in write_indices], write_metadatas)
+        if refresh_indices:
+            refresh_ids = [plan["ids"][idx] for idx in refresh_indices]
+            refresh_metadatas = [segment_metadatas[idx] for idx in refresh_indices]
+            self._bulk_update_metadatas(collection, refresh_ids, refresh_metadatas)
+            self.metadata_index.update(plan["collection_name"], refresh_ids, refresh_metadatas)
+        if plan["delete"]:
+            collection.delete(ids=plan["delete"])
+            self._index_removed(plan["collection_name"], plan["delete"])
+
+        self.manifest.replace(plan["collection_name"], doc_id,
+                              dict(zip(plan["ids"], plan["hashes"])), metadata_digest)
+        if plan["collection_name"] == "laws":
+            self.statute_index.replace(doc_id, metadata.get("title"), plan["ids"], segments)
+
+        stats = {
+            "embedded": len(plan["embed"]),
+            "reused": len(plan["reuse"]),
+            "unchanged": len(plan["unchanged"]),
+            "metadata_refreshed": len(refresh_indices),
+            "deleted": len(plan["delete"]),
+        }
+        print(f"==分段同步 {plan['collection_name']}/{doc_id}: {stats}==")
+        return stats
+
+    def _index_written(self, collection_name: str, ids: List[str], documents: List[str],
+                       metadatas: List[dict]):
+        """写入集合后同步更新元数据索引与BM25索引"""
+        self.metadata_index.update(collection_name, ids, metadatas)
+        self.bm25_index.update(collection_name, ids, documents)
+
+    def _index_removed(self, collection_name: str, ids: List[str]):
+        """从集合删除后同步更新元数据索引与BM25索引"""
+        self.metadata_index.remove(collection_name, ids)
+        self.bm25_index.remove(collection_name, ids)
+
+    def _ensure_metadata_index(self, collection_name: str):
+        """元数据索引尚未覆盖已有数据时（如索引功能上线前入库的集合），从集合全量构建一次"""
+        if self.metadata_index.is_built(collection_name):
+            return
+        with self._index_build_lock:
+            if self.metadata_index.is_built(collection_name):
+                return
+            print(f"==构建元数据索引: {collection_name}==")
+            collection = self._get_collection(collection_name)
+            self.metadata_index.rebuild(collection_name, self._iter_pages(collection, ["metadatas"]))
+
+    def _ensure_bm25_index(self, collection_name: str):
+        """BM25索引尚未覆盖已有数据时，从集合全量构建一次（仅sparse/hybrid检索需要）"""
+        if self.bm25_index.is_built(collection_name):
+            return
+        with self._bm25_build_lock:
+            if self.bm25_index.is_built(collection_name):
+                return
+            print(f"==构建BM25索引: {collection_name}==")
+            collection = self._get_collection(collection_name)
+            self.bm25_index.rebuild(collection_name, self._iter_pages(collection, ["documents"]))
+
+    def _ensure_statute_index(self):
+        """法条编号索引尚未覆盖已有法律数据时，从法律集合全量构建一次"""
+        if self.statute_index.is_built():
+            return
+        with self._index_build_lock:
+            if self.statute_index.is_built():
+                return
+            print("==构建法条编号索引==")
+            regulations = {}
+            for page in self._iter_pages(self.law_collection, ["documents", "metadatas"]):
+                for segment_id, document, segment_metadata in zip(
+                        page["ids"], page["documents"], page["metadatas"]):
+                    segment_metadata = segment_metadata or {}
+                    # 分段入库之前的整篇法规没有 regulation_id，以元数据中的 id 或条目ID作为法规ID
+                    regulation_id = (segment_metadata.get("regulation_id")
+                                     or segment_metadata.get("id") or segment_id)
+                    if not regulation_id:
+                        continue
+                    regulation = regulations.setdefault(
+                        regulation_id, {"title": segment_metadata.get("title"), "segments": []}
+                    )
+                    regulation["segments"].append(
+                        (segment_metadata.get("block_index") or 0, segment_id, document)
+                    )
+            documents = []
+            for regulation_id, regulation in regulations.items():
+                segments = sorted(regulation["segments"])
+                documents.append((
+                    regulation_id, regulation["title"],
+                    [segment_id for _, segment_id, _ in segments],
+                    [document for _, _, document in segments],
+                ))
+            self.statute_index.rebuild(documents)
+
+    @staticmethod
+    def _statute_result(entry: dict) -> dict:
+        """把法条索引条目转换为与 dual_matching 法律结果相同的结构"""
+        return {
+            "id": entry["segment_id"],
+            "content": entry["content"],
+            "metadata": {
+                "regulation_id": entry["regulation_id"],
+                "title": entry["title"],
+                "article": entry["article"],
+            },
+            "similarity": 1.0,
+        }
+
+    def lookup_statute(self, title: str, article) -> List[dict]:
+        """
+        按法规名称与条号直接取条文，不经过向量检索
         
+        Args:
+            title: 法规名称，如“民法典”“《中华人民共和国民法典》”
+            article: 条号，如 604、“六百零四”“第604条”
+            
+        Returns:
+            条文列表（同名法规有多个版本时各返回一条）
+        """
+        self._ensure_statute_index()
+        return [self._statute_result(entry) for entry in self.statute_index.lookup(title, article)]
+
+    def lookup_cited_statutes(self, query: str) -> List[dict]:
+        """
+        查找查询中引用的法条，如“《民法典》第604条”“公司法第一条”
+        
+        Args:
+            query: 查询文本
+            
+        Returns:
+            条文列表，查询中没有可识别的引用时为空
+        """
+        self._ensure_statute_index()
+        return [self._statute_result(entry) for entry in self.statute_index.lookup_citations(query)]
+
+    def _is_document_unchanged(self, collection_name: str, doc_id: str, digest: str) -> bool:
+        """整体存储的文档（合同模板/案例）内容指纹是否与已入库版本一致"""
+        return self.manifest.get(collection_name, doc_id).get(doc_id) == digest
+
+    def _is_metadata_unchanged(self, collection_name: str, doc_id: str, metadata_digest: str) -> bool:
+        """文档元数据指纹是否与已入库版本一致"""
+        return self.manifest.get_metadata_hash(collection_name, doc_id) == metadata_digest
+
+    def _plan_embeddings(self, plan: dict, new_embeddings: np.ndarray) -> np.ndarray:
+        """
+        按分段顺序组装写入计划中全部分段的向量：需要向量化的分段使用新向量，
+        未变化与可复用的分段从集合中读取已存储的向量
+        
+        Args:
+            plan: plan_segment_sync 生成的写入计划
+            new_embeddings: plan["embed"] 中各分段的向量
+            
+        Returns:
+            向量数组 (分段数, 向量维度)
+        """
+        vectors = dict(zip(plan["embed"], np.asarray(new_embeddings)))
+        stored_ids = {idx: plan["ids"][idx] for idx in plan["unchanged"]}
+        stored_ids.update(plan["reuse"])
+        if stored_ids:
+            collection = self._get_collection(plan["collection_name"])
+            existing = collection.get(ids=list(dict.fromkeys(stored_ids.values())), include=["embeddings"])
+            stored = dict(zip(existing["ids"], existing["embeddings"]))
+            for idx, segment_id in stored_ids.items():
+                vectors[idx] = np.asarray(stored[segment_id], dtype=np.float32)
+        return np.asarray([vectors[idx] for idx in range(len(plan["ids"]))], dtype=np.float32)
+
     def add_contract_template(self, content: str, metadata: dict) -> dict:
         """
         添加合同模板（包含分段处理）
         
+        内容与元数据都与已入库版本一致时直接跳过；否则只对变化的条款向量化。
+        
         Args:
             content: 合同内容
             metadata: 元数据
@@ -69,15 +670,19 @@ class VectorDBManager:
         
         # 生成模板ID
         template_id = metadata.get("id") or str(uuid.uuid4())
+        digest = content_hash(content)
+        metadata_digest = metadata_hash(metadata)
+        if (self._is_document_unchanged("contracts", template_id, digest)
+                and self._is_metadata_unchanged("contracts", template_id, metadata_digest)):
+            print(f"==合同模板 {template_id} 内容未变化，跳过==")
+            return {"template_id": template_id, "unchanged": True}
         
-        # 1. 分段处理
+        # 1. 分段处理：先对比入库清单，只对变化的条款向量化，其余条款使用已存储的向量
         segments = split_contract(content, data_type="contract")
-        segment_embeddings = []
-        for i in range(len(segments)):
-            print(f"==向量化第{i}段合同文本==")
-            embeddings = self.bge_model.encode(segments[i])
-            segment_embeddings.append(embeddings)
-        segment_embeddings = np.array(segment_embeddings)
+        plan = self.plan_segment_sync("contract_segments", template_id, segments)
+        print(f"==向量化{len(plan['embed'])}/{len(segments)}段合同文本==")
+        new_embeddings = self.encode_segments([segments[idx] for idx in plan["embed"]])
+        segment_embeddings = self._plan_embeddings(plan, new_embeddings)
         
         # 2. 整体合同向量生成（加权平均）
         # 这里可以根据分段的重要性进行加权，简化版本使用简单平均
@@ -86,15 +691,22 @@ class VectorDBManager:
             template_embedding = segment_embeddings.mean(axis=0).tolist()
         else:
             # 如果没有分段，直接编码整个文本
-            template_embedding = self.bge_model.encode(content).tolist()
+            template_embedding = self.encode_text(content).tolist()
             
         # 3. 存储整体模板
-        self.contract_collection.add(
+        template_metadata = dict(metadata)
+        template_metadata["content_hash"] = digest
+        self.contract_collection.upsert(
             documents=[content],
             embeddings=[template_embedding],
-            metadatas=[metadata],
+            metadatas=[template_metadata],
             ids=[template_id]
         )
+        self._index_written("contracts", [template_id], [content], [template_metadata])
+
+        # 4. 存储条款级分段，用于细粒度检索（只写入变化的条款）
+        self.apply_segment_sync(plan, segments, new_embeddings, metadata)
+        self.manifest.replace("contracts", template_id, {template_id: digest}, metadata_digest)
         
         return {
             "template_id": template_id,
@@ -106,6 +718,8 @@ class VectorDBManager:
         """
         添加法律法规
         
+        只对内容变化的条文重新向量化，已删除的条文会从集合中移除。
+        
         Args:
             content: 法律条文内容
             metadata: 元数据
@@ -117,22 +731,13 @@ class VectorDBManager:
         
         regulation_id = metadata.get("id") or str(uuid.uuid4())
         
-        #  分段处理
+        #  分段处理，法律法规只存分段，每段使用独立ID：<regulation_id>_block_<n>
         segments = split_contract(content, data_type="law")
-        for i in range(len(segments)):
-            if i % 10 == 0:
-                print(f"==向量化第{i}-{i+10}段法律文本==")
-            segment_embedding = self.bge_model.encode(segments[i])
-            if isinstance(segment_embedding, np.ndarray):
-                segment_embedding = segment_embedding.tolist()
-
-            # 存储 TODO 法律法规是否不需要整体存储，只存分段？
-            self.law_collection.add(
-                documents=[segments[i]],
-                embeddings=[segment_embedding],
-                metadatas=[metadata],
-                ids=[regulation_id]
-            )
+        plan = self.plan_segment_sync("laws", regulation_id, segments)
+        print(f"==向量化{len(plan['embed'])}/{len(segments)}段法律文本==")
+        segment_embeddings = self.encode_segments([segments[idx] for idx in plan["embed"]])
+
+        self.apply_segment_sync(plan, segments, segment_embeddings, metadata)
 
         return regulation_id
     
@@ -140,6 +745,8 @@ class VectorDBManager:
         """
         添加法律案例
         
+        内容与元数据都与已入库版本一致时直接跳过；只有元数据变化时只更新元数据。
+        
         Args:
             content: 法律案例内容
             metadata: 元数据
@@ -150,15 +757,25 @@ class VectorDBManager:
         import uuid
         
         regulation_id = metadata.get("id") or str(uuid.uuid4())
+        digest = content_hash(content)
+        metadata_digest = metadata_hash(metadata)
+        case_metadata = dict(metadata)
+        case_metadata["content_hash"] = digest
+        if self._is_document_unchanged("case", regulation_id, digest):
+            if self._is_metadata_unchanged("case", regulation_id, metadata_digest):
+                print(f"==法律案例 {regulation_id} 内容未变化，跳过==")
+                return regulation_id
+            # 只有元数据变化：更新元数据，不重新向量化
+            self._bulk_update_metadatas(self.case_collection, [regulation_id], [case_metadata])
+            self.metadata_index.update("case", [regulation_id], [case_metadata])
+            self.manifest.replace("case", regulation_id, {regulation_id: digest}, metadata_digest)
+            print(f"==法律案例 {regulation_id} 元数据已更新==")
+            return regulation_id
         
         #  分段处理
         segments = split_contract(content, data_type="case")
-        segment_embeddings = []
-        for i in range(len(segments)):
-            print(f"==向量化第{i}段案例文本==")
-            embeddings = self.bge_model.encode(segments[i])
-            segment_embeddings.append(embeddings)
-        segment_embeddings = np.array(segment_embeddings)
+        print(f"==向量化{len(segments)}段案例文本==")
+        segment_embeddings = self.encode_segments(segments)
 
         # 整体案例向量生成（加权平均）
         # 这里可以根据分段的重要性进行加权，简化版本使用简单平均
@@ -167,128 +784,515 @@ class VectorDBManager:
             template_embedding = segment_embeddings.mean(axis=0).tolist()
         else:
             # 如果没有分段，直接编码整个文本
-            template_embedding = self.bge_model.encode(content).tolist()
+            template_embedding = self.encode_text(content).tolist()
 
         # 存储
-        self.case_collection.add(
+        self.case_collection.upsert(
             documents=[content],
             embeddings=[template_embedding],
-            metadatas=[metadata],
+            metadatas=[case_metadata],
             ids=[regulation_id]
         )
+        self._index_written("case", [regulation_id], [content], [case_metadata])
+        self.manifest.replace("case", regulation_id, {regulation_id: digest}, metadata_digest)
         
         return regulation_id
 
+    def _get_collection(self, collection_name: str):
+        """按名称获取集合（contracts/laws/case/contract_segments）"""
+        if collection_name == "contracts":
+            return self.contract_collection
+        elif collection_name == "laws":
+            return self.law_collection
+        elif collection_name == "case":
+            return self.case_collection
+        elif collection_name == "contract_segments":
+            return self.contract_segment_collection
+        raise ValueError(f"未知的集合名称: {collection_name}")
+
     def search_with_filter(self, query: str, filter_conditions: dict = None, 
-                          collection_name: str = "contracts", n_results: int = 5) -> dict:
+                          collection_name: str = "contracts", n_results: int = 5,
+                          query_embedding: List[float] = None,
+                          include_embeddings: bool = False) -> dict:
         """
         带条件过滤的向量搜索
         
         Args:
             query: 查询文本
             filter_conditions: 过滤条件
-            collection_name: 集合名称（contracts/laws/case)
+            collection_name: 集合名称（contracts/laws/case/contract_segments)
             n_results: 返回结果数量
+            query_embedding: 已计算好的查询向量，传入时不再重复编码query
+            include_embeddings: 是否返回命中文档的向量（默认不返回，减少I/O与序列化开销）
             
         Returns:
             搜索结果
         """
         # 获取指定集合
-        if collection_name == "contracts":
-            collection = self.contract_collection
-        elif collection_name == "laws":
-            collection = self.law_collection
-        elif collection_name == "case":
-            collection = self.case_collection
-        else:
-            raise ValueError(f"未知的集合名称: {collection_name}")
+        collection = self._get_collection(collection_name)
             
         # 向量化查询文本
-        query_embedding = self.bge_model.encode(query).tolist()
-        
-        # 构建where条件
-        where_conditions = None
-        if filter_conditions:
-            # 转换过滤条件为ChromaDB格式
-            filter_clauses = []
-            for key, value in filter_conditions.items():
-                if value is None:
-                    continue
-                if isinstance(value, list):
-                    clause = {key: {"$in": value}}
-                else:
-                    clause = {key: value}
-                filter_clauses.append(clause)
-
-            if filter_clauses:
-                where_conditions = (
-                    filter_clauses[0]
-                    if len(filter_clauses) == 1
-                    else {"$and": filter_clauses}
+        if query_embedding is None:
+            query_embedding = self.encode_text(query).tolist()
+        
+        where_conditions = self._build_where(filter_conditions)
+        n_results = min(n_results, 100)
+
+        # 过滤条件先通过倒排索引解析为候选ID：候选集较小时精确计算相似度，
+        # 避免高选择性过滤（如单一地区）下ANN检索召回不足或遍历过多节点
+        if where_conditions is not None:
+            candidate_ids = self._filter_candidates(collection_name, filter_conditions)
+            if (candidate_ids is not None
+                    and len(candidate_ids) <= config.METADATA_EXACT_SEARCH_MAX_CANDIDATES):
+                return self._exact_search(
+                    collection, candidate_ids, query_embedding, n_results, include_embeddings
                 )
-                    
+
         # 执行查询
+        include = ["documents", "metadatas", "distances"]
+        if include_embeddings:
+            include.append("embeddings")
         results = collection.query(
             query_embeddings=[query_embedding],
-            n_results=min(n_results, 100),
+            n_results=n_results,
             where=where_conditions,
-            include=["documents", "metadatas", "distances", "embeddings"]
+            include=include
         )
         
         return results
+
+    @staticmethod
+    def _build_where(filter_conditions: dict = None) -> Union[dict, None]:
+        """把过滤条件转换为ChromaDB的where条件"""
+        if not filter_conditions:
+            return None
+        filter_clauses = []
+        for key, value in filter_conditions.items():
+            if value is None:
+                continue
+            if isinstance(value, list):
+                clause = {key: {"$in": value}}
+            else:
+                clause = {key: value}
+            filter_clauses.append(clause)
+
+        if not filter_clauses:
+            return None
+        return filter_clauses[0] if len(filter_clauses) == 1 else {"$and": filter_clauses}
+
+    def _filter_candidates(self, collection_name: str, filter_conditions: dict):
+        """
+        通过元数据倒排索引解析候选ID
+        
+        Returns:
+            候选ID集合；条件中含未建索引的字段时返回None
+        """
+        self._ensure_metadata_index(collection_name)
+        return self.metadata_index.candidates(collection_name, filter_conditions)
+
+    @staticmethod
+    def _iter_pages(collection, include: List[str], page_size: int = 1000):
+        """分页读取集合的ID与指定字段"""
+        total = collection.count()
+        for offset in range(0, total, page_size):
+            yield collection.get(limit=page_size, offset=offset, include=include)
+
+    @staticmethod
+    def _exact_search(collection, candidate_ids, query_embedding, n_results: int,
+                      include_embeddings: bool = False) -> dict:
+        """
+        对候选集精确计算距离，返回与 collection.query 相同结构的结果
+        
+        Args:
+            collection: 集合
+            candidate_ids: 候选ID集合
+            query_embedding: 查询向量
+            n_results: 返回结果数量
+            include_embeddings: 是否返回向量
+            
+        Returns:
+            搜索结果
+        """
+        results = {
+            "ids": [[]], "documents": [[]], "metadatas": [[]], "distances": [[]],
+            "embeddings": [[]] if include_embeddings else None,
+        }
+        if not candidate_ids:
+            return results
+
+        records = collection.get(
+            ids=sorted(candidate_ids), include=["documents", "metadatas", "embeddings"]
+        )
+        if not len(records["ids"]):
+            return results
+        matrix = np.asarray(records["embeddings"], dtype=np.float32)
+        query = np.asarray(query_embedding, dtype=np.float32)
+
+        # 与集合的距离度量保持一致，使 1 - distance 的含义不变
+        space = (collection.metadata or {}).get("hnsw:space", "l2")
+        if space == "cosine":
+            norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+            distances = 1 - (matrix @ query) / np.clip(norms, 1e-12, None)
+        elif space == "ip":
+            distances = 1 - matrix @ query
+        else:
+            distances = np.sum((matrix - query) ** 2, axis=1)
+
+        order = np.argsort(distances)[:n_results]
+        results["ids"] = [[records["ids"][i] for i in order]]
+        results["documents"] = [[records["documents"][i] for i in order]]
+        results["metadatas"] = [[records["metadatas"][i] for i in order]]
+        results["distances"] = [[float(distances[i]) for i in order]]
+        if include_embeddings:
+            results["embeddings"] = [[matrix[i] for i in order]]
+        return results
     
-    def dual_matching(self, user_query: str, user_filters: dict = None) -> dict:
+    @staticmethod
+    def _ranked_results(collection, ids: List[str], distances: List[float],
+                        include_embeddings: bool = False) -> dict:
+        """按给定顺序读取条目，组装成与 collection.query 相同结构的结果"""
+        results = {
+            "ids": [[]], "documents": [[]], "metadatas": [[]], "distances": [[]],
+            "embeddings": [[]] if include_embeddings else None,
+        }
+        if not ids:
+            return results
+        include = ["documents", "metadatas"] + (["embeddings"] if include_embeddings else [])
+        records = collection.get(ids=list(ids), include=include)
+        position = {item_id: i for i, item_id in enumerate(records["ids"])}
+        for item_id, distance in zip(ids, distances):
+            i = position.get(item_id)
+            if i is None:
+                continue
+            results["ids"][0].append(item_id)
+            results["documents"][0].append(records["documents"][i])
+            results["metadatas"][0].append(records["metadatas"][i])
+            results["distances"][0].append(distance)
+            if include_embeddings:
+                results["embeddings"][0].append(records["embeddings"][i])
+        return results
+
+    def search_sparse(self, query: str, filter_conditions: dict = None,
+                      collection_name: str = "contracts", n_results: int = 5,
+                      query_embedding: List[float] = None,
+                      include_embeddings: bool = False) -> dict:
+        """
+        BM25稀疏检索（不需要向量化查询，可在向量模型繁忙时作为首轮候选）
+        
+        Args:
+            query: 查询文本
+            filter_conditions: 过滤条件
+            collection_name: 集合名称（contracts/laws/case/contract_segments)
+            n_results: 返回结果数量
+            query_embedding: 不使用，与 search_with_filter 参数保持一致
+            include_embeddings: 是否返回命中文档的向量
+            
+        Returns:
+            与 collection.query 相同结构的结果，distances 为 1 - 归一化后的BM25得分
+        """
+        collection = self._get_collection(collection_name)
+        self._ensure_bm25_index(collection_name)
+
+        candidate_ids = None
+        where_conditions = self._build_where(filter_conditions)
+        if where_conditions is not None:
+            candidate_ids = self._filter_candidates(collection_name, filter_conditions)
+            if candidate_ids is None:
+                # 过滤字段未建索引，交给Chroma解析
+                candidate_ids = set(collection.get(where=where_conditions, include=[])["ids"])
+
+        hits = self.bm25_index.search(collection_name, query, min(n_results, 100), candidate_ids)
+        top_score = hits[0][1] if hits else 1.0
+        return self._ranked_results(
+            collection,
+            [item_id for item_id, _ in hits],
+            [1 - score / top_score for _, score in hits],
+            include_embeddings
+        )
+
+    def search_hybrid(self, query: str, filter_conditions: dict = None,
+                      collection_name: str = "contracts", n_results: int = 5,
+                      query_embedding: List[float] = None,
+                      include_embeddings: bool = False) -> dict:
+        """
+        混合检索：向量检索与BM25检索各取候选，按倒数排名融合（RRF）排序
+        
+        Args:
+            query: 查询文本
+            filter_conditions: 过滤条件
+            collection_name: 集合名称（contracts/laws/case/contract_segments)
+            n_results: 返回结果数量
+            query_embedding: 已计算好的查询向量
+            include_embeddings: 是否返回命中文档的向量
+            
+        Returns:
+            与 collection.query 相同结构的结果（按融合得分排序），distances 为向量距离
+        """
+        if query_embedding is None:
+            query_embedding = self.encode_text(query).tolist()
+        candidates = max(n_results, config.HYBRID_CANDIDATES)
+        dense = self.search_with_filter(
+            query, filter_conditions, collection_name, candidates, query_embedding
+        )
+        sparse = self.search_sparse(query, filter_conditions, collection_name, candidates)
+
+        fused = {}
+        for ranking in (dense["ids"][0], sparse["ids"][0]):
+            for rank, item_id in enumerate(ranking, start=1):
+                fused[item_id] = fused.get(item_id, 0.0) + 1 / (config.RRF_K + rank)
+        fused_ids = sorted(fused, key=fused.get, reverse=True)[:min(n_results, 100)]
+
+        # 融合后的条目统一计算向量距离，1 - distance 仍为余弦相似度
+        collection = self._get_collection(collection_name)
+        scored = self._exact_search(
+            collection, set(fused_ids), query_embedding, len(fused_ids), include_embeddings
+        )
+        position = {item_id: i for i, item_id in enumerate(scored["ids"][0])}
+        order = [position[item_id] for item_id in fused_ids if item_id in position]
+        for key in ("ids", "documents", "metadatas", "distances"):
+            scored[key] = [[scored[key][0][i] for i in order]]
+        if include_embeddings:
+            scored["embeddings"] = [[scored["embeddings"][0][i] for i in order]]
+        return scored
+
+    def _search_fn(self, retrieval_mode: str):
+        """按检索方式选择检索函数"""
+        search_fns = {
+            "dense": self.search_with_filter,
+            "hybrid": self.search_hybrid,
+            "sparse": self.search_sparse,
+        }
+        if retrieval_mode not in search_fns:
+            raise ValueError(f"未知的检索方式: {retrieval_mode}")
+        return search_fns[retrieval_mode]
+
+    def _embedding_overloaded(self) -> bool:
+        """向量化微批队列是否积压（积压时检索降级为BM25）"""
+        if not config.SPARSE_FALLBACK_QUEUE_DEPTH:
+            return False
+        queue_depth = self.bge_model.scheduler_stats().get("queue_depth", 0)
+        return queue_depth > config.SPARSE_FALLBACK_QUEUE_DEPTH
+
+    def search_contract_segments(self, query: str, filter_conditions: dict = None,
+                                 n_results: int = 5, query_embedding: List[float] = None,
+                                 aggregation: str = None, top_k: int = None,
+                                 retrieval_mode: str = "dense") -> List[dict]:
+        """
+        条款级合同检索：先检索最相关的条款，再聚合到所属合同模板
+        
+        Args:
+            query: 查询文本
+            filter_conditions: 过滤条件
+            n_results: 返回的合同模板数量
+            query_embedding: 已计算好的查询向量
+            aggregation: 聚合方式，max（取最相关条款得分）或 sum（前top_k条款得分之和）
+            top_k: 每个模板参与聚合/返回的条款数
+            retrieval_mode: 条款检索方式（dense/hybrid/sparse）
+            
+        Returns:
+            合同模板列表（按得分降序），每项包含命中的条款
+        """
+        aggregation = aggregation or config.CONTRACT_SEGMENT_AGGREGATION
+        top_k = top_k or config.CONTRACT_SEGMENT_TOP_K
+        if aggregation not in ("max", "sum"):
+            raise ValueError(f"未知的聚合方式: {aggregation}")
+
+        results = self._search_fn(retrieval_mode)(
+            query=query,
+            filter_conditions=filter_conditions,
+            collection_name="contract_segments",
+            n_results=config.CONTRACT_SEGMENT_CANDIDATES,
+            query_embedding=query_embedding
+        )
+
+        # 按所属模板分组，条款已按相似度降序返回
+        templates = {}
+        for i in range(len(results['ids'][0])):
+            segment_metadata = dict(results['metadatas'][0][i])
+            template_id = segment_metadata.pop("template_id", None)
+            block_index = segment_metadata.pop("block_index", None)
+            if template_id is None:
+                continue
+            template = templates.setdefault(template_id, {
+                "id": template_id,
+                "metadata": segment_metadata,
+                "clauses": []
+            })
+            if len(template["clauses"]) < top_k:
+                template["clauses"].append({
+                    "id": results['ids'][0][i],
+                    "block_index": block_index,
+                    "content": results['documents'][0][i],
+                    "similarity": 1 - results['distances'][0][i]
+                })
+
+        processed = []
+        for template in templates.values():
+            scores = [clause["similarity"] for clause in template["clauses"]]
+            template["similarity"] = max(scores) if aggregation == "max" else sum(scores)
+            # 按条款原文顺序拼接，只返回相关条款而不是整份合同
+            template["clauses"].sort(key=lambda clause: clause["block_index"] or 0)
+            template["content"] = "\n".join(clause["content"] for clause in template["clauses"])
+            processed.append(template)
+
+        processed.sort(key=lambda x: x["similarity"], reverse=True)
+        return processed[:n_results]
+
+    def _get_reranker(self):
+        """获取重排序模型（首次使用时加载进程共享实例）"""
+        if self.reranker is None:
+            from api.dbManager.registry import get_reranker
+            self.reranker = get_reranker()
+        return self.reranker
+
+    def _rerank_candidates(self, query: str, laws: List[dict], cases: List[dict]):
+        """
+        用交叉编码器对法律法规与案例候选统一打分（一次调用，共享时间预算）
+
+        Args:
+            query: 用户查询
+            laws: 法律法规首轮候选
+            cases: 案例首轮候选
+
+        Returns:
+            (重排序后的法律法规, 重排序后的案例)，超出时间预算或模型不可用时返回None
+        """
+        candidates = laws + cases
+        try:
+            ranked = self._get_reranker().rerank(query, [candidate["content"] for candidate in candidates])
+        except Exception as e:
+            print(f"⚠️ 重排序失败，使用首轮排序：{e}")
+            return None
+        if ranked is None:
+            print("⚠️ 重排序超出时间预算，使用首轮排序")
+            return None
+
+        reranked_laws, reranked_cases = [], []
+        for idx, score in ranked:
+            if score < config.RERANK_MIN_SCORE:
+                continue
+            target = reranked_laws if idx < len(laws) else reranked_cases
+            target.append(dict(candidates[idx], rerank_score=score))
+        return reranked_laws[:config.RERANK_TOP_N_LAWS], reranked_cases[:config.RERANK_TOP_N_CASES]
+
+    def dual_matching(self, user_query: str, user_filters: dict = None,
+                      include_embeddings: bool = False, contract_mode: str = None,
+                      retrieval_mode: str = None, rerank: bool = None) -> dict:
         """
         双重匹配：匹配合同模板和法律法规
         
         Args:
             user_query: 用户查询（自然语言描述）
             user_filters: 用户筛选条件
+            include_embeddings: 是否在合同结果中返回向量（仅template模式）
+            contract_mode: 合同检索方式，template（整体模板向量）或 segment（条款聚合）
+            retrieval_mode: 检索方式，dense（向量）/ hybrid（向量 + BM25融合）/ sparse（仅BM25）；
+                            向量化队列积压时自动降级为sparse
+            rerank: 是否对法律法规与案例做交叉编码器重排序，默认使用 config.RERANK_ENABLED
             
         Returns:
             匹配结果
         """
-        # 1. 合同模板匹配
-        contract_results = self.search_with_filter(
-            query=user_query,
-            filter_conditions=user_filters,
-            collection_name="contracts",
-            n_results=config.MAX_CONTRACT_RESULTS
-        )
-        
-        # 2. 法律法规匹配
-        law_results = self.search_with_filter(
-            query=user_query,
-            filter_conditions=user_filters,
-            collection_name="laws",
-            n_results=config.MAX_LAW_RESULTS
+        timings = {}
+        self._reload_if_migrated()
+        rerank = config.RERANK_ENABLED if rerank is None else rerank
+        # 重排序时首轮多取候选，由重排序模型挑出更少但更相关的结果
+        law_n_results = max(config.MAX_LAW_RESULTS, config.RERANK_CANDIDATES) if rerank else config.MAX_LAW_RESULTS
+        case_n_results = max(config.MAX_CASE_RESULTS, config.RERANK_CANDIDATES) if rerank else config.MAX_CASE_RESULTS
+
+        retrieval_mode = retrieval_mode or config.RETRIEVAL_MODE
+        search_fn = self._search_fn(retrieval_mode)
+        if retrieval_mode != "sparse" and self._embedding_overloaded():
+            print("⚠️ 向量化队列积压，本次检索降级为BM25")
+            retrieval_mode = "sparse"
+            search_fn = self.search_sparse
+
+        # 查询文本只编码一次，三个集合共用（sparse模式不需要向量化）
+        query_embedding = None
+        if retrieval_mode != "sparse":
+            start = time.perf_counter()
+            query_embedding = self.encode_text(user_query).tolist()
+            timings["encode_ms"] = (time.perf_counter() - start) * 1000
+
+        contract_mode = contract_mode or config.CONTRACT_SEARCH_MODE
+        if contract_mode not in ("template", "segment"):
+            raise ValueError(f"未知的合同检索方式: {contract_mode}")
+
+        def timed(name: str, search_fn, **kwargs):
+            search_start = time.perf_counter()
+            results = search_fn(
+                query=user_query,
+                filter_conditions=user_filters,
+                query_embedding=query_embedding,
+                **kwargs
+            )
+            timings[f"{name}_ms"] = (time.perf_counter() - search_start) * 1000
+            return results
+
+        # 查询中引用了具体法条时按条号直接取条文，排在法律结果最前面；
+        # 法律集合的检索照常进行，覆盖查询中引用之外的问题
+        cited_laws = []
+        if config.STATUTE_LOOKUP_ENABLED:
+            lookup_start = time.perf_counter()
+            try:
+                cited_laws = self.lookup_cited_statutes(user_query)
+            except Exception as e:
+                # 法条编号索引不可用时不影响向量检索
+                print(f"⚠️ 法条编号查询失败，跳过：{e}")
+            timings["statute_lookup_ms"] = (time.perf_counter() - lookup_start) * 1000
+
+        # 1. 合同模板匹配 2. 法律法规匹配 3. 法律案例匹配，三个集合并发查询
+        search_start = time.perf_counter()
+        if contract_mode == "segment":
+            contract_future = self._search_executor.submit(
+                timed, "contract_segments", self.search_contract_segments,
+                n_results=config.MAX_CONTRACT_RESULTS, retrieval_mode=retrieval_mode
+            )
+        else:
+            contract_future = self._search_executor.submit(
+                timed, "contracts", search_fn,
+                collection_name="contracts", n_results=config.MAX_CONTRACT_RESULTS,
+                include_embeddings=include_embeddings
+            )
+        law_future = self._search_executor.submit(
+            timed, "laws", search_fn,
+            collection_name="laws", n_results=law_n_results
         )
-        
-        # 3. 法律案例匹配 分段匹配（用于细粒度检索）
-        case_results = self.search_with_filter(
-            query=user_query,
-            filter_conditions=user_filters,
-            collection_name="case",
-            n_results=config.MAX_CASE_RESULTS
+        case_future = self._search_executor.submit(
+            timed, "case", search_fn,
+            collection_name="case", n_results=case_n_results
         )
+        contract_results = contract_future.result()
+        law_results = law_future.result()
+        case_results = case_future.result()
+        timings["search_ms"] = (time.perf_counter() - search_start) * 1000
         
         # 处理结果
-        processed_contracts = []
-        for i in range(len(contract_results['ids'][0])):
-            contract = {
-                "id": contract_results['ids'][0][i],
-                "content": contract_results['documents'][0][i],
-                "metadata": contract_results['metadatas'][0][i],
-                "similarity": 1 - contract_results['distances'][0][i],
-                "embedding": contract_results['embeddings'][0][i] if contract_results['embeddings'] else None
-            }
-            processed_contracts.append(contract)           
-        # 按相似度排序
-        processed_contracts.sort(key=lambda x: x["similarity"], reverse=True)
+        if contract_mode == "segment":
+            # 条款聚合结果已按得分排序
+            processed_contracts = contract_results
+        else:
+            processed_contracts = []
+            for i in range(len(contract_results['ids'][0])):
+                contract = {
+                    "id": contract_results['ids'][0][i],
+                    "content": contract_results['documents'][0][i],
+                    "metadata": contract_results['metadatas'][0][i],
+                    "similarity": 1 - contract_results['distances'][0][i],
+                }
+                if include_embeddings and contract_results.get('embeddings') is not None:
+                    contract["embedding"] = np.asarray(contract_results['embeddings'][0][i]).tolist()
+                processed_contracts.append(contract)           
+            # 按相似度排序（hybrid/sparse 结果已按融合/BM25得分排好序）
+            if retrieval_mode == "dense":
+                processed_contracts.sort(key=lambda x: x["similarity"], reverse=True)
         
-        # 处理法律法规
+        # 处理法律法规（与按条号命中的条文位于同一分段的结果去重）
+        cited_segment_ids = {law["id"] for law in cited_laws}
         processed_laws = []
         for i in range(len(law_results['ids'][0])):
+            if law_results['ids'][0][i] in cited_segment_ids:
+                continue
             law = {
                 "id": law_results['ids'][0][i],
                 "content": law_results['documents'][0][i],
@@ -296,9 +1300,6 @@ class VectorDBManager:
                 "similarity": 1 - law_results['distances'][0][i]
             }
             processed_laws.append(law)            
-        # 过滤低于阈值的法律法规
-        processed_laws = [law for law in processed_laws if law["similarity"] >= config.SIMILARITY_THRESHOLD]
-        processed_laws.sort(key=lambda x: x["similarity"], reverse=True)
         
         # 处理案例
         processed_case = []
@@ -310,10 +1311,30 @@ class VectorDBManager:
                 "similarity": 1 - case_results['distances'][0][i],
             }
             processed_case.append(case)
-        # 过滤低于阈值的法律案例
-        processed_case = [case for case in processed_case if case["similarity"] >= config.SIMILARITY_THRESHOLD]
-        processed_case.sort(key=lambda x: x["similarity"], reverse=True)
-        
+
+        # 重排序（按条号直接命中的法条不参与）；失败或超出时间预算时沿用首轮排序
+        reranked = None
+        if rerank:
+            rerank_start = time.perf_counter()
+            reranked = self._rerank_candidates(user_query, processed_laws, processed_case)
+            timings["rerank_ms"] = (time.perf_counter() - rerank_start) * 1000
+
+        if reranked is not None:
+            processed_laws, processed_case = reranked
+            law_limit = config.RERANK_TOP_N_LAWS
+        else:
+            processed_case = processed_case[:config.MAX_CASE_RESULTS]
+            # 过滤低于阈值的法律法规与案例（阈值针对向量相似度，hybrid/sparse 按排名截断即可）
+            if retrieval_mode == "dense":
+                processed_laws = [law for law in processed_laws if law["similarity"] >= config.SIMILARITY_THRESHOLD]
+                processed_laws.sort(key=lambda x: x["similarity"], reverse=True)
+                processed_case = [case for case in processed_case if case["similarity"] >= config.SIMILARITY_THRESHOLD]
+                processed_case.sort(key=lambda x: x["similarity"], reverse=True)
+            law_limit = config.MAX_LAW_RESULTS
+
+        # 引用的条文排在最前，检索结果补足剩余名额
+        processed_laws = cited_laws + processed_laws[:max(law_limit - len(cited_laws), 0)]
+
 
         # 选择最匹配的合同和备用合同
         best_contract = processed_contracts[0] if processed_contracts else None
@@ -325,7 +1346,10 @@ class VectorDBManager:
             "relevant_laws": processed_laws,
             "relevant_case": processed_case,
             "query": user_query,
-            "filters": user_filters
+            "filters": user_filters,
+            "retrieval_mode": retrieval_mode,
+            "reranked": reranked is not None,
+            "timings": timings
         }
     
     def backup_database(self, backup_name: str = None):
@@ -372,25 +1396,42 @@ class VectorDBManager:
         if not os.path.exists(backup_path):
             raise FileNotFoundError(f"备份不存在: {backup_path}")
         
-        # 停止当前客户端
+        # 停止当前客户端，关闭本地索引连接（其文件将被备份覆盖）
         del self.client
+        self._close_local_indexes()
         
-        # 清空当前数据库目录
-        if os.path.exists(self.persist_directory):
-            shutil.rmtree(self.persist_directory)
+        # 备份位于数据库目录内，先复制到临时目录，再清空数据库目录（保留其中的备份）
+        import tempfile
+        staging = tempfile.mkdtemp(prefix="vector_db_restore_")
+        staged_path = os.path.join(staging, "db")
+        shutil.copytree(backup_path, staged_path)
+        for entry in os.listdir(self.persist_directory):
+            entry_path = os.path.join(self.persist_directory, entry)
+            if os.path.isdir(entry_path):
+                if os.path.exists(os.path.join(entry_path, "backup_info.json")):
+                    continue
+                shutil.rmtree(entry_path)
+            else:
+                os.remove(entry_path)
         
         # 恢复备份
-        shutil.copytree(backup_path, self.persist_directory)
+        shutil.copytree(staged_path, self.persist_directory, dirs_exist_ok=True)
+        os.remove(os.path.join(self.persist_directory, "backup_info.json"))
+        shutil.rmtree(staging)
         
         # 重新初始化客户端
+        import chromadb
+        from chromadb.config import Settings
         self.client = chromadb.PersistentClient(
             path=self.persist_directory,
             settings=Settings(anonymized_telemetry=False)
         )
         
         # 重新获取集合
-        self.contract_collection = self.client.get_collection(name=config.COLLECTION_CONTRACTS)
-        self.law_collection = self.client.get_collection(name=config.COLLECTION_LAWS)
-        self.case_collection = self.client.get_collection(name=config.COLLECTION_CASE)
+        self._open_collections()
+
+        # 本地索引与降维矩阵随备份一起恢复，需要重新打开
+        self._open_local_indexes()
+        self._load_dim_reducer()
         
         print(f"✅ 数据库已从备份恢复: {backup_name}")
\ No newline at end of file
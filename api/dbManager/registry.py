@@ -0,0 +1,172 @@
+"""
+进程级共享实例注册表
+
+VectorDBManager 与 BGEModel 的初始化代价很高（打开 Chroma 持久化客户端、
+加载 bge-large-zh 权重），因此整个进程只保留一份，由视图与服务共享。
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+_lock = threading.RLock()
+_bge_model = None
+_vector_db_manager = None
+# 通过 use_vector_db_manager 使用中的实例 → 使用者数量
+_manager_users = {}
+# 已被替换但仍有使用者的实例 → 关闭时是否一并停止其BGE模型
+_retired_managers = {}
+_reranker = None
+# 重排序模型最近一次加载失败：(错误信息, time.monotonic() 时间)；
+# 冷却期内不再重复加载，reload_vector_db_manager(reload_model=True) 时清除
+_reranker_error = None
+
+
+def get_bge_model():
+    """
+    获取进程共享的BGE模型（首次调用时加载）
+
+    Returns:
+        BGEModel实例
+    """
+    global _bge_model
+    if _bge_model is None:
+        with _lock:
+            if _bge_model is None:
+                from api.dbManager.BGEModel import BGEModel
+                _bge_model = BGEModel()
+    return _bge_model
+
+
+def get_reranker():
+    """
+    获取进程共享的重排序模型（首次调用时加载）
+
+    加载失败时记录错误信息，config.RERANK_RETRY_COOLDOWN_S 秒内的调用直接报错，不再重复加载模型。
+
+    Returns:
+        BGEReranker实例
+    """
+    import config
+
+    global _reranker, _reranker_error
+    if _reranker is None:
+        with _lock:
+            if _reranker is not None:
+                return _reranker
+            if _reranker_error is not None:
+                message, failed_at = _reranker_error
+                if time.monotonic() - failed_at < config.RERANK_RETRY_COOLDOWN_S:
+                    raise RuntimeError(f"重排序模型加载失败：{message}")
+            from api.dbManager.BGEReranker import BGEReranker
+            try:
+                _reranker = BGEReranker()
+            except Exception as e:
+                _reranker_error = (str(e), time.monotonic())
+                raise RuntimeError(f"重排序模型加载失败：{e}") from e
+            _reranker_error = None
+    return _reranker
+
+
+def get_vector_db_manager():
+    """
+    获取进程共享的向量数据库管理器（首次调用时初始化）
+
+    Returns:
+        VectorDBManager实例
+    """
+    global _vector_db_manager
+    if _vector_db_manager is None:
+        with _lock:
+            if _vector_db_manager is None:
+                from api.dbManager.VectorDBManager import VectorDBManager
+                _vector_db_manager = VectorDBManager(bge_model=get_bge_model())
+    return _vector_db_manager
+
+
+@contextmanager
+def use_vector_db_manager():
+    """
+    在一次请求内使用共享的向量数据库管理器
+
+    使用期间实例被 reload_vector_db_manager 替换时，旧实例在最后一个使用者退出后才关闭，
+    进行中的检索不会因线程池或索引连接已关闭而失败。
+
+    Yields:
+        VectorDBManager实例
+    """
+    with _lock:
+        manager = get_vector_db_manager()
+        _manager_users[manager] = _manager_users.get(manager, 0) + 1
+    try:
+        yield manager
+    finally:
+        close_model = None
+        with _lock:
+            _manager_users[manager] -= 1
+            if not _manager_users[manager]:
+                del _manager_users[manager]
+                if manager in _retired_managers:
+                    close_model = _retired_managers.pop(manager)
+        if close_model is not None:
+            manager.close(close_model=close_model)
+
+
+def reload_vector_db_manager(reload_model: bool = False):
+    """
+    重新加载共享实例（如数据库目录被替换、模型文件更新后调用）
+
+    Args:
+        reload_model: 是否同时重新加载BGE模型与重排序模型
+
+    Returns:
+        新的VectorDBManager实例
+    """
+    global _bge_model, _reranker, _reranker_error, _vector_db_manager
+    with _lock:
+        old_manager, _vector_db_manager = _vector_db_manager, None
+        if old_manager is not None and old_manager in _manager_users:
+            # 仍有请求在使用旧实例，由最后一个使用者退出时关闭
+            _retired_managers[old_manager] = reload_model
+        elif old_manager is not None:
+            # 释放旧实例的检索线程池与SQLite连接；重新加载模型时一并停止旧模型的调度线程
+            old_manager.close(close_model=reload_model)
+        elif reload_model and _bge_model is not None:
+            _bge_model.close()
+        if reload_model:
+            _bge_model = None
+            _reranker = None
+            _reranker_error = None
+        return get_vector_db_manager()
+
+
+def warm_up(load_vector_db: bool = True, load_reranker: bool = None):
+    """
+    预热共享实例，加载失败时只打印日志，不影响进程启动
+
+    Args:
+        load_vector_db: 是否预热向量数据库管理器（含BGE模型）
+        load_reranker: 是否预热重排序模型，默认使用 config.RERANK_ENABLED
+    """
+    import config
+    load_reranker = config.RERANK_ENABLED if load_reranker is None else load_reranker
+
+    if load_vector_db:
+        try:
+            get_vector_db_manager()
+            print("✅ 向量数据库管理器预热完成")
+        except Exception as e:
+            print(f"⚠ 向量数据库管理器预热失败，将在首次请求时重试：{e}")
+
+    if load_reranker:
+        try:
+            get_reranker()
+            print("✅ 重排序模型预热完成")
+        except Exception as e:
+            print(f"⚠ 重排序模型加载失败，检索将不做重排序：{e}")
+
+
+def warm_up_in_background(**kwargs) -> threading.Thread:
+    """在后台线程中预热，避免阻塞应用启动（参数同 warm_up）"""
+    thread = threading.Thread(target=warm_up, kwargs=kwargs, name="vector-db-warmup", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+
+import config
+
+
+class Command(BaseCommand):
+    help = "将BGE模型导出为ONNX（可选int8量化），并校验与PyTorch向量的一致性"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", default=config.ONNX_MODEL_DIR, help="ONNX模型输出目录")
+        parser.add_argument("--no-quantize", action="store_true", help="不导出int8动态量化模型")
+        parser.add_argument("--skip-export", action="store_true", help="跳过导出，只做一致性校验")
+        parser.add_argument("--skip-parity", action="store_true", help="跳过一致性校验")
+
+    def handle(self, *args, **options):
+        from api.dbManager.BGEModel import BGEModel
+        from api.dbManager.OnnxBackend import check_parity, export_onnx
+
+        quantized = not options["no_quantize"]
+        if not options["skip_export"]:
+            export_onnx(output_dir=options["output"], quantize=quantized)
+
+        if options["skip_parity"]:
+            return
+
+        texts = [
+            "买卖合同是出卖人转移标的物的所有权于买受人，买受人支付价款的合同。",
+            "租赁合同是出租人将租赁物交付承租人使用、收益，承租人支付租金的合同。",
+            "标的物毁损、灭失的风险，在标的物交付之前由出卖人承担，交付之后由买受人承担。",
+            "甲方应于每月五日前向乙方支付当月服务费用。",
+            "因本合同引起的争议，双方应协商解决；协商不成的，提交甲方所在地人民法院诉讼解决。",
+        ]
+        # 校验刚导出的模型，且不经过查询向量缓存
+        reference = BGEModel(backend="torch", cache_size=0)
+        candidate = BGEModel(backend="onnx", cache_size=0,
+                             onnx_model_dir=options["output"], onnx_quantized=quantized)
+
+        result = check_parity(reference, candidate, texts)
+        self.stdout.write(
+            f"样本数 {result['count']}，最低余弦 {result['min_cosine']:.5f}，"
+            f"平均余弦 {result['mean_cosine']:.5f}"
+        )
+        if not result["passed"]:
+            raise CommandError(
+                f"一致性校验未通过（要求最低余弦 ≥ {config.ONNX_PARITY_MIN_COSINE}），请勿切换到ONNX后端"
+            )
+        self.stdout.write(self.style.SUCCESS("✅ 一致性校验通过，可设置 BGE_BACKEND=onnx"))
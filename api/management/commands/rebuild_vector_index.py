@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.dbManager.VectorDBManager import VectorDBManager
+
+
+class Command(BaseCommand):
+    help = "按 config.HNSW_COLLECTION_CONFIG 重建向量集合的HNSW索引（距离度量、M、ef参数）"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--collection",
+            action="append",
+            choices=sorted(VectorDBManager._COLLECTIONS),
+            help="要重建的集合简称，可重复指定；默认只重建索引参数与配置不一致的集合",
+        )
+        parser.add_argument("--all", action="store_true", help="重建全部集合")
+        parser.add_argument("--dry-run", action="store_true", help="只列出当前与目标索引参数")
+        parser.add_argument("--no-backup", action="store_true", help="重建前不备份数据库目录")
+
+    def handle(self, *args, **options):
+        from api.dbManager.registry import get_bge_model
+
+        manager = VectorDBManager(bge_model=get_bge_model())
+
+        targets = []
+        for name, (collection_name, _) in VectorDBManager._COLLECTIONS.items():
+            current = manager._get_collection(name).metadata or {}
+            expected = VectorDBManager.collection_metadata(collection_name)
+            changed = {
+                key: (current.get(key), value)
+                for key, value in expected.items()
+                if key.startswith("hnsw:") and current.get(key) != value
+            }
+            self.stdout.write(f"{name} ({collection_name}): " + (
+                "，".join(f"{key} {old} → {new}" for key, (old, new) in changed.items())
+                or "索引参数与配置一致"
+            ))
+            if options["all"] or name in (options["collection"] or []) or (
+                    not options["collection"] and changed):
+                targets.append(name)
+
+        if options["dry_run"] or not targets:
+            return
+
+        if not options["no_backup"]:
+            manager.backup_database()
+
+        for name in targets:
+            try:
+                manager.rebuild_collection(name)
+            except Exception as e:
+                raise CommandError(f"重建集合 {name} 失败：{e}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ 已重建：{', '.join(targets)}。正在运行的服务需重启后才会使用新集合"
+        ))
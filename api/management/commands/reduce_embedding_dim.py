@@ -0,0 +1,97 @@
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+import config
+from api.dbManager.DimReducer import DimReducer, benchmark_recall
+from api.dbManager.VectorDBManager import VectorDBManager
+
+
+class Command(BaseCommand):
+    help = "在语料向量上拟合降维矩阵，对比降维前后的检索召回，并可将向量库迁移到降维后的向量"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dim", type=int, default=config.DIM_REDUCTION_DIM, help="目标维度")
+        parser.add_argument(
+            "--sample", type=int, default=config.DIM_REDUCTION_FIT_SAMPLE,
+            help="拟合使用的最大向量数（从全部集合中随机抽取）",
+        )
+        parser.add_argument("--queries", type=int, default=config.DIM_REDUCTION_BENCHMARK_QUERIES,
+                            help="每个集合用于召回对比的查询数")
+        parser.add_argument("--top-k", type=int, default=config.DIM_REDUCTION_BENCHMARK_TOP_K)
+        parser.add_argument("--apply", action="store_true", help="召回达标后迁移向量库（默认只做对比）")
+        parser.add_argument("--force", action="store_true", help="召回未达标时仍然迁移")
+        parser.add_argument("--no-backup", action="store_true", help="迁移前不备份数据库目录")
+
+    def handle(self, *args, **options):
+        from api.dbManager.registry import get_bge_model
+
+        manager = VectorDBManager(bge_model=get_bge_model())
+        if manager.dim_reducer is not None:
+            raise CommandError(
+                f"向量库已降维至 {manager.dim_reducer.output_dim} 维，如需更换维度请清空后重新入库"
+            )
+
+        corpora = {}
+        for name in VectorDBManager._COLLECTIONS:
+            collection = manager._get_collection(name)
+            pages = [np.asarray(page["embeddings"], dtype=np.float32)
+                     for page in manager._iter_pages(collection, ["embeddings"])
+                     if len(page["ids"])]
+            if pages:
+                corpora[name] = np.vstack(pages)
+        if not corpora:
+            raise CommandError("向量库为空，无法拟合降维矩阵")
+
+        rng = np.random.default_rng(0)
+        corpus = np.vstack(list(corpora.values()))
+        if len(corpus) > options["sample"]:
+            corpus = corpus[rng.choice(len(corpus), size=options["sample"], replace=False)]
+        try:
+            reducer = DimReducer.fit(corpus, options["dim"])
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(
+            f"拟合样本 {len(corpus)} 条，{reducer.input_dim} → {reducer.output_dim} 维，"
+            f"保留能量 {reducer.explained_variance:.2%}"
+        )
+
+        passed = True
+        for name, embeddings in corpora.items():
+            if len(embeddings) < 2:
+                continue
+            # Chroma按float32存储；float16结果用于评估半精度缓存/导出的影响
+            for float16 in (False, True):
+                stats = benchmark_recall(reducer, embeddings, options["queries"],
+                                         options["top_k"], float16=float16)
+                self.stdout.write(
+                    f"{name}{' (float16)' if float16 else ''}: "
+                    f"recall@{stats['top_k']} 平均 {stats['mean_recall']:.3f}，"
+                    f"最低 {stats['min_recall']:.3f}，"
+                    f"每条向量 {stats['bytes_per_vector_full']} → {stats['bytes_per_vector_reduced']} 字节"
+                )
+                if not float16:
+                    passed = passed and stats["passed"]
+
+        if not options["apply"]:
+            return
+        if not passed and not options["force"]:
+            raise CommandError(
+                f"召回低于 {config.DIM_REDUCTION_MIN_RECALL}，未迁移；可提高 --dim 或使用 --force"
+            )
+
+        backup_path = None
+        if not options["no_backup"]:
+            backup_path = manager.backup_database()
+        try:
+            migrated = manager.apply_dim_reducer(reducer)
+        except Exception as e:
+            # 复制阶段失败时原集合未改动；替换阶段失败时集合可能一部分已降维，从备份恢复
+            if backup_path:
+                manager.restore_database(backup_path)
+                raise CommandError(f"迁移失败，已从备份恢复：{e}")
+            raise CommandError(f"迁移失败（未备份，请检查各集合状态）：{e}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ 已迁移：{', '.join(f'{name} {count}条' for name, count in migrated.items())}。"
+            f"正在运行的服务在下一次检索时自动加载降维矩阵"
+        ))
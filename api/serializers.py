@@ -66,3 +66,5 @@ class ContractGenerateSerializer(serializers.Serializer):
     max_new_tokens = serializers.IntegerField(default=5000, min_value=1)
     temperature = serializers.FloatField(default=0.7, min_value=0.0, max_value=1.0)
     use_new_knowledge_base = serializers.BooleanField(default=True)
+    # 为True时相同请求直接回放缓存的生成结果（适合 temperature=0 的标准合同）
+    use_cache = serializers.BooleanField(default=False)
@@ -1,13 +1,23 @@
+import asyncio
 import json
 import os
 from pathlib import Path
-from typing import Dict, Generator, Iterable
+from typing import AsyncGenerator, AsyncIterable, AsyncIterator, Dict, List, Tuple
 
-from asgiref.sync import async_to_sync
 from dotenv import load_dotenv
-from openai import OpenAI
-
-from model_api.knowledge_retriever import retrieve_knowledge_from_kb
+from openai import AsyncOpenAI
+
+import config
+from api.services.generation_cache import (
+    CACHE_BYPASS,
+    CACHE_HIT,
+    CACHE_MISS,
+    get_generation_cache,
+    make_generation_key,
+)
+from api.services.llm_client import get_async_llm_client
+from api.services.prompt_template import PromptTemplate, get_retrieval_block
+from api.services.sse_coalescer import acoalesce, coalesce
 
 load_dotenv()
 
@@ -21,17 +31,11 @@ if PROMPT_PATH.exists():
     SYSTEM_PROMPT_TEMPLATE = PROMPT_PATH.read_text(encoding="utf-8")
 else:
     SYSTEM_PROMPT_TEMPLATE = DEFAULT_PROMPT_TEMPLATE
+SYSTEM_PROMPT = PromptTemplate(SYSTEM_PROMPT_TEMPLATE)
 
 
-def _get_openai_client() -> OpenAI:
-    api_key = os.getenv("VITE_HUOSHAN_API_KEY")
-    if not api_key:
-        raise RuntimeError("缺少 VITE_HUOSHAN_API_KEY，无法调用豆包模型")
-
-    base_url = os.getenv(
-        "HUOSHAN_API_BASE_URL", "https://ark.cn-beijing.volces.com/api/v3"
-    )
-    return OpenAI(base_url=base_url, api_key=api_key)
+def _get_async_openai_client() -> AsyncOpenAI:
+    return get_async_llm_client()
 
 
 def _get_model_name() -> str:
@@ -39,79 +43,114 @@ def _get_model_name() -> str:
 
 
 async def _build_system_prompt_async(payload: Dict) -> str:
-    template = SYSTEM_PROMPT_TEMPLATE
-
-    default_values = {
-        "latest_laws": "暂无检索到最新法律法规",
-        "case_studies": "暂无检索到相关典型案例",
-        "standards": "暂无检索到相关国标行规",
-        "templates": "暂无检索到相关合同范本",
-    }
-
-    laws_str = default_values["latest_laws"]
-    cases_str = default_values["case_studies"]
-    standards_str = default_values["standards"]
-    templates_str = default_values["templates"]
-
-    if payload.get("use_new_knowledge_base", True):
-        knowledge = await retrieve_knowledge_from_kb(
-            payload.get("prompt", ""),
-            payload.get("contract_type"),
-            payload.get("cooperation_purpose"),
-            payload.get("Core_scenario"),
-        )
-        if knowledge:
-            laws_str = " ".join(knowledge.get("latest_laws", [])) or laws_str
-            cases_str = " ".join(knowledge.get("case_studies", [])) or cases_str
-            standards_str = " ".join(knowledge.get("standards", [])) or standards_str
-            templates_str = " ".join(knowledge.get("templates", [])) or templates_str
-
-    template = template.replace("{最新法律法规}", laws_str)
-    template = template.replace("{最新合同纠纷案}", cases_str)
-    template = template.replace("{最新国标行规}", standards_str)
-    template = template.replace("{最新合同范本}", templates_str)
-
-    return template.format(
-        合同类型=payload.get("contract_type"),
-        甲方=payload.get("first_party"),
-        乙方=payload.get("second_party"),
-        合作目的=payload.get("cooperation_purpose") or "",
-        合同核心场景=payload.get("Core_scenario") or "",
+    retrieval_block = await get_retrieval_block(
+        payload.get("prompt", ""),
+        payload.get("contract_type"),
+        payload.get("cooperation_purpose"),
+        payload.get("Core_scenario"),
+        use_knowledge_base=payload.get("use_new_knowledge_base", True),
     )
+    return SYSTEM_PROMPT.render({
+        **retrieval_block,
+        "合同类型": payload.get("contract_type"),
+        "甲方": payload.get("first_party"),
+        "乙方": payload.get("second_party"),
+        "合作目的": payload.get("cooperation_purpose") or "",
+        "合同核心场景": payload.get("Core_scenario") or "",
+    })
+
+
+def _build_messages(system_prompt: str, payload: Dict) -> list:
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": payload.get("prompt", "")},
+    ]
+
+
+def _delta_content(chunk) -> str:
+    delta = chunk.choices[0].delta if chunk.choices else None
+    return getattr(delta, "content", None) if delta else None
 
 
-build_system_prompt = async_to_sync(_build_system_prompt_async)
+async def _aiter_deltas(stream_response) -> AsyncIterator[str]:
+    async for chunk in stream_response:
+        content = _delta_content(chunk)
+        if content:
+            yield content
 
 
-def generate_contract_stream(payload: Dict) -> Iterable[str]:
-    client = _get_openai_client()
+def _sse(payload: Dict) -> str:
+    return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+async def _replay_cached(chunks: List[str]) -> AsyncGenerator[str, None]:
+    """
+    回放缓存的生成结果：按 SSE_COALESCE_MAX_BYTES 合并成帧，帧之间间隔 SSE_COALESCE_INTERVAL_MS，
+    保持与实时生成相同的流式节奏，而不是一次性推送全部内容
+    """
+    interval = config.SSE_COALESCE_INTERVAL_MS / 1000
+    for index, content in enumerate(coalesce(chunks, interval_ms=float("inf"))):
+        if index and interval > 0:
+            await asyncio.sleep(interval)
+        yield _sse({"content": content})
+    yield _sse({"done": True})
+
+
+async def generate_contract_stream_async(payload: Dict) -> Tuple[AsyncIterable[str], str]:
+    """
+    合同生成流，供异步视图使用（需在ASGI下运行，WSGI会先读完整个流再发送）。
+
+    知识库检索与大模型流式输出都在事件循环中等待，不占用worker线程；
+    缺少API密钥等配置错误在返回迭代器之前抛出，便于视图返回400。
+    payload 中 use_cache 为真时使用生成结果缓存，命中则直接回放，不调用上游模型。
+
+    Returns:
+        (SSE文本迭代器, 缓存状态 HIT / MISS / BYPASS)
+    """
     model_name = _get_model_name()
-    system_prompt = build_system_prompt(payload)
+    system_prompt = await _build_system_prompt_async(payload)
+    max_tokens = payload.get("max_new_tokens", 5000)
+    temperature = payload.get("temperature", 0.7)
+
+    cache, cache_key, cache_status = None, None, CACHE_BYPASS
+    if config.GENERATION_CACHE_ENABLED and payload.get("use_cache"):
+        cache = get_generation_cache()
+        cache_key = make_generation_key(
+            system_prompt, payload.get("prompt", ""), model_name, max_tokens, temperature
+        )
+        cached_chunks = await asyncio.to_thread(cache.get, cache_key)
+        if cached_chunks is not None:
+            return _replay_cached(cached_chunks), CACHE_HIT
+        cache_status = CACHE_MISS
 
-    messages = [
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": payload.get("prompt", "")},
-    ]
+    client = _get_async_openai_client()
 
-    def _stream() -> Generator[str, None, None]:
+    async def _astream() -> AsyncGenerator[str, None]:
+        stream_response = None
+        chunks = []
         try:
-            stream_response = client.chat.completions.create(
+            stream_response = await client.chat.completions.create(
                 model=model_name,
-                messages=messages,
-                max_tokens=payload.get("max_new_tokens", 5000),
-                temperature=payload.get("temperature", 0.7),
+                messages=_build_messages(system_prompt, payload),
+                max_tokens=max_tokens,
+                temperature=temperature,
                 stream=True,
             )
 
-            for chunk in stream_response:
-                delta = chunk.choices[0].delta if chunk.choices else None
-                content = getattr(delta, "content", None) if delta else None
-                if content:
-                    yield f"data: {json.dumps({'content': content}, ensure_ascii=False)}\n\n"
+            # 逐字增量合并后再输出，缓存中保存的也是合并后的片段
+            async for content in acoalesce(_aiter_deltas(stream_response)):
+                chunks.append(content)
+                yield _sse({"content": content})
 
-            yield f"data: {json.dumps({'done': True}, ensure_ascii=False)}\n\n"
+            # 只缓存完整结束的生成结果
+            if cache is not None and chunks:
+                await asyncio.to_thread(cache.set, cache_key, chunks)
+            yield _sse({"done": True})
         except Exception as exc:  # pragma: no cover - 错误路径
-            error_payload = {"error": str(exc)}
-            yield f"data: {json.dumps(error_payload, ensure_ascii=False)}\n\n"
+            yield _sse({"error": str(exc)})
+        finally:
+            # 客户端断开时响应被关闭，同时关闭上游流
+            if stream_response is not None:
+                await stream_response.close()
 
-    return _stream()
+    return _astream(), cache_status
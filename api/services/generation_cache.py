@@ -0,0 +1,158 @@
+"""
+合同生成结果缓存
+
+以完整渲染后的系统提示词 + 用户提示 + 模型 + 采样参数为键，把大模型逐段输出的内容
+保存在本地SQLite中；相同请求直接回放缓存内容，不再调用上游模型。
+总大小超过上限时按最近访问时间淘汰。
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+
+import config
+
+CACHE_HIT = "HIT"
+CACHE_MISS = "MISS"
+CACHE_BYPASS = "BYPASS"
+
+
+def make_generation_key(system_prompt: str, user_prompt: str, model_name: str,
+                        max_tokens: int, temperature: float) -> str:
+    """
+    计算生成缓存键
+
+    Args:
+        system_prompt: 渲染后的系统提示词
+        user_prompt: 用户提示
+        model_name: 模型名称
+        max_tokens: 最大生成长度
+        temperature: 采样温度
+
+    Returns:
+        十六进制sha256
+    """
+    raw = json.dumps(
+        [system_prompt, user_prompt, model_name, max_tokens, temperature],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class GenerationCache:
+    """基于SQLite的生成结果缓存，按总字节数淘汰"""
+
+    def __init__(self, path: str = None, max_bytes: int = None):
+        """
+        初始化缓存
+
+        Args:
+            path: SQLite文件路径，默认使用 config.GENERATION_CACHE_PATH
+            max_bytes: 缓存内容总字节上限，默认使用 config.GENERATION_CACHE_MAX_BYTES
+        """
+        self.path = path or config.GENERATION_CACHE_PATH
+        self.max_bytes = max_bytes or config.GENERATION_CACHE_MAX_BYTES
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS generations ("
+            "key TEXT PRIMARY KEY, chunks TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_generations_accessed ON generations (accessed_at)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[List[str]]:
+        """
+        读取缓存的输出片段
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            输出片段列表，未命中返回None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT chunks FROM generations WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE generations SET accessed_at = ? WHERE key = ?", (time.time(), key)
+                )
+        return json.loads(row[0])
+
+    def set(self, key: str, chunks: List[str]):
+        """
+        写入一次完整生成的输出片段，并淘汰超出容量的旧条目
+
+        Args:
+            key: 缓存键
+            chunks: 输出片段列表
+        """
+        data = json.dumps(chunks, ensure_ascii=False)
+        size = len(data.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO generations (key, chunks, size, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, data, size, now, now)
+                )
+                self._evict()
+
+    def _evict(self):
+        """总大小超出上限时，从最久未访问的条目开始删除"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM generations").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        expired = []
+        for key, size in self._conn.execute(
+                "SELECT key, size FROM generations ORDER BY accessed_at"):
+            if total <= self.max_bytes:
+                break
+            expired.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM generations WHERE key = ?", expired)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM generations")
+
+    def stats(self) -> dict:
+        """条目数与占用字节数"""
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM generations"
+            ).fetchone()
+        return {"entries": count, "bytes": total, "max_bytes": self.max_bytes}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_generation_cache() -> GenerationCache:
+    """获取进程共享的生成缓存（首次调用时打开）"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = GenerationCache()
+    return _cache
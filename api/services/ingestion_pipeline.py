@@ -0,0 +1,210 @@
+"""
+爬虫数据入库流水线
+
+下载 → 文本提取与分段 → 批量向量化 → 批量写入，各阶段由有界队列连接、
+在独立线程中运行，使网络密集的抓取与CPU密集的向量化重叠执行。
+每条数据写入成功后记录到检查点文件，中断后重新运行会跳过已处理的记录；
+完整运行结束后清空检查点，下次运行重新抓取全部数据，未变化的内容由入库清单跳过。
+"""
+import json
+import os
+import queue
+import threading
+from typing import Callable, Iterable, Set
+
+import config
+from api.Segment.contract_split import receive_crawl_data, split_contract
+
+# 队列结束标记
+_END = object()
+
+
+class IngestCheckpoint:
+    """本次运行已处理数据ID的持久化检查点，只用于中断后续传"""
+
+    def __init__(self, path: str = None):
+        """
+        初始化检查点
+
+        Args:
+            path: 检查点文件路径，默认使用 config.INGEST_CHECKPOINT_PATH
+        """
+        self.path = path or config.INGEST_CHECKPOINT_PATH
+        self._lock = threading.Lock()
+        self.done: Set[str] = set()
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.done = set(json.load(f).get("done", []))
+
+    def __contains__(self, data_id: str) -> bool:
+        return data_id in self.done
+
+    def mark_done(self, data_id: str):
+        """记录一条已处理的数据并立即落盘（先写临时文件再替换，避免写坏）"""
+        with self._lock:
+            self.done.add(data_id)
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"done": sorted(self.done)}, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+
+    def reset(self):
+        """清空检查点"""
+        with self._lock:
+            self.done.clear()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+
+class IngestionPipeline:
+    """爬虫数据入库流水线"""
+
+    def __init__(self, db_manager, checkpoint: IngestCheckpoint = None,
+                 queue_size: int = None):
+        """
+        初始化流水线
+
+        Args:
+            db_manager: VectorDBManager实例
+            checkpoint: 检查点，默认使用 config.INGEST_CHECKPOINT_PATH
+            queue_size: 各阶段之间队列的最大长度
+        """
+        self.db_manager = db_manager
+        self.checkpoint = checkpoint or IngestCheckpoint()
+        self.queue_size = queue_size or config.INGEST_QUEUE_SIZE
+        self.stats = {"crawled": 0, "skipped": 0, "failed": 0, "written": 0}
+        self._errors = []
+
+    def run(self, crawl_fn: Callable[[Set[str]], Iterable[dict]]) -> dict:
+        """
+        运行流水线
+
+        Args:
+            crawl_fn: 抓取函数，接收已处理ID集合，返回逐条产出爬虫结果的可迭代对象，
+                      例如 lambda skip_ids: iter_crawl_laws("合同法", skip_ids=skip_ids)
+
+        Returns:
+            处理统计
+        """
+        crawled_queue = queue.Queue(maxsize=self.queue_size)
+        split_queue = queue.Queue(maxsize=self.queue_size)
+        embedded_queue = queue.Queue(maxsize=self.queue_size)
+
+        stages = [
+            threading.Thread(target=self._stage_crawl, args=(crawl_fn, crawled_queue),
+                             name="ingest-crawl", daemon=True),
+            threading.Thread(target=self._stage_split, args=(crawled_queue, split_queue),
+                             name="ingest-split", daemon=True),
+            threading.Thread(target=self._stage_embed, args=(split_queue, embedded_queue),
+                             name="ingest-embed", daemon=True),
+        ]
+        for stage in stages:
+            stage.start()
+
+        # 写入阶段在当前线程执行
+        self._stage_write(embedded_queue)
+
+        for stage in stages:
+            stage.join()
+        if self._errors:
+            raise RuntimeError(f"入库流水线异常终止：{self._errors[0]}") from self._errors[0]
+        # 本次运行已完整结束，检查点不再需要；跨运行的去重由入库清单（内容指纹）负责
+        self.checkpoint.reset()
+        return self.stats
+
+    def _stage_crawl(self, crawl_fn, out_queue: queue.Queue):
+        """阶段1：抓取（网络密集），跳过检查点中已处理的记录"""
+        try:
+            for crawl_data in crawl_fn(set(self.checkpoint.done)):
+                if crawl_data.get("id") in self.checkpoint:
+                    self.stats["skipped"] += 1
+                    continue
+                self.stats["crawled"] += 1
+                out_queue.put(crawl_data)
+        except Exception as e:
+            print(f"❌ 抓取阶段失败：{e}")
+            self._errors.append(e)
+        finally:
+            out_queue.put(_END)
+
+    def _stage_split(self, in_queue: queue.Queue, out_queue: queue.Queue):
+        """阶段2：读取文本并分段"""
+        while True:
+            crawl_data = in_queue.get()
+            if crawl_data is _END:
+                break
+            try:
+                data_id, data_type, raw_text = receive_crawl_data(crawl_data)
+                if not raw_text:
+                    print(f"❌ 《{crawl_data.get('title')}》无txt内容，跳过")
+                    self.stats["failed"] += 1
+                    continue
+                segments = split_contract(raw_text, data_type=data_type)
+                out_queue.put({
+                    "crawl_data": crawl_data,
+                    "data_id": data_id,
+                    "data_type": data_type,
+                    "raw_text": raw_text,
+                    "segments": segments,
+                })
+            except Exception as e:
+                print(f"❌ 分段失败《{crawl_data.get('title')}》：{e}")
+                self.stats["failed"] += 1
+        out_queue.put(_END)
+
+    def _stage_embed(self, in_queue: queue.Queue, out_queue: queue.Queue):
+        """阶段3：批量向量化（CPU密集）"""
+        while True:
+            item = in_queue.get()
+            if item is _END:
+                break
+            try:
+                if item["data_type"] == "law":
+                    # 只对内容有变化的条文向量化
+                    plan = self.db_manager.plan_segment_sync("laws", item["data_id"], item["segments"])
+                    print(f"==向量化{len(plan['embed'])}/{len(item['segments'])}段法律文本："
+                          f"{item['crawl_data'].get('title')}==")
+                    item["plan"] = plan
+                    item["embeddings"] = self.db_manager.encode_segments(
+                        [item["segments"][idx] for idx in plan["embed"]]
+                    )
+                out_queue.put(item)
+            except Exception as e:
+                print(f"❌ 向量化失败《{item['crawl_data'].get('title')}》：{e}")
+                self.stats["failed"] += 1
+        out_queue.put(_END)
+
+    def _stage_write(self, in_queue: queue.Queue):
+        """阶段4：批量写入向量库并更新检查点"""
+        while True:
+            item = in_queue.get()
+            if item is _END:
+                break
+            crawl_data = item["crawl_data"]
+            try:
+                if item["data_type"] == "law":
+                    law_metadata = {
+                        "id": crawl_data.get("id"),
+                        "title": crawl_data.get("title"),
+                        "region": "全国",
+                        "gbrq_date": crawl_data.get("gbrq"),
+                    }
+                    self.db_manager.apply_segment_sync(
+                        item["plan"], item["segments"], item["embeddings"], law_metadata
+                    )
+                elif item["data_type"] == "case":
+                    case_metadata = {
+                        "id": crawl_data.get("id"),
+                        "title": crawl_data.get("title"),
+                        "gbrq_date": crawl_data.get("gbrq"),
+                    }
+                    self.db_manager.add_case_template(content=item["raw_text"], metadata=case_metadata)
+                self.checkpoint.mark_done(item["data_id"])
+                self.stats["written"] += 1
+                print(f"✅ 已入库《{crawl_data.get('title')}》")
+            except Exception as e:
+                print(f"❌ 写入失败《{crawl_data.get('title')}》：{e}")
+                self.stats["failed"] += 1
@@ -0,0 +1,140 @@
+"""
+大模型客户端工厂
+
+按 (base_url, api_key) 缓存 OpenAI / AsyncOpenAI 客户端，进程内共享同一个httpx连接池，
+keep-alive连接在请求之间保持，首字延迟不再包含建连与TLS握手。
+异步客户端的连接绑定在事件循环上，因此按事件循环分别缓存：ASGI进程只有一个循环，
+WSGI/runserver 下每个请求由 async_to_sync 新建的循环各自使用独立的客户端。
+base_url 指向本机（如 http://127.0.0.1:9000/v1 的OpenAI兼容桩服务）时允许不配置API密钥，便于测试。
+"""
+import asyncio
+import os
+import threading
+import weakref
+from typing import Dict, Tuple
+from urllib.parse import urlparse
+
+import httpx
+from dotenv import load_dotenv
+from openai import AsyncOpenAI, OpenAI
+
+import config
+
+load_dotenv()
+
+_LOCAL_HOSTS = {"localhost", "127.0.0.1", "::1", "0.0.0.0"}
+# 本地桩服务不校验密钥，但OpenAI客户端要求非空
+_STUB_API_KEY = "local-stub"
+
+_lock = threading.Lock()
+_sync_clients: Dict[Tuple[str, str], OpenAI] = {}
+# 事件循环 → {(base_url, api_key): 客户端}，循环被回收后对应条目自动删除
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, str], AsyncOpenAI]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _http_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=config.LLM_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=config.LLM_HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=config.LLM_HTTP_KEEPALIVE_EXPIRY_S,
+    )
+
+
+def _http_timeout() -> httpx.Timeout:
+    return httpx.Timeout(config.LLM_READ_TIMEOUT_S, connect=config.LLM_CONNECT_TIMEOUT_S)
+
+
+def is_local_base_url(base_url: str) -> bool:
+    """base_url 是否指向本机服务"""
+    return urlparse(base_url).hostname in _LOCAL_HOSTS
+
+
+def resolve_client_settings(base_url: str = None, api_key: str = None) -> Tuple[str, str]:
+    """
+    解析大模型服务地址与密钥
+
+    Args:
+        base_url: 服务地址，默认使用 config.LLM_BASE_URL
+        api_key: API密钥，默认读取环境变量 VITE_HUOSHAN_API_KEY
+
+    Returns:
+        (base_url, api_key)
+
+    Raises:
+        RuntimeError: 远程服务缺少API密钥
+    """
+    base_url = base_url or config.LLM_BASE_URL
+    api_key = api_key or os.getenv("VITE_HUOSHAN_API_KEY")
+    if not api_key:
+        if not is_local_base_url(base_url):
+            raise RuntimeError("缺少 VITE_HUOSHAN_API_KEY，无法调用豆包模型")
+        api_key = _STUB_API_KEY
+    return base_url, api_key
+
+
+def get_llm_client(base_url: str = None, api_key: str = None) -> OpenAI:
+    """
+    获取共享的同步客户端
+
+    Args:
+        base_url: 服务地址
+        api_key: API密钥
+
+    Returns:
+        OpenAI客户端
+    """
+    key = resolve_client_settings(base_url, api_key)
+    client = _sync_clients.get(key)
+    if client is None:
+        with _lock:
+            client = _sync_clients.get(key)
+            if client is None:
+                client = OpenAI(
+                    base_url=key[0],
+                    api_key=key[1],
+                    http_client=httpx.Client(limits=_http_limits(), timeout=_http_timeout()),
+                )
+                _sync_clients[key] = client
+    return client
+
+
+def get_async_llm_client(base_url: str = None, api_key: str = None) -> AsyncOpenAI:
+    """
+    获取当前事件循环共享的异步客户端（须在协程内调用）
+
+    Args:
+        base_url: 服务地址
+        api_key: API密钥
+
+    Returns:
+        AsyncOpenAI客户端
+    """
+    loop = asyncio.get_running_loop()
+    key = resolve_client_settings(base_url, api_key)
+    with _lock:
+        clients = _async_clients.get(loop)
+        if clients is None:
+            clients = _async_clients[loop] = {}
+        client = clients.get(key)
+        if client is None:
+            client = clients[key] = AsyncOpenAI(
+                base_url=key[0],
+                api_key=key[1],
+                http_client=httpx.AsyncClient(limits=_http_limits(), timeout=_http_timeout()),
+            )
+    return client
+
+
+async def close_llm_clients():
+    """关闭所有缓存的客户端（应用关闭时调用；其他事件循环的异步客户端只能丢弃，由垃圾回收释放）"""
+    with _lock:
+        sync_clients = list(_sync_clients.values())
+        async_clients = list((_async_clients.get(asyncio.get_running_loop()) or {}).values())
+        _sync_clients.clear()
+        _async_clients.clear()
+    for client in sync_clients:
+        client.close()
+    for client in async_clients:
+        await client.close()
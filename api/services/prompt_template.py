@@ -0,0 +1,127 @@
+"""
+系统提示词模板
+
+promptContract.txt 在导入时解析为“字面量 / 占位符”片段，每次请求只需一次拼接；
+检索信息块（法律法规、案例、国标行规、合同范本）按请求字段缓存，相同请求直接复用。
+"""
+import re
+from typing import Dict, List, Tuple
+
+import config
+from api.dbManager.EmbeddingCache import LRUTTLCache
+from model_api.knowledge_retriever import retrieve_knowledge_from_kb
+
+# {{ 与 }} 为转义的花括号，{名称} 为占位符
+_TOKEN_PATTERN = re.compile(r"\{\{|\}\}|\{([^{}]+)\}")
+
+# 检索结果字段 → 模板占位符及未检索到时的默认文本
+RETRIEVAL_PLACEHOLDERS = {
+    "latest_laws": ("最新法律法规", "暂无检索到最新法律法规"),
+    "case_studies": ("最新合同纠纷案", "暂无检索到相关典型案例"),
+    "standards": ("最新国标行规", "暂无检索到相关国标行规"),
+    "templates": ("最新合同范本", "暂无检索到相关合同范本"),
+}
+
+_retrieval_block_cache = LRUTTLCache(
+    max_size=config.PROMPT_RETRIEVAL_CACHE_SIZE, ttl=config.PROMPT_RETRIEVAL_CACHE_TTL
+)
+
+
+class PromptTemplate:
+    """预编译的提示词模板"""
+
+    def __init__(self, text: str):
+        """
+        解析模板
+
+        Args:
+            text: 模板文本，占位符写作 {名称}
+        """
+        self.text = text
+        # 片段为 (是否占位符, 字面量或占位符名称)
+        self.segments: List[Tuple[bool, str]] = []
+        literal = []
+        position = 0
+        for match in _TOKEN_PATTERN.finditer(text):
+            literal.append(text[position:match.start()])
+            position = match.end()
+            if match.group(1) is None:
+                literal.append(match.group(0)[0])
+                continue
+            self.segments.append((False, "".join(literal)))
+            self.segments.append((True, match.group(1)))
+            literal = []
+        literal.append(text[position:])
+        self.segments.append((False, "".join(literal)))
+        self.segments = [(is_field, value) for is_field, value in self.segments
+                         if is_field or value]
+        self.placeholders = {value for is_field, value in self.segments if is_field}
+
+    def render(self, values: Dict[str, str]) -> str:
+        """
+        填充占位符（填入的内容不会再被解析，检索文本中的花括号无需转义）
+
+        Args:
+            values: {占位符名称: 内容}，缺失的占位符填空字符串
+
+        Returns:
+            提示词文本
+        """
+        return "".join(
+            (values.get(value) or "") if is_field else value
+            for is_field, value in self.segments
+        )
+
+
+def render_retrieval_block(knowledge: dict = None) -> Dict[str, str]:
+    """
+    把检索结果转换为模板占位符的取值，空的类别使用默认文本
+
+    Args:
+        knowledge: retrieve_knowledge_from_kb 的返回值
+
+    Returns:
+        {占位符名称: 文本}
+    """
+    knowledge = knowledge or {}
+    return {
+        placeholder: " ".join(knowledge.get(field, [])) or default
+        for field, (placeholder, default) in RETRIEVAL_PLACEHOLDERS.items()
+    }
+
+
+async def get_retrieval_block(prompt: str, contract_type: str = None,
+                              cooperation_purpose: str = None, Core_scenario: str = None,
+                              use_knowledge_base: bool = True) -> Dict[str, str]:
+    """
+    获取检索信息块，相同请求在有效期内复用
+
+    Args:
+        prompt: 用户的原始提示
+        contract_type: 合同类型
+        cooperation_purpose: 合作目的
+        Core_scenario: 合同核心场景
+        use_knowledge_base: 是否检索知识库
+
+    Returns:
+        {占位符名称: 文本}
+    """
+    if not use_knowledge_base:
+        return render_retrieval_block()
+
+    key = (prompt or "", contract_type or "", cooperation_purpose or "", Core_scenario or "")
+    block = _retrieval_block_cache.get(key)
+    if block is None:
+        knowledge = await retrieve_knowledge_from_kb(
+            prompt, contract_type, cooperation_purpose, Core_scenario
+        )
+        block = render_retrieval_block(knowledge)
+        # 超时或检索失败时全部为空，不缓存，下次请求重新检索
+        if any(knowledge.get(field) for field in RETRIEVAL_PLACEHOLDERS):
+            _retrieval_block_cache.set(key, block)
+    return block
+
+
+def retrieval_cache_stats() -> dict:
+    """检索信息块缓存的命中统计"""
+    return _retrieval_block_cache.stats()
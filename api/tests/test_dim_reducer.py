@@ -0,0 +1,72 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from api.dbManager.DimReducer import DimReducer, benchmark_recall
+
+
+def _low_rank_corpus(count=200, dim=64, rank=8, seed=0):
+    """近似低秩的归一化语料向量（真实向量的能量也集中在少数方向上）"""
+    rng = np.random.default_rng(seed)
+    corpus = rng.standard_normal((count, rank)) @ rng.standard_normal((rank, dim))
+    corpus += 0.01 * rng.standard_normal((count, dim))
+    return (corpus / np.linalg.norm(corpus, axis=1, keepdims=True)).astype(np.float32)
+
+
+class DimReducerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.corpus = _low_rank_corpus()
+
+    def test_fit_shapes_and_energy(self):
+        reducer = DimReducer.fit(self.corpus, 8)
+        self.assertEqual((reducer.input_dim, reducer.output_dim), (64, 8))
+        self.assertGreater(reducer.explained_variance, 0.99)
+
+    def test_transform_preserves_inner_products(self):
+        reducer = DimReducer.fit(self.corpus, 8)
+        reduced = reducer.transform(self.corpus)
+        self.assertEqual(reduced.shape, (200, 8))
+        self.assertEqual(reduced.dtype, np.float32)
+        np.testing.assert_allclose(np.linalg.norm(reduced, axis=1), 1.0, atol=1e-5)
+        np.testing.assert_allclose(reduced @ reduced.T, self.corpus @ self.corpus.T, atol=0.02)
+
+    def test_transform_single_vector(self):
+        reducer = DimReducer.fit(self.corpus, 8)
+        single = reducer.transform(self.corpus[0])
+        self.assertEqual(single.shape, (8,))
+        np.testing.assert_allclose(single, reducer.transform(self.corpus)[0], atol=1e-6)
+
+    def test_rejects_invalid_dims(self):
+        with self.assertRaises(ValueError):
+            DimReducer.fit(self.corpus, 64)
+        with self.assertRaises(ValueError):
+            DimReducer.fit(self.corpus[:4], 8)
+        reducer = DimReducer.fit(self.corpus, 8)
+        with self.assertRaises(ValueError):
+            reducer.transform(np.zeros(32, dtype=np.float32))
+
+    def test_save_and_load(self):
+        reducer = DimReducer.fit(self.corpus, 8)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "dim_reducer.npz")
+            self.assertIsNone(DimReducer.load(path))
+            reducer.save(path)
+            loaded = DimReducer.load(path)
+        np.testing.assert_array_equal(loaded.components, reducer.components)
+        self.assertAlmostEqual(loaded.explained_variance, reducer.explained_variance)
+        np.testing.assert_array_equal(loaded.transform(self.corpus), reducer.transform(self.corpus))
+
+    def test_benchmark_recall(self):
+        reducer = DimReducer.fit(self.corpus, 8)
+        stats = benchmark_recall(reducer, self.corpus, num_queries=20, top_k=5, float16=True)
+        self.assertEqual(stats["queries"], 20)
+        self.assertGreater(stats["mean_recall"], 0.8)
+        self.assertEqual(stats["bytes_per_vector_full"], 64 * 4)
+        self.assertEqual(stats["bytes_per_vector_reduced"], 8 * 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
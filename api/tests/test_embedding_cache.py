@@ -0,0 +1,102 @@
+import os
+import tempfile
+import time
+import unittest
+
+import numpy as np
+
+from api.dbManager.EmbeddingCache import EmbeddingCache, LRUTTLCache
+
+
+class LRUTTLCacheTests(unittest.TestCase):
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUTTLCache(max_size=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        self.assertEqual(cache.get("a"), 1)  # a 变为最近使用
+        cache.set("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(len(cache), 2)
+
+    def test_expires_after_ttl(self):
+        cache = LRUTTLCache(max_size=10, ttl=0.05)
+        cache.set("a", 1)
+        self.assertEqual(cache.get("a"), 1)
+        time.sleep(0.08)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+
+    def test_stats(self):
+        cache = LRUTTLCache(max_size=10)
+        cache.set("a", 1)
+        cache.get("a")
+        cache.get("b")
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+        self.assertEqual(stats["hit_rate"], 0.5)
+
+
+class EmbeddingCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.vector = np.random.default_rng(0).standard_normal(1024).astype(np.float32)
+        self.vector /= np.linalg.norm(self.vector)
+
+    def test_key_normalizes_whitespace_and_width(self):
+        self.assertEqual(
+            EmbeddingCache.make_key("  买卖　合同 ", "bge", True),
+            EmbeddingCache.make_key("买卖 合同", "bge", True)
+        )
+        self.assertNotEqual(
+            EmbeddingCache.make_key("买卖合同", "bge", True),
+            EmbeddingCache.make_key("买卖合同", "bge", False)
+        )
+
+    def test_float32_round_trip(self):
+        cache = EmbeddingCache(max_size=4)
+        cache.set("买卖合同", "bge", True, self.vector)
+        cached = cache.get("买卖合同", "bge", True)
+        self.assertEqual(cached.dtype, np.float32)
+        np.testing.assert_array_equal(cached, self.vector)
+        self.assertFalse(cached.flags.writeable)
+
+    def test_float16_round_trip(self):
+        cache = EmbeddingCache(max_size=4, float16=True)
+        cache.set("买卖合同", "bge", True, self.vector)
+        self.assertEqual(cache.memory.get(EmbeddingCache.make_key("买卖合同", "bge", True)).dtype,
+                         np.float16)
+        cached = cache.get("买卖合同", "bge", True)
+        self.assertEqual(cached.dtype, np.float32)
+        self.assertFalse(cached.flags.writeable)
+        np.testing.assert_allclose(cached, self.vector, atol=1e-3)
+        self.assertGreater(float(cached @ self.vector), 0.9999)
+
+    def test_memory_eviction(self):
+        cache = EmbeddingCache(max_size=1)
+        cache.set("a", "bge", True, self.vector)
+        cache.set("b", "bge", True, self.vector)
+        self.assertIsNone(cache.get("a", "bge", True))
+        self.assertIsNotNone(cache.get("b", "bge", True))
+
+    def test_disk_layer_float16_and_ttl(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "cache.sqlite3")
+            cache = EmbeddingCache(max_size=1, disk_path=path, float16=True, ttl=0.1)
+            cache.set("a", "bge", True, self.vector)
+            cache.set("b", "bge", True, self.vector)  # a 被挤出内存层，仍在磁盘层
+
+            cached = cache.get("a", "bge", True)
+            self.assertEqual(cache.disk_hits, 1)
+            self.assertEqual(cached.dtype, np.float32)
+            np.testing.assert_allclose(cached, self.vector, atol=1e-3)
+
+            time.sleep(0.15)
+            self.assertIsNone(cache.get("a", "bge", True))
+            cache._conn.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
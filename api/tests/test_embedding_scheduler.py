@@ -0,0 +1,46 @@
+import threading
+import time
+import unittest
+
+import numpy as np
+
+from api.dbManager.EmbeddingScheduler import EmbeddingScheduler
+
+
+def _encode(texts, normalize):
+    time.sleep(0.01)
+    return np.array([[len(text), float(normalize)] for text in texts], dtype=np.float32)
+
+
+class EmbeddingSchedulerTests(unittest.TestCase):
+
+    def test_concurrent_requests_are_batched(self):
+        scheduler = EmbeddingScheduler(_encode, max_batch_size=8, max_wait_ms=50)
+        results = {}
+
+        def worker(text):
+            results[text] = scheduler.encode([text], True)[0]
+
+        threads = [threading.Thread(target=worker, args=("字" * n,)) for n in range(1, 9)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        scheduler.close()
+
+        self.assertEqual(results["字字字"].tolist(), [3.0, 1.0])
+        self.assertLess(scheduler.stats()["batches"], 8)
+
+    def test_close_finishes_pending_requests_and_stops_worker(self):
+        scheduler = EmbeddingScheduler(_encode, max_wait_ms=1)
+        futures = [scheduler.submit(str(n), False) for n in range(5)]
+        scheduler.close()
+        self.assertTrue(all(future.done() for future in futures))
+        self.assertFalse(scheduler._worker.is_alive())
+        with self.assertRaises(RuntimeError):
+            scheduler.submit("x", False)
+        scheduler.close()  # 重复关闭无副作用
+
+
+if __name__ == "__main__":
+    unittest.main()
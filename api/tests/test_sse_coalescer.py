@@ -0,0 +1,72 @@
+import asyncio
+import time
+import unittest
+
+from api.services.sse_coalescer import DeltaBuffer, acoalesce, coalesce
+
+
+class DeltaBufferTests(unittest.TestCase):
+
+    def test_flush_on_byte_threshold(self):
+        buffer = DeltaBuffer(max_bytes=6, interval_ms=10_000)
+        buffer.add("合")
+        self.assertFalse(buffer.should_flush())
+        buffer.add("同")  # 两个汉字共6字节（UTF-8）
+        self.assertTrue(buffer.should_flush())
+        self.assertEqual(buffer.flush(), "合同")
+        self.assertFalse(buffer)
+        self.assertIsNone(buffer.remaining())
+
+    def test_flush_on_interval(self):
+        buffer = DeltaBuffer(max_bytes=1024, interval_ms=20)
+        buffer.add("a")
+        self.assertFalse(buffer.should_flush())
+        time.sleep(0.03)
+        self.assertEqual(buffer.remaining(), 0.0)
+        self.assertTrue(buffer.should_flush())
+
+    def test_empty_buffer_never_flushes(self):
+        buffer = DeltaBuffer(max_bytes=0, interval_ms=0)
+        self.assertFalse(buffer.should_flush())
+
+
+class CoalesceTests(unittest.TestCase):
+
+    def test_groups_by_bytes(self):
+        frames = list(coalesce(["ab", "cd", "ef", "g"], max_bytes=4, interval_ms=10_000))
+        self.assertEqual(frames, ["abcd", "efg"])
+
+    def test_zero_threshold_passes_deltas_through(self):
+        self.assertEqual(list(coalesce(["a", "b"], max_bytes=0)), ["a", "b"])
+
+    def test_empty_stream(self):
+        self.assertEqual(list(coalesce([], max_bytes=4)), [])
+
+
+class AsyncCoalesceTests(unittest.TestCase):
+
+    @staticmethod
+    def _collect(deltas, **kwargs):
+        async def run():
+            return [frame async for frame in acoalesce(deltas, **kwargs)]
+        return asyncio.run(run())
+
+    def test_groups_by_bytes(self):
+        async def deltas():
+            for content in ["ab", "cd", "e"]:
+                yield content
+
+        self.assertEqual(self._collect(deltas(), max_bytes=4, interval_ms=10_000), ["abcd", "e"])
+
+    def test_flushes_when_upstream_stalls(self):
+        async def deltas():
+            yield "a"
+            yield "b"
+            await asyncio.sleep(0.1)
+            yield "c"
+
+        self.assertEqual(self._collect(deltas(), max_bytes=1024, interval_ms=20), ["ab", "c"])
+
+
+if __name__ == "__main__":
+    unittest.main()
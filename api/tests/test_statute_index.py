@@ -0,0 +1,107 @@
+import os
+import tempfile
+import unittest
+
+from api.dbManager.StatuteIndex import (
+    StatuteIndex, normalize_title, parse_chinese_number, split_articles
+)
+
+
+class ParseChineseNumberTests(unittest.TestCase):
+
+    def test_arabic_and_fullwidth_digits(self):
+        self.assertEqual(parse_chinese_number("604"), 604)
+        self.assertEqual(parse_chinese_number("６０４"), 604)
+
+    def test_chinese_numerals(self):
+        self.assertEqual(parse_chinese_number("一"), 1)
+        self.assertEqual(parse_chinese_number("十"), 10)
+        self.assertEqual(parse_chinese_number("十二"), 12)
+        self.assertEqual(parse_chinese_number("二十"), 20)
+        self.assertEqual(parse_chinese_number("一百零五"), 105)
+        self.assertEqual(parse_chinese_number("六百零四"), 604)
+        self.assertEqual(parse_chinese_number("一千二百六十"), 1260)
+
+    def test_invalid(self):
+        self.assertIsNone(parse_chinese_number(""))
+        self.assertIsNone(parse_chinese_number("第三"))
+
+
+class NormalizeTitleTests(unittest.TestCase):
+
+    def test_strips_brackets_prefix_and_version_note(self):
+        self.assertEqual(normalize_title("《中华人民共和国民法典》"), "民法典")
+        self.assertEqual(normalize_title("中华人民共和国公司法（2018年修正）"), "公司法")
+
+
+class SplitArticlesTests(unittest.TestCase):
+
+    def test_several_articles_in_one_segment(self):
+        articles = split_articles(
+            ["s0"],
+            ["第一条 为了保护民事主体的合法权益，制定本法。第二条 民法调整平等主体之间的关系。"
+             "第三条 民事主体的人身权利受法律保护。"]
+        )
+        self.assertEqual([article for article, _, _ in articles], [1, 2, 3])
+        self.assertEqual(articles[1], (2, "s0", "第二条 民法调整平等主体之间的关系。"))
+
+    def test_inline_reference_is_not_a_boundary(self):
+        articles = split_articles(["s0"], ["第五条 依照本法第一条的规定执行。第六条 其他。"])
+        self.assertEqual([article for article, _, _ in articles], [5, 6])
+        self.assertEqual(articles[0][2], "第五条 依照本法第一条的规定执行。")
+
+    def test_article_continuing_into_next_segment(self):
+        articles = split_articles(
+            ["s0", "s1"],
+            ["第七条 当事人应当遵循", "第三人利益保护原则。第八条 其他。"]
+        )
+        self.assertEqual(articles[0], (7, "s0", "第七条 当事人应当遵循第三人利益保护原则。"))
+        self.assertEqual(articles[1], (8, "s1", "第八条 其他。"))
+
+
+class StatuteIndexTests(unittest.TestCase):
+
+    def setUp(self):
+        self.index = StatuteIndex(os.path.join(tempfile.mkdtemp(), "statute.sqlite3"))
+        self.index.replace(
+            "R1", "中华人民共和国民法典", ["R1_block_0", "R1_block_1"],
+            ["第一条 为了保护民事主体的合法权益，制定本法。第二条 民法调整平等主体之间的关系。",
+             "第六百零四条 标的物毁损、灭失的风险，在标的物交付之前由出卖人承担。"]
+        )
+
+    def test_lookup_article_in_middle_of_segment(self):
+        results = self.index.lookup("民法典", 2)
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]["segment_id"], "R1_block_0")
+        self.assertEqual(results[0]["content"], "第二条 民法调整平等主体之间的关系。")
+
+    def test_lookup_accepts_chinese_article_numbers(self):
+        self.assertEqual(self.index.lookup("《中华人民共和国民法典》", "第六百零四条")[0]["article"], 604)
+        self.assertEqual(self.index.lookup("民法典", 3), [])
+
+    def test_find_citations(self):
+        self.assertEqual(
+            self.index.find_citations("《民法典》第604条和民法典第二条怎么理解"),
+            [("民法典", 604), ("民法典", 2)]
+        )
+        self.assertEqual(self.index.find_citations("买卖合同的风险承担"), [])
+
+    def test_rebuild_marks_index_built(self):
+        self.assertFalse(self.index.is_built())
+        self.index.rebuild([("R2", "公司法", ["R2_block_0"], ["第一条 甲。第二条 乙。"])])
+        self.assertTrue(self.index.is_built())
+        self.assertEqual(self.index.lookup("民法典", 1), [])
+        self.assertEqual(self.index.lookup("公司法", 2)[0]["content"], "第二条 乙。")
+
+    def test_rebuild_skips_documents_without_id(self):
+        self.index.rebuild([
+            (None, "公司法", ["x"], ["第一条 甲。"]),
+            ("R3", "合伙企业法", ["R3"], ["第一条 丙。"]),
+        ])
+        self.assertTrue(self.index.is_built())
+        self.assertEqual(self.index.lookup("公司法", 1), [])
+        self.assertEqual(self.index.lookup("合伙企业法", 1)[0]["segment_id"], "R3")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -7,6 +7,7 @@ from .views import (
     SimpleLoginView,
     CurrentUserView,
     UserQueryView,
+    StatuteLookupView,
     ContractGenerationView,
 )
 
@@ -18,6 +19,7 @@ urlpatterns = [
     path('register/', SimpleRegisterView.as_view(), name='simple-register'),
     path('login/', SimpleLoginView.as_view(), name='simple-login'),
     path('user_query/', UserQueryView.as_view(), name='user-query'),
+    path('statute/', StatuteLookupView.as_view(), name='statute-lookup'),
     path('contract/generate/', ContractGenerationView.as_view(), name='contract-generate'),
     path('me/', CurrentUserView.as_view(), name='current-user'),
 ]
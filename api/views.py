@@ -5,13 +5,21 @@ from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
-from django.http import StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
 from .models import Document
 from .serializers import DocumentSerializer, ContractGenerateSerializer
-from .dbManager.VectorDBManager import VectorDBManager
-from .services.contract_generation import generate_contract_stream
+from .dbManager.registry import use_vector_db_manager
+from .services.contract_generation import generate_contract_stream_async
+import json
+import logging
 import uuid
 
+logger = logging.getLogger(__name__)
+
 
 # 简单注册视图
 class SimpleRegisterView(APIView):
@@ -184,6 +192,12 @@ class UserQueryView(APIView):
         region = request.data.get('region')
         industry = request.data.get('industry')
         context = request.data.get('context')
+        include_embeddings = str(request.data.get('include_embeddings', '')).lower() in ('1', 'true')
+        contract_mode = request.data.get('contract_mode')
+        retrieval_mode = request.data.get('retrieval_mode')
+        rerank = request.data.get('rerank')
+        if rerank is not None:
+            rerank = str(rerank).lower() in ('1', 'true')
 
         if not context:
             return Response(
@@ -196,7 +210,11 @@ class UserQueryView(APIView):
                 query_type=query_type,
                 region=region,
                 industry=industry,
-                context=context
+                context=context,
+                include_embeddings=include_embeddings,
+                contract_mode=contract_mode,
+                retrieval_mode=retrieval_mode,
+                rerank=rerank
             )
             return Response(query_result, status=status.HTTP_200_OK)
         except ValueError as error:
@@ -213,7 +231,9 @@ class UserQueryView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-    def handle_user_query(self, query_type, region, industry, context):
+    def handle_user_query(self, query_type, region, industry, context,
+                          include_embeddings=False, contract_mode=None, retrieval_mode=None,
+                          rerank=None):
         if not context:
             raise ValueError("context is required")
 
@@ -231,11 +251,15 @@ class UserQueryView(APIView):
                 query_fragments.append(fragment)
         combined_query_text = " ".join(query_fragments)
 
-        vector_database_manager = VectorDBManager()
-        search_result = vector_database_manager.dual_matching(
-            user_query=combined_query_text,
-            user_filters=user_filters
-        )
+        with use_vector_db_manager() as vector_database_manager:
+            search_result = vector_database_manager.dual_matching(
+                user_query=combined_query_text,
+                user_filters=user_filters,
+                include_embeddings=include_embeddings,
+                contract_mode=contract_mode,
+                retrieval_mode=retrieval_mode,
+                rerank=rerank
+            )
 
         return {
             "query": {
@@ -249,21 +273,59 @@ class UserQueryView(APIView):
             "best_contract": search_result.get("best_contract"),
             "alternative_contracts": search_result.get("alternative_contracts"),
             "relevant_laws": search_result.get("relevant_laws"),
-            "relevant_case": search_result.get("relevant_case")
+            "relevant_case": search_result.get("relevant_case"),
+            "retrieval_mode": search_result.get("retrieval_mode"),
+            "reranked": search_result.get("reranked"),
+            "timings": search_result.get("timings")
         }
 
 
-class ContractGenerationView(APIView):
+class StatuteLookupView(APIView):
+    """按法规名称与条号直接查询条文：?title=民法典&article=604，或 ?q=《民法典》第604条"""
     permission_classes = []
 
-    def post(self, request):
-        serializer = ContractGenerateSerializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
+    def get(self, request):
+        title = request.query_params.get('title')
+        article = request.query_params.get('article')
+        query = request.query_params.get('q')
+
+        if not (title and article) and not query:
+            return Response(
+                {"error": "title and article, or q, are required"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        with use_vector_db_manager() as vector_database_manager:
+            if title and article:
+                results = vector_database_manager.lookup_statute(title, article)
+            else:
+                results = vector_database_manager.lookup_cited_statutes(query)
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
+
+# 合同生成是长时间的流式响应，使用原生异步视图（DRF的APIView不支持async），
+# 必须在ASGI下运行（uvicorn backend.asgi:application）：WSGI会把整个流读完后才发送
+@method_decorator(csrf_exempt, name="dispatch")
+class ContractGenerationView(View):
+    http_method_names = ["post"]
+
+    async def post(self, request):
+        try:
+            data = json.loads(request.body or b"{}")
+        except json.JSONDecodeError:
+            return JsonResponse({"error": "请求体不是合法的JSON"}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = ContractGenerateSerializer(data=data)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        if not isinstance(request, ASGIRequest):
+            # 仅在 REQUIRE_ASGI=0 时可能运行到这里（见 backend/wsgi.py）
+            logger.warning("合同生成接口运行在WSGI下，流式输出会在生成结束后一次性返回")
 
         try:
-            stream = generate_contract_stream(serializer.validated_data)
+            stream, cache_status = await generate_contract_stream_async(serializer.validated_data)
         except RuntimeError as exc:
-            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+            return JsonResponse({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
         return StreamingHttpResponse(
             stream,
@@ -271,6 +333,7 @@ class ContractGenerationView(APIView):
             headers={
                 "Cache-Control": "no-cache",
                 "X-Accel-Buffering": "no",
+                "X-Generation-Cache": cache_status,
             },
         )
 
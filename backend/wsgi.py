@@ -9,8 +9,18 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
 
 import os
 
+from django.core.exceptions import ImproperlyConfigured
 from django.core.wsgi import get_wsgi_application
 
+import config
+
+if config.REQUIRE_ASGI:
+    # 合同生成的流式输出在WSGI下会被整体缓冲，启动时直接失败，而不是在每个请求上静默退化
+    raise ImproperlyConfigured(
+        "本项目需通过ASGI运行：uvicorn backend.asgi:application；"
+        "确需使用WSGI（合同生成不再逐段输出）时设置 REQUIRE_ASGI=0"
+    )
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_wsgi_application()
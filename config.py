@@ -15,17 +15,105 @@ LAWS_DIR = os.path.join(DATA_DIR, "laws")
 BGE_MODEL_NAME = os.path.join(BASE_DIR, "models", "bge-large-zh")
 EMBEDDING_DIM = 1024
 NORMALIZE_EMBEDDINGS = True
+# 推理后端：torch（PyTorch / sentence-transformers）或 onnx（onnxruntime，CPU）
+BGE_BACKEND = os.getenv("BGE_BACKEND", "torch")
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", os.path.join(BASE_DIR, "models", "bge-large-zh-onnx"))
+ONNX_QUANTIZED = os.getenv("ONNX_QUANTIZED", "1") == "1"  # 是否使用int8动态量化模型
+ONNX_INTRA_OP_THREADS = int(os.getenv("ONNX_INTRA_OP_THREADS", "0"))  # 0表示由onnxruntime决定
+ONNX_PARITY_MIN_COSINE = 0.99  # 切换后端前与PyTorch向量的最低余弦一致性
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))  # 入库时每次前向计算的文本数
+
+# 共享向量化服务配置：设置 EMBEDDING_SERVICE_URL 后，BGEModel 不在本进程加载模型，
+# 而是转发到 python -m api.dbManager.EmbeddingService 启动的服务
+EMBEDDING_SERVICE_URL = os.getenv("EMBEDDING_SERVICE_URL", "")  # unix:///path.sock 或 http://127.0.0.1:8765
+EMBEDDING_SERVICE_DEFAULT_BIND = "unix:///tmp/bge-embedding.sock"
+EMBEDDING_SERVICE_TIMEOUT = float(os.getenv("EMBEDDING_SERVICE_TIMEOUT", "30"))
+
+# 微批调度配置：并发的单条查询在等待窗口内合并为一个批次计算
+EMBEDDING_MICROBATCH_ENABLED = os.getenv("EMBEDDING_MICROBATCH_ENABLED", "1") == "1"
+EMBEDDING_MICROBATCH_MAX_SIZE = int(os.getenv("EMBEDDING_MICROBATCH_MAX_SIZE", "32"))
+EMBEDDING_MICROBATCH_MAX_WAIT_MS = float(os.getenv("EMBEDDING_MICROBATCH_MAX_WAIT_MS", "5"))
+
+# 查询向量缓存配置
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "2048"))  # 内存层条目数，0表示关闭缓存
+EMBEDDING_CACHE_TTL = float(os.getenv("EMBEDDING_CACHE_TTL", "86400"))  # 过期时间（秒），0表示不过期
+EMBEDDING_CACHE_DISK_PATH = os.getenv("EMBEDDING_CACHE_DISK_PATH") or None  # 磁盘层SQLite文件，为空则不启用
+EMBEDDING_CACHE_DISK_MAX_SIZE = int(os.getenv("EMBEDDING_CACHE_DISK_MAX_SIZE", "100000"))
+EMBEDDING_CACHE_FLOAT16 = os.getenv("EMBEDDING_CACHE_FLOAT16", "0") == "1"  # 以float16缓存向量，占用减半
 
 # 数据库配置
 COLLECTION_CONTRACTS = "contract_templates"
 COLLECTION_LAWS = "legal_regulations"
 COLLECTION_CASE = "case_templates"  
+COLLECTION_CONTRACT_SEGMENTS = "contract_segments"
+CHROMA_WRITE_BATCH_SIZE = int(os.getenv("CHROMA_WRITE_BATCH_SIZE", "1000"))  # 单次写入Chroma的最大条数
+
+# 向量降维配置：python manage.py reduce_embedding_dim 在语料上拟合投影矩阵并保存到向量库目录，
+# 之后入库与查询的向量都先降维再写入/检索（Chroma按float32存储，1024 → 256 维即占用降为1/4）
+DIM_REDUCER_FILE = "dim_reducer.npz"  # 投影矩阵文件，存放在向量库目录下，存在即启用降维
+DIM_REDUCTION_DIM = int(os.getenv("DIM_REDUCTION_DIM", "256"))  # 默认目标维度
+DIM_REDUCTION_FIT_SAMPLE = 20000  # 拟合投影矩阵使用的最大向量数
+DIM_REDUCTION_BENCHMARK_QUERIES = 200  # 召回对比使用的查询数（从库中随机抽取）
+DIM_REDUCTION_BENCHMARK_TOP_K = 10
+DIM_REDUCTION_MIN_RECALL = 0.9  # 降维后top-k与全维结果的平均重合率低于该值时拒绝迁移
+
+# HNSW索引配置（创建集合时写入集合元数据，修改后需执行 python manage.py rebuild_vector_index 重建已有集合）
+# space: 距离度量，BGE向量已归一化，使用cosine使 1 - distance 即为余弦相似度
+# M: 每个节点的邻居数，越大召回越高、内存与建索引耗时越大
+# construction_ef: 建索引时的候选队列长度；search_ef: 查询时的候选队列长度，越大召回越高、查询越慢
+HNSW_DEFAULT_CONFIG = {
+    "space": "cosine",
+    "M": 16,
+    "construction_ef": 200,
+    "search_ef": 100,
+}
+HNSW_COLLECTION_CONFIG = {
+    COLLECTION_CONTRACTS: {},
+    # 法律条文数量增长最快，提高连通度与查询候选数以保持召回
+    COLLECTION_LAWS: {"M": 32, "search_ef": int(os.getenv("HNSW_LAWS_SEARCH_EF", "128"))},
+    COLLECTION_CASE: {},
+    COLLECTION_CONTRACT_SEGMENTS: {"search_ef": int(os.getenv("HNSW_SEGMENTS_SEARCH_EF", "128"))},
+}
 
 # 检索配置
 SIMILARITY_THRESHOLD = 0.75  # 相似度阈值
 MAX_CONTRACT_RESULTS = 5
 MAX_LAW_RESULTS = 10
 MAX_CASE_RESULTS = 5
+# 合同检索方式：template（整体模板向量）/ segment（条款检索后聚合到模板）
+CONTRACT_SEARCH_MODE = os.getenv("CONTRACT_SEARCH_MODE", "template")
+CONTRACT_SEGMENT_AGGREGATION = "max"  # 条款得分聚合方式：max / sum（前top_k之和）
+CONTRACT_SEGMENT_TOP_K = 3  # 每个模板参与聚合并返回的条款数
+CONTRACT_SEGMENT_CANDIDATES = 50  # 条款检索的候选数量
+VECTOR_SEARCH_MAX_WORKERS = int(os.getenv("VECTOR_SEARCH_MAX_WORKERS", "6"))  # 并发集合查询线程数
+# 元数据倒排索引：过滤条件先解析为候选ID，候选数不超过阈值时对候选集精确计算相似度，否则使用带过滤的ANN检索
+METADATA_INDEX_FILE = "metadata_index.sqlite3"  # 存放在向量库目录下
+METADATA_INDEX_FIELDS = ["type", "region", "industry", "business_type", "law_topic", "effect_status"]
+METADATA_EXACT_SEARCH_MAX_CANDIDATES = int(os.getenv("METADATA_EXACT_SEARCH_MAX_CANDIDATES", "2000"))
+# 检索方式：dense（向量）/ hybrid（向量 + BM25，倒数排名融合）/ sparse（仅BM25，不需要向量化查询）
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "dense")
+BM25_INDEX_FILE = "bm25_index.sqlite3"  # jieba分词的BM25倒排索引，存放在向量库目录下
+BM25_K1 = 1.5
+BM25_B = 0.75
+HYBRID_CANDIDATES = 30  # hybrid模式下每路检索的候选数
+RRF_K = 60  # 倒数排名融合常数：score = Σ 1 / (RRF_K + rank)
+# 查询中引用具体法条（如“《民法典》第604条”）时按条号直接取条文并排在法律结果最前面；
+# 法律集合的向量检索照常进行，补充引用之外的相关条文
+STATUTE_LOOKUP_ENABLED = os.getenv("STATUTE_LOOKUP_ENABLED", "1") == "1"
+STATUTE_INDEX_FILE = "statute_index.sqlite3"  # 法条编号索引，存放在向量库目录下
+# 向量化微批队列积压超过该值时，dense/hybrid 检索临时降级为sparse，0表示不降级
+SPARSE_FALLBACK_QUEUE_DEPTH = int(os.getenv("SPARSE_FALLBACK_QUEUE_DEPTH", "64"))
+# 重排序：dual_matching 对法律法规与案例的首轮候选用交叉编码器重新打分
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "0") == "1"
+RERANK_MODEL_NAME = os.getenv("RERANK_MODEL_NAME", os.path.join(BASE_DIR, "models", "bge-reranker-base"))
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))  # 每个集合参与重排序的首轮候选数
+RERANK_TOP_N_LAWS = 5  # 重排序后保留的法律法规条数
+RERANK_TOP_N_CASES = 3  # 重排序后保留的案例条数
+RERANK_MIN_SCORE = 0.0  # 重排序得分（0~1）低于该值的结果丢弃
+RERANK_TIME_BUDGET_MS = float(os.getenv("RERANK_TIME_BUDGET_MS", "300"))  # 超出预算时使用首轮排序，0表示不限时
+RERANK_BATCH_SIZE = 16
+RERANK_RETRY_COOLDOWN_S = float(os.getenv("RERANK_RETRY_COOLDOWN_S", "300"))  # 重排序模型加载失败后多久再重试（秒）
+RERANK_MAX_LENGTH = 512
 
 # 元数据字段
 CONTRACT_METADATA_FIELDS = [
@@ -36,4 +124,47 @@ CONTRACT_METADATA_FIELDS = [
 LAW_METADATA_FIELDS = [
     "type", "region", "law_topic", "importance",
     "publish_date", "effect_status", "regulatory_authority"
-]
\ No newline at end of file
+]
+
+# 入库流水线配置
+INGEST_CHECKPOINT_PATH = os.getenv(
+    "INGEST_CHECKPOINT_PATH", os.path.join(DATA_DIR, "ingest_checkpoint.json")
+)  # 已入库数据ID的检查点文件
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "8"))  # 流水线各阶段之间的队列长度
+INGEST_MANIFEST_FILE = "ingest_manifest.sqlite3"  # 分段内容指纹清单，存放在向量库目录下
+
+# 共享实例配置
+# 为True时在Django应用启动(ready)时后台预热向量库与模型，否则在首次请求时加载
+VECTOR_DB_WARMUP_ON_STARTUP = os.getenv("VECTOR_DB_WARMUP_ON_STARTUP", "0") == "1"
+
+# 部署方式：合同生成接口是异步流式视图，只有ASGI能逐段输出。
+# 为True时通过WSGI（runserver/gunicorn）启动直接报错；设为0允许WSGI，但生成结果会在结束后一次性返回
+REQUIRE_ASGI = os.getenv("REQUIRE_ASGI", "1") == "1"
+
+# 生成接口知识库检索配置
+KB_RETRIEVAL_TIMEOUT_S = float(os.getenv("KB_RETRIEVAL_TIMEOUT_S", "3"))  # 单次请求检索时间预算（秒），超时使用默认提示
+KB_RETRIEVAL_MAX_WORKERS = int(os.getenv("KB_RETRIEVAL_MAX_WORKERS", "4"))  # 执行同步检索的线程数
+KB_SNIPPET_MAX_CHARS = 300  # 写入提示词的单条检索结果最大字数
+PROMPT_RETRIEVAL_CACHE_SIZE = int(os.getenv("PROMPT_RETRIEVAL_CACHE_SIZE", "256"))  # 检索信息块缓存条数，0表示不缓存
+PROMPT_RETRIEVAL_CACHE_TTL = float(os.getenv("PROMPT_RETRIEVAL_CACHE_TTL", "600"))  # 检索信息块缓存有效期（秒）
+
+# 大模型调用配置
+LLM_BASE_URL = os.getenv(
+    "HUOSHAN_API_BASE_URL", "https://ark.cn-beijing.volces.com/api/v3"
+)  # OpenAI兼容服务地址，指向本机桩服务时可不配置API密钥
+LLM_MAX_CONCURRENT_STREAMS = int(os.getenv("LLM_MAX_CONCURRENT_STREAMS", "64"))  # 单个worker同时进行的流式生成数
+LLM_QUEUE_TIMEOUT_S = float(os.getenv("LLM_QUEUE_TIMEOUT_S", "30"))  # 达到并发上限时排队等待的最长时间（秒）
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "100"))  # 连接池最大连接数
+LLM_HTTP_MAX_KEEPALIVE = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", "20"))  # 连接池保持的空闲keep-alive连接数
+LLM_HTTP_KEEPALIVE_EXPIRY_S = float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY_S", "120"))  # 空闲连接保持时间（秒）
+LLM_CONNECT_TIMEOUT_S = float(os.getenv("LLM_CONNECT_TIMEOUT_S", "5"))  # 建立连接超时（秒）
+LLM_READ_TIMEOUT_S = float(os.getenv("LLM_READ_TIMEOUT_S", "120"))  # 流式读取超时（秒）
+SSE_COALESCE_MAX_BYTES = int(os.getenv("SSE_COALESCE_MAX_BYTES", "256"))  # 流式输出合并成一帧的字节阈值，0表示逐段输出
+SSE_COALESCE_INTERVAL_MS = float(os.getenv("SSE_COALESCE_INTERVAL_MS", "30"))  # 流式输出的最长合并间隔（毫秒）
+
+# 合同生成结果缓存（请求中 use_cache=true 时生效）
+GENERATION_CACHE_ENABLED = os.getenv("GENERATION_CACHE_ENABLED", "1") == "1"  # 总开关，为False时所有请求都不走缓存
+GENERATION_CACHE_PATH = os.getenv(
+    "GENERATION_CACHE_PATH", os.path.join(DATA_DIR, "generation_cache.sqlite3")
+)
+GENERATION_CACHE_MAX_BYTES = int(os.getenv("GENERATION_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))  # 缓存内容总字节上限
@@ -1,48 +1,109 @@
-#import httpx 
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 
-async def retrieve_knowledge_from_kb(query: str, contract_type: str = None, cooperation_purpose: str = None, Core_scenario: str = None, top_k: int = 3) -> dict:
+import config
+from api.dbManager.registry import use_vector_db_manager
+
+# 同步的向量检索放在独立线程池中执行，不阻塞事件循环，
+# 超时后遗留的线程也不会占满事件循环的默认线程池
+_retrieval_executor = ThreadPoolExecutor(
+    max_workers=config.KB_RETRIEVAL_MAX_WORKERS, thread_name_prefix="kb-retrieval"
+)
+
+EMPTY_KNOWLEDGE = {
+    "latest_laws": [],
+    "case_studies": [],
+    "standards": [],
+    "templates": []
+}
+
+
+def _clip(text: str, max_chars: int = None) -> str:
+    max_chars = max_chars or config.KB_SNIPPET_MAX_CHARS
+    text = (text or "").strip()
+    return text if len(text) <= max_chars else text[:max_chars] + "……"
+
+
+def _build_query(query: str, contract_type: str = None, cooperation_purpose: str = None,
+                 Core_scenario: str = None) -> str:
+    """把用户需求与合同类型、目的、场景拼接成一条检索文本"""
+    parts = [contract_type, cooperation_purpose, Core_scenario, query]
+    return " ".join(part for part in parts if part)
+
+
+def _retrieve_sync(search_text: str, top_k: int) -> dict:
+    """
+    在向量库中检索法律法规、案例与合同范本（同步，在线程池中运行）
+
+    Args:
+        search_text: 检索文本
+        top_k: 每类最多返回条数
+
+    Returns:
+        与 prompt_insert 约定的知识字典
     """
-    负责从外部知识库服务检索相关信息。
+    with use_vector_db_manager() as manager:
+        results = manager.dual_matching(search_text)
+
+    latest_laws = []
+    for law in results["relevant_laws"][:top_k]:
+        title = law["metadata"].get("title")
+        content = _clip(law["content"])
+        latest_laws.append(f"《{title}》{content}" if title else content)
+
+    case_studies = []
+    for case in results["relevant_case"][:top_k]:
+        title = case["metadata"].get("title")
+        content = _clip(case["content"])
+        case_studies.append(f"{title}：{content}" if title else content)
+
+    templates = []
+    contracts = [results["best_contract"]] + results["alternative_contracts"]
+    for contract in [c for c in contracts if c][:top_k]:
+        title = contract["metadata"].get("title") or contract["metadata"].get("type")
+        content = _clip(contract["content"])
+        templates.append(f"{title}：{content}" if title else content)
+
+    return {
+        "latest_laws": latest_laws,
+        "case_studies": case_studies,
+        # 向量库中暂无国标行规集合
+        "standards": [],
+        "templates": templates
+    }
+
+
+async def retrieve_knowledge_from_kb(query: str, contract_type: str = None, cooperation_purpose: str = None, Core_scenario: str = None, top_k: int = 3, timeout: float = None) -> dict:
+    """
+    负责从向量知识库检索相关信息。
+
+    检索在线程池中执行并受时间预算限制；超时或出错时返回空结果，
+    由调用方（prompt_insert）填入默认提示。
+
+    Args:
+        query: 用户的原始提示
+        contract_type: 合同类型
+        cooperation_purpose: 合作目的
+        Core_scenario: 合同核心场景
+        top_k: 每类最多返回条数
+        timeout: 检索时间预算（秒），默认使用 config.KB_RETRIEVAL_TIMEOUT_S
+
+    Returns:
+        {"latest_laws": [...], "case_studies": [...], "standards": [...], "templates": [...]}
     """
-    #print(f"Retrieving knowledge for query: '{query}' (Contract Type: {contract_type}, Purpose: {cooperation_purpose}, Core Scenario: {Core_scenario})")
-    # TODO: 在这里添加实际调用外部知识库服务的逻辑
-    # 例如，构建 HTTP 请求，发送到向量数据库的API，处理响应等
-    
-    # 目前仍然使用模拟数据
-    if "买卖合同" in query or "采购合同" in str(contract_type):
-        return {
-            "latest_laws": [
-                "《中华人民共和国民法典》第465条：依法成立的合同，受法律保护。",
-                "《中华人民共和国民法典》第595条：买卖合同是出卖人转移标的物的所有权于买受人，买受人支付价款的合同。",
-                "《中华人民共和国民法典》第604条：标的物毁损、灭失的风险，在标的物交付之前由出卖人承担，交付之后由买受人承担。"
-            ],
-            "case_studies": [
-                "最高人民法院公报案例：某公司与某供应商买卖合同纠纷案，判决强调交货凭证的重要性。",
-                "典型案例：某货物质量争议案，判定应以国家标准作为判定依据，除非另有明确约定。"
-            ],
-            "standards": [
-                "GBT 19001-2016 质量管理体系 要求 (ISO 9001:2015, IDT)",
-                "行业标准：XX货物采购验收规范"
-            ],
-            "templates": [
-                "通用货物买卖合同范本（2023版）"
-            ]
-        }
-    elif "租赁合同" in query or "租赁合同" in contract_type:
-        return {
-            "latest_laws": [
-                "《中华人民共和国民法典》第703条：租赁合同是出租人将租赁物交付承租人使用、收益，承租人支付租金的合同。",
-                "《中华人民共和国民法典》第704条：租赁合同的内容一般包括租赁物的名称、数量、用途、租赁期限、租金及其支付期限和方式、租赁物维修等条款。",
-            ],
-            "case_studies": [],
-            "standards": [],
-            "templates": []
-        }
-    else:
-        return {
-            "latest_laws": [],
-            "case_studies": [],
-            "standards": [],
-            "templates": []
-        }
+    search_text = _build_query(query, contract_type, cooperation_purpose, Core_scenario)
+    if not search_text:
+        return dict(EMPTY_KNOWLEDGE)
 
+    timeout = config.KB_RETRIEVAL_TIMEOUT_S if timeout is None else timeout
+    loop = asyncio.get_running_loop()
+    try:
+        return await asyncio.wait_for(
+            loop.run_in_executor(_retrieval_executor, _retrieve_sync, search_text, top_k),
+            timeout=timeout
+        )
+    except asyncio.TimeoutError:
+        print(f"⚠️ 知识库检索超时（>{timeout}s），使用默认提示")
+    except Exception as e:
+        print(f"❌ 知识库检索失败：{e}，使用默认提示")
+    return dict(EMPTY_KNOWLEDGE)
@@ -1,13 +1,16 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware  # CORS支持
 import os
-import openai
+import asyncio
 from dotenv import load_dotenv #用于加载env文件
 from pathlib import Path # 使用 pathlib 处理路径
 from pydantic import BaseModel # 用于更规范的请求体定义
 import json
-from .knowledge_retriever import retrieve_knowledge_from_kb
+import config
+from api.services.llm_client import close_llm_clients, get_async_llm_client
+from api.services.prompt_template import PromptTemplate, get_retrieval_block
+from api.services.sse_coalescer import acoalesce
 
 #用来暴露给后端的接口
 app = FastAPI()
@@ -24,12 +27,17 @@ app.add_middleware(
 #配置豆包AI客户端
 load_dotenv()
 api_key = os.getenv("VITE_HUOSHAN_API_KEY")
-client = openai.OpenAI(
-    base_url="https://ark.cn-beijing.volces.com/api/v3",
-    api_key=api_key,
-)
+# 异步客户端在请求内从共享工厂获取（按事件循环缓存），复用带连接池的httpx客户端
 model_name = "doubao-seed-1-6-251015"
 
+# 限制单个worker同时进行的流式生成数
+generation_semaphore = asyncio.Semaphore(config.LLM_MAX_CONCURRENT_STREAMS)
+
+
+@app.on_event("shutdown")
+async def close_llm_client():
+    await close_llm_clients()
+
 # 用户请求体规范
 class GenerateRequest(BaseModel):
     prompt: str  # 用户的原始提示
@@ -56,48 +64,42 @@ except Exception as e:
     print(f"Error reading system prompt file: {e}")
     system_prompt_content = "你是一个合同生成助手。请按正式合同格式、条款编号清晰地输出完整合同文本。" # Fallback
 
-async def prompt_insert(request: GenerateRequest,template = system_prompt_content) -> str:
-
-    # 默认值，如果未检索到信息或不使用知识库
-    default_laws = "暂无检索到最新法律法规"
-    default_cases = "暂无检索到相关典型案例"
-    default_standards = "暂无检索到相关国标行规"
-    default_templates = "暂无检索到相关合同范本"
-
-    laws_str = default_laws
-    cases_str = default_cases
-    standards_str = default_standards
-    templates_str = default_templates
-
-    retrieve_knowledge = await retrieve_knowledge_from_kb(request.prompt, request.contract_type, request.cooperation_purpose,request.Core_scenario) if request.use_new_knowledge_base else None
-    if retrieve_knowledge:
-        # 将列表转换为字符串，每个条目一行，如果列表为空则使用默认值
-        laws_str = " ".join(retrieve_knowledge.get("latest_laws", [])) or default_laws
-        cases_str = " ".join(retrieve_knowledge.get("case_studies", [])) or default_cases 
-        standards_str = " ".join(retrieve_knowledge.get("standards", [])) or default_standards
-        templates_str = " ".join(retrieve_knowledge.get("templates", [])) or default_templates
-
-    # 没有检索信息设为空或默认值
-    template = template.replace("{最新法律法规}", laws_str)
-    template = template.replace("{最新合同纠纷案}", cases_str)
-    template = template.replace("{最新国标行规}", standards_str)
-    template = template.replace("{最新合同范本}", templates_str)
-
-    system_prompt_content = template.format(
-        合同类型=request.contract_type,
-        甲方=request.first_party,
-        乙方=request.second_party,
-        合作目的 = request.cooperation_purpose if request.cooperation_purpose is not None else "",
-        合同核心场景 = request.Core_scenario if request.Core_scenario is not None else ""      
+# 导入时预编译，每次请求只做一次拼接
+compiled_system_prompt = PromptTemplate(system_prompt_content)
+
+async def prompt_insert(request: GenerateRequest, template: PromptTemplate = compiled_system_prompt) -> str:
+    if isinstance(template, str):
+        template = PromptTemplate(template)
+
+    # 检索信息块（未检索到或不使用知识库时为默认值），相同请求复用缓存
+    retrieval_block = await get_retrieval_block(
+        request.prompt, request.contract_type, request.cooperation_purpose, request.Core_scenario,
+        use_knowledge_base=request.use_new_knowledge_base
     )
+
+    system_prompt_content = template.render({
+        **retrieval_block,
+        "合同类型": request.contract_type,
+        "甲方": request.first_party,
+        "乙方": request.second_party,
+        "合作目的": request.cooperation_purpose if request.cooperation_purpose is not None else "",
+        "合同核心场景": request.Core_scenario if request.Core_scenario is not None else ""
+    })
     return system_prompt_content
 
 
 @app.post("/generate-contract")
-async def generate_contract(request: GenerateRequest):
+async def generate_contract(request: GenerateRequest, http_request: Request):
     system_prompt_content = await prompt_insert(request)
     async def generate_chunks():
         full_content = ""  # 用于累积完整内容
+        try:
+            await asyncio.wait_for(generation_semaphore.acquire(), timeout=config.LLM_QUEUE_TIMEOUT_S)
+        except asyncio.TimeoutError:
+            yield f"data: {json.dumps({'error': '当前生成请求过多，请稍后重试'}, ensure_ascii=False)}\n\n"
+            return
+
+        stream_response = None
         try:
             messages=[
                 {"role": "system", "content": system_prompt_content},
@@ -106,7 +108,8 @@ async def generate_contract(request: GenerateRequest):
             print(messages)
 
             # 开启流式输出
-            stream_response = client.chat.completions.create(
+            client = get_async_llm_client(api_key=api_key)
+            stream_response = await client.chat.completions.create(
                 model = model_name,
                 messages=messages,
                 max_tokens=request.max_new_tokens,
@@ -114,12 +117,20 @@ async def generate_contract(request: GenerateRequest):
                 stream=True,
             )
 
-            for chunk in stream_response:
-                if chunk.choices and chunk.choices[0].delta.content is not None:
-                    content = chunk.choices[0].delta.content
-                    full_content += content
-                    # 返回每个生成的文本块（SSE格式）
-                    yield f"data: {json.dumps({'content': content}, ensure_ascii=False)}\n\n"
+            async def deltas():
+                async for chunk in stream_response:
+                    if chunk.choices and chunk.choices[0].delta.content is not None:
+                        yield chunk.choices[0].delta.content
+
+            # 逐字增量按字节阈值/刷新间隔合并后再输出
+            async for content in acoalesce(deltas()):
+                # 前端断开后停止生成，释放上游连接
+                if await http_request.is_disconnected():
+                    print("客户端已断开，停止生成")
+                    return
+                full_content += content
+                # 返回每个生成的文本块（SSE格式）
+                yield f"data: {json.dumps({'content': content}, ensure_ascii=False)}\n\n"
             
             # 发送结束标记
             yield f"data: {json.dumps({'done': True, 'total_length': len(full_content)}, ensure_ascii=False)}\n\n"
@@ -128,6 +139,11 @@ async def generate_contract(request: GenerateRequest):
             error_msg = f"Error during streaming generation: {str(e)}"
             print(error_msg)
             yield f"data: {json.dumps({'error': error_msg}, ensure_ascii=False)}\n\n"
+        finally:
+            # 正常结束、出错或被取消时都关闭上游流并归还并发名额
+            if stream_response is not None:
+                await stream_response.close()
+            generation_semaphore.release()
 
     return StreamingResponse(
         generate_chunks(),